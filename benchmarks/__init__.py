@@ -0,0 +1 @@
+"""Benchmarks of potodo on synthetic repositories, see `python -m benchmarks -h`."""
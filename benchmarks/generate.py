@@ -0,0 +1,143 @@
+"""Deterministic generator of synthetic translation repositories."""
+
+import argparse
+import random
+from pathlib import Path
+from typing import List
+from typing import NamedTuple
+from typing import Tuple
+
+from potodo.scanner import PoCounts
+from potodo.tree import add_counts
+from potodo.tree import NO_COUNTS
+
+HEADER = """\
+# Synthetic translation file, generated for benchmarks.
+msgid ""
+msgstr ""
+"Project-Id-Version: Benchmark\\n"
+"Language: fr\\n"
+"MIME-Version: 1.0\\n"
+"Content-Type: text/plain; charset=UTF-8\\n"
+"Content-Transfer-Encoding: 8bit\\n"
+"Plural-Forms: nplurals=2; plural=(n > 1);\\n"
+
+"""
+
+WORDS = (
+    "the module returns a list of objects when called with the default "
+    "arguments which can be changed later by the user of this function"
+).split()
+
+
+class RepositorySpec(NamedTuple):
+    files: int = 1000
+    entries: int = 100
+    fuzzy: float = 0.1
+    untranslated: float = 0.3
+    obsolete: float = 0.05
+    plural: float = 0.05
+    depth: int = 2
+    seed: int = 0
+
+
+def _sentence(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 20)))
+
+
+def _entry(
+    rng: random.Random, spec: RepositorySpec, number: int
+) -> Tuple[str, int, str]:
+    """Gives the text of an entry, the index of its count in PoCounts, and
+    its msgid."""
+    msgid = f"{number}: {_sentence(rng)}"
+    plural = rng.random() < spec.plural
+    draw = rng.random()
+    if draw < spec.obsolete:
+        kind, prefix = 3, "#~ "
+    elif draw < spec.obsolete + spec.fuzzy:
+        kind, prefix = 1, ""
+    elif draw < spec.obsolete + spec.fuzzy + spec.untranslated:
+        kind, prefix = 2, ""
+    else:
+        kind, prefix = 0, ""
+    msgstr = "" if kind == 2 else f"{number} : {_sentence(rng)}"
+    lines = [f"#: library/file.rst:{number}"]
+    if kind == 1:
+        lines.append("#, fuzzy")
+    lines.append(f'{prefix}msgid "{msgid}"')
+    if plural:
+        lines.append(f'{prefix}msgid_plural "{msgid}s"')
+        lines.append(f'{prefix}msgstr[0] "{msgstr}"')
+        lines.append(f'{prefix}msgstr[1] "{msgstr}"')
+    else:
+        lines.append(f'{prefix}msgstr "{msgstr}"')
+    return "\n".join(lines) + "\n\n", kind, msgid
+
+
+def file_path(spec: RepositorySpec, index: int) -> Path:
+    """Spreads the files in directories nested `depth` levels deep."""
+    parts = [f"section{(index >> (3 * level)) % 8}" for level in range(spec.depth)]
+    return Path(*parts, f"file{index}.po")
+
+
+def generate_repository(path: Path, spec: RepositorySpec) -> PoCounts:
+    """Writes the po files of `spec` under `path`, returning their total counts.
+
+    The same spec always gives the same files.
+    """
+    rng = random.Random(spec.seed)
+    total = NO_COUNTS
+    for index in range(spec.files):
+        counts: List[int] = [0] * len(PoCounts._fields)
+        chunks = [HEADER]
+        for number in range(spec.entries):
+            text, kind, msgid = _entry(rng, spec, number)
+            chunks.append(text)
+            counts[kind] += 1
+            if kind != 3:
+                # Followed by the words, then the characters, of each state
+                counts[4 + kind] += len(msgid.split())
+                counts[7 + kind] += len(msgid)
+        po_file = path / file_path(spec, index)
+        po_file.parent.mkdir(parents=True, exist_ok=True)
+        po_file.write_text("".join(chunks), encoding="utf-8")
+        total = add_counts(total, PoCounts(*counts))
+    return total
+
+
+def spec_argument_parser() -> argparse.ArgumentParser:
+    """Parser of the options of RepositorySpec, shared with the runner."""
+    parser = argparse.ArgumentParser(add_help=False)
+    defaults = RepositorySpec()
+    parser.add_argument("--files", type=int, default=defaults.files)
+    parser.add_argument("--entries", type=int, default=defaults.entries)
+    for ratio in ("fuzzy", "untranslated", "obsolete", "plural"):
+        parser.add_argument(
+            f"--{ratio}",
+            type=float,
+            default=getattr(defaults, ratio),
+            help=f"ratio of {ratio} entries (default: %(default)s)",
+        )
+    parser.add_argument("--depth", type=int, default=defaults.depth)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    return parser
+
+
+def spec_from_args(args: argparse.Namespace) -> RepositorySpec:
+    return RepositorySpec(*(getattr(args, field) for field in RepositorySpec._fields))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic translation repository.",
+        parents=[spec_argument_parser()],
+    )
+    parser.add_argument("path", type=Path)
+    args = parser.parse_args()
+    counts = generate_repository(args.path, spec_from_args(args))
+    print(f"Generated {args.path}: {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""Runs the benchmarks on a synthetic repository, printing the timings as JSON.
+
+    python -m benchmarks --files 10000 --entries 200 --output results.json
+
+Each scenario is run `--repeat` times, its setup (like clearing the caches
+for cold runs) not being timed.
+"""
+
+import argparse
+import contextlib
+import functools
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+from pathlib import Path
+from socketserver import ThreadingMixIn
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+from urllib.parse import parse_qs
+from urllib.parse import urlsplit
+
+import potodo
+from benchmarks.generate import generate_repository
+from benchmarks.generate import RepositorySpec
+from benchmarks.generate import spec_argument_parser
+from benchmarks.generate import spec_from_args
+from potodo.cache import clear_cache
+from potodo.forge_api import ForgeClient
+from potodo.po_file import get_po_stats_from_repo_or_cache
+from potodo.po_file import parse_po_files
+from potodo.potodo import build_ignore_matcher
+from potodo.potodo import OUTPUT_FORMATS
+from potodo.potodo import print_report
+from potodo.walk import walk_po_files
+
+Scenario = Tuple[str, Callable[[], Any], Optional[Callable[[], Any]]]
+
+# Seconds within which scenarios should run, checked by --check-budgets,
+# on top of the startup of the bare interpreter, measured by "startup-python"
+BUDGETS = {
+    # Imports and argument parsing, as when called by editors
+    "startup-version": 0.1,
+    # A warm run on a small repository, with nothing to parse
+    "startup-warm": 0.1,
+}
+
+FORGE_PAGES = 20
+FORGE_ISSUES_PER_PAGE = 100
+
+
+class FakeForge(ThreadingMixIn, HTTPServer):
+    """Local stand-in for the issues API of a forge, serving paginated
+    reservations of the files of the synthetic repository."""
+
+    daemon_threads = True
+
+    def __init__(self, spec: RepositorySpec):
+        super().__init__(("127.0.0.1", 0), FakeForgeHandler)
+        self.spec = spec
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/issues?state=open&page=1"
+
+
+class FakeForgeHandler(BaseHTTPRequestHandler):
+    server: FakeForge
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        page = int(parse_qs(urlsplit(self.path).query)["page"][0])
+        first = (page - 1) * FORGE_ISSUES_PER_PAGE
+        issues = [
+            {
+                "title": f"Traduction de file{number}.po",
+                "created_at": "2020-10-10T12:00:00Z",
+                "user": {"login": f"user{number}"},
+            }
+            for number in range(first, first + FORGE_ISSUES_PER_PAGE)
+        ]
+        body = json.dumps(issues).encode()
+        base = f"http://127.0.0.1:{self.server.server_port}/issues?state=open"
+        links = [f'<{base}&page={FORGE_PAGES}>; rel="last"']
+        if page < FORGE_PAGES:
+            links.append(f'<{base}&page={page + 1}>; rel="next"')
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Link", ", ".join(links))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@contextlib.contextmanager
+def fake_forge(spec: RepositorySpec) -> Iterator[FakeForge]:
+    server = FakeForge(spec)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def measure(
+    func: Callable[[], Any], setup: Optional[Callable[[], Any]], repeat: int
+) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def scenarios(repo_path: Path, forge_url: str) -> Iterator[Scenario]:
+    """Gives the (name, function, setup) of each benchmark."""
+    ignore_matches = build_ignore_matcher(repo_path, [])
+    paths = walk_po_files(repo_path, ignore_matches)
+
+    def potodo_command(*args: str) -> Callable[[], Any]:
+        command = [sys.executable, "-m", "potodo", *args]
+        return lambda: subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+
+    python = [sys.executable, "-c", "pass"]
+    yield "startup-python", lambda: subprocess.run(python, check=True), None
+    yield "startup-version", potodo_command("--version"), None
+    # Nothing changed since the previous run (the setup), only the cache is read
+    warm_run = potodo_command("-p", str(repo_path))
+    yield "startup-warm", warm_run, warm_run
+
+    yield "walk", lambda: walk_po_files(repo_path, ignore_matches), None
+    for engine in ("scan", "polib"):
+        for jobs, mode in ((1, "serial"), (None, "parallel")):
+            parse = functools.partial(parse_po_files, paths, jobs, engine)
+            yield f"parse-{engine}-{mode}", parse, None
+
+    def clear(shared: bool) -> Callable[[], None]:
+        return lambda: clear_cache(repo_path, shared)
+
+    stats = functools.partial(
+        get_po_stats_from_repo_or_cache, repo_path, ignore_matches
+    )
+    for backend in ("pickle", "sqlite"):
+        local = functools.partial(stats, cache_backend=backend, shared_cache=False)
+        shared = functools.partial(stats, cache_backend=backend, shared_cache=True)
+        yield f"stats-{backend}-cold", local, clear(True)
+        yield f"stats-{backend}-warm", local, None
+        # The repository cache is gone, but the contents are known
+        yield f"stats-{backend}-shared", shared, clear(False)
+    yield "stats-no-cache", functools.partial(stats, no_cache=True), None
+
+    yield "forge-pages", lambda: ForgeClient().get_all_pages(forge_url), None
+
+    po_files = [po_file for files in stats(no_cache=True).values() for po_file in files]
+    for output_format in OUTPUT_FORMATS:
+
+        def report(output_format: str = output_format) -> None:
+            with contextlib.redirect_stdout(io.StringIO()):
+                print_report(
+                    repo_path,
+                    po_files,
+                    {},
+                    0,
+                    100,
+                    False,
+                    False,
+                    output_format == "json",
+                    False,
+                    False,
+                    False,
+                    False,
+                    False,
+                    output_format=output_format,
+                )
+
+        yield f"output-{output_format}", report, None
+
+
+def run_benchmarks(
+    repo_path: Path,
+    spec: RepositorySpec,
+    repeat: int = 3,
+    only: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Runs the benchmarks on the repository generated from `spec` in
+    `repo_path`, returning the results."""
+    results = []
+    python_startup = 0.0
+    with fake_forge(spec) as forge:
+        for name, func, setup in scenarios(repo_path, forge.url):
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            print(f"Running {name}...", file=sys.stderr)
+            timings = measure(func, setup, repeat)
+            result = dict(
+                name=name,
+                runs=len(timings),
+                min=min(timings),
+                median=statistics.median(timings),
+                max=max(timings),
+            )
+            if name == "startup-python":
+                python_startup = statistics.median(timings)
+            if name in BUDGETS:
+                result["budget"] = python_startup + BUDGETS[name]
+            results.append(result)
+    return dict(
+        potodo_version=potodo.__version__,
+        python=platform.python_version(),
+        platform=platform.platform(),
+        cpus=os.cpu_count(),
+        spec=spec._asdict(),
+        results=results,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark potodo on a synthetic repository.",
+        parents=[spec_argument_parser()],
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs of each scenario (default: 3)"
+    )
+    parser.add_argument(
+        "--only",
+        nargs="*",
+        metavar="PREFIX",
+        help="Only run the scenarios with these name prefixes, like 'stats-pickle'",
+    )
+    parser.add_argument(
+        "-o", "--output", type=Path, help="Write the JSON results to this file"
+    )
+    parser.add_argument(
+        "--check-budgets",
+        action="store_true",
+        help="Exit with an error if a scenario runs slower than its budget "
+        "(median run)",
+    )
+    args = parser.parse_args()
+    spec = spec_from_args(args)
+    # Missing caches are expected here
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory(prefix="potodo-bench-") as tmp:
+        # Keep the shared cache of the user out of the measures
+        os.environ["XDG_CACHE_HOME"] = str(Path(tmp) / "cache")
+        repo_path = Path(tmp) / "repository"
+        print(f"Generating {spec}...", file=sys.stderr)
+        generate_repository(repo_path, spec)
+        results = run_benchmarks(repo_path, spec, args.repeat, args.only)
+
+    output = json.dumps(results, indent=4)
+    if args.output:
+        args.output.write_text(output + "\n")
+    else:
+        print(output)
+    over_budget = [
+        result["name"]
+        for result in results["results"]
+        if result["median"] > result.get("budget", float("inf"))
+    ]
+    if args.check_budgets and over_budget:
+        print(f"Over budget: {', '.join(over_budget)}", file=sys.stderr)
+        exit(1)
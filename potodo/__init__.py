@@ -1,5 +1,26 @@
 #!/usr/bin/env python3
 
+import sys
+from typing import Any
+
 __author__ = """Jules Lasne"""
 __email__ = "jules.lasne@gmail.com"
 __version__ = "0.21.2"
+
+__all__ = ["DirectoryResult", "FileResult", "scan"]
+
+if sys.version_info < (3, 7):
+    # Modules can't have a __getattr__ before Python 3.7
+    from potodo.api import DirectoryResult  # noqa: E402
+    from potodo.api import FileResult  # noqa: E402
+    from potodo.api import scan  # noqa: E402
+else:
+
+    def __getattr__(name: str) -> Any:
+        """Imports the library API on first use, so the command line doesn't
+        load it."""
+        if name in __all__:
+            import potodo.api
+
+            return getattr(potodo.api, name)
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
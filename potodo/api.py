@@ -0,0 +1,240 @@
+"""Library API of potodo, to get the files left to translate without
+printing anything:
+
+    >>> import potodo
+    >>> for result in potodo.scan("python-docs-fr", below=50):
+    ...     if isinstance(result, potodo.FileResult):
+    ...         print(result.path, result.percent_translated)
+
+The repository is walked and parsed lazily, as results are consumed.
+"""
+
+import logging
+from datetime import date
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+from potodo.po_file import PoFileStats
+from potodo.scanner import PoCounts
+from potodo.tree import add_counts
+from potodo.tree import NO_COUNTS
+from potodo.tree import percent_translated
+
+
+class FileResult(NamedTuple):
+    """Stats of a po file left to translate."""
+
+    path: Path
+    # Path of its directory, relative to the repository ("." for itself)
+    directory: str
+    translated: int
+    fuzzy: int
+    untranslated: int
+    obsolete: int
+    # Words and characters of the msgids of the entries in each state
+    translated_words: int = 0
+    fuzzy_words: int = 0
+    untranslated_words: int = 0
+    translated_chars: int = 0
+    fuzzy_chars: int = 0
+    untranslated_chars: int = 0
+    reserved_by: Optional[str] = None
+    reservation_date: Optional[date] = None
+
+    @classmethod
+    def from_stats(
+        cls,
+        po_file: PoFileStats,
+        directory: str,
+        reservation: Tuple[Any, Any] = (None, None),
+    ) -> "FileResult":
+        return cls(po_file.path, directory, *po_file.counts, *reservation)
+
+    @property
+    def filename(self) -> str:
+        return self.path.name
+
+    @property
+    def counts(self) -> PoCounts:
+        return _counts(self)
+
+    @property
+    def entries(self) -> int:
+        """Number of entries, obsolete ones excluded."""
+        return self.translated + self.fuzzy + self.untranslated
+
+    @property
+    def percent_translated(self) -> int:
+        if self.entries == 0:
+            return 100
+        return int(self.translated * 100 / float(self.entries))
+
+    def percent(self, unit: str = "entries") -> int:
+        """Translated percentage of the entries, or of the words or
+        characters of their msgids."""
+        return int(percent_translated(self.counts, unit))
+
+
+class DirectoryResult(NamedTuple):
+    """Stats of a directory, given after those of its files."""
+
+    # Path of the directory, relative to the repository ("." for itself)
+    path: str
+    # Its files left to translate, selected by the filters
+    files: List[FileResult]
+    # Counts of all its po files, selected or not
+    translated: int
+    fuzzy: int
+    untranslated: int
+    obsolete: int
+    translated_words: int = 0
+    fuzzy_words: int = 0
+    untranslated_words: int = 0
+    translated_chars: int = 0
+    fuzzy_chars: int = 0
+    untranslated_chars: int = 0
+
+    @property
+    def counts(self) -> PoCounts:
+        return _counts(self)
+
+    @property
+    def entries(self) -> int:
+        return self.translated + self.fuzzy + self.untranslated
+
+    @property
+    def percent_translated(self) -> float:
+        return percent_translated(self.counts)
+
+    def percent(self, unit: str = "entries") -> float:
+        return percent_translated(self.counts, unit)
+
+
+def _counts(result: Union[FileResult, DirectoryResult]) -> PoCounts:
+    return PoCounts(*(getattr(result, field) for field in PoCounts._fields))
+
+
+def select_files(
+    po_files: Iterable[PoFileStats],
+    repo_path: Path,
+    issue_reservations: Dict[str, Tuple[Any, Any]],
+    above: int = 0,
+    below: int = 100,
+    only_fuzzy: bool = False,
+    exclude_fuzzy: bool = False,
+    exclude_reserved: bool = False,
+    only_reserved: bool = False,
+    unit: str = "entries",
+) -> Iterator[FileResult]:
+    """Selects, among the given po files of the repository at `repo_path`,
+    those left to translate which match the filters, as the potodo command
+    does.
+
+    Files completely translated are never selected, nor those translated
+    less than `above` or more than `below` percent, of their entries, or of
+    the words or characters of their msgids, depending on `unit`.
+    """
+    for po_file in po_files:
+        if only_fuzzy and not po_file.fuzzy_nb:
+            continue
+        if exclude_fuzzy and po_file.fuzzy_nb:
+            continue
+        if po_file.percent_translated == 100:
+            continue
+        percent = po_file.percent_translated
+        if unit != "entries":
+            percent = int(percent_translated(po_file.counts, unit))
+        if percent < above or percent > below:
+            continue
+        reservation = issue_reservations.get(po_file.filename_dir.lower(), (None, None))
+        if exclude_reserved and reservation[0]:
+            continue
+        if only_reserved and not reservation[0]:
+            continue
+        directory = po_file.path.parent.relative_to(repo_path).as_posix()
+        yield FileResult.from_stats(po_file, directory, reservation)
+
+
+def scan(
+    path: Union[str, Path],
+    exclude: Iterable[str] = (),
+    above: int = 0,
+    below: int = 100,
+    only_fuzzy: bool = False,
+    exclude_fuzzy: bool = False,
+    api_url: Optional[str] = None,
+    exclude_reserved: bool = False,
+    only_reserved: bool = False,
+    directory: Optional[str] = None,
+    engine: str = "scan",
+    cache_backend: Optional[str] = "pickle",
+    unit: str = "entries",
+) -> Iterator[Union[FileResult, DirectoryResult]]:
+    """Lists the files left to translate in the repository at `path`.
+
+    The arguments are those of the potodo command. For each directory, the
+    selected files are given, then the stats of the directory itself. Only
+    the files under `directory`, relative to `path`, are listed if given.
+    `above` and `below` are percentages of the entries, or of the words or
+    characters of their msgids, depending on `unit`.
+
+    Nothing is done until results are consumed, and directories are then
+    walked and parsed one after the other, so stopping early, or listing a
+    single directory, doesn't parse the whole repository. The stats of the
+    files are kept in the cache of the repository, unless `cache_backend`
+    is None.
+    """
+    from potodo.cache import open_cache
+    from potodo.forge_api import get_issue_reservations
+    from potodo.potodo import build_ignore_matcher
+    from potodo.walk import iter_po_directories
+
+    repo_path = Path(path).resolve()
+    ignore_matches = build_ignore_matcher(repo_path, list(exclude))
+    issue_reservations = get_issue_reservations(False, api_url or "", repo_path)
+    cache = open_cache(repo_path, cache_backend) if cache_backend else None
+    parsed: List[PoFileStats] = []
+    try:
+        for rel_path, paths in iter_po_directories(
+            repo_path, ignore_matches, directory or ""
+        ):
+            cached_files = cache.lookup(paths) if cache else {}
+            po_files = []
+            for po_file_path in paths:
+                po_file = cached_files.get(po_file_path)
+                if not po_file or not po_file.is_up_to_date(po_file_path.stat()):
+                    po_file = PoFileStats(po_file_path, engine)
+                    parsed.append(po_file)
+                po_files.append(po_file)
+            files = list(
+                select_files(
+                    po_files,
+                    repo_path,
+                    issue_reservations,
+                    above,
+                    below,
+                    only_fuzzy,
+                    exclude_fuzzy,
+                    exclude_reserved,
+                    only_reserved,
+                    unit,
+                )
+            )
+            yield from files
+            counts = NO_COUNTS
+            for po_file in po_files:
+                counts = add_counts(counts, po_file.counts)
+            yield DirectoryResult(rel_path, files, *counts)
+    finally:
+        if cache:
+            logging.debug("Caching %s parsed files", len(parsed))
+            cache.store(parsed)
+            cache.close()
@@ -4,17 +4,18 @@ from pathlib import Path
 from typing import Any
 from typing import List
 from typing import Mapping
+from typing import Optional
 
 
 def check_args(
-    path: str,
+    path: Optional[List[str]],
     exclude: List[str],
     below: int,
     above: int,
     verbose: int,
     only_fuzzy: bool,
     hide_reserved: bool,
-    counts: bool,
+    counts: Optional[str],
     json_format: bool,
     exclude_fuzzy: bool,
     exclude_reserved: bool,
@@ -22,6 +23,13 @@ def check_args(
     show_reservation_dates: bool,
     no_cache: bool,
     is_interactive: bool,
+    jobs: Optional[int] = None,
+    depth: Optional[int] = None,
+    output_format: str = "text",
+    watch: bool = False,
+    api_url: Optional[str] = None,
+    manifest: Optional[str] = None,
+    by: Optional[str] = None,
     **kwargs: Any,
 ) -> Mapping[str, Any]:
     # If below is lower than above, raise an error
@@ -29,7 +37,15 @@ def check_args(
         print("Potodo: 'below' value must be greater than 'above' value.")
         exit(1)
 
-    if json_format and is_interactive:
+    if json_format and output_format not in ("text", "json"):
+        print(
+            f"Potodo: Cannot pass --json and --format {output_format} at the same time."
+        )
+        exit(1)
+    if json_format:
+        output_format = "json"
+
+    if output_format != "text" and is_interactive:
         print(
             "Potodo: Json format and interactive modes cannot be activated at the same time."
         )
@@ -47,6 +63,10 @@ def check_args(
                 )
             )
 
+    if watch and is_interactive:
+        print("Potodo: Cannot pass --watch and --interactive at the same time.")
+        exit(1)
+
     if exclude_fuzzy and only_fuzzy:
         print("Potodo: Cannot pass --exclude-fuzzy and --only-fuzzy at the same time.")
         exit(1)
@@ -57,9 +77,53 @@ def check_args(
         )
         exit(1)
 
+    if jobs is not None and jobs < 1:
+        print("Potodo: 'jobs' value must be at least 1.")
+        exit(1)
+
+    if depth is not None and depth < 0:
+        print("Potodo: 'depth' value must be positive.")
+        exit(1)
+
+    if counts and by and counts != by:
+        print(f"Potodo: Cannot pass --counts={counts} and --by {by} at the same time.")
+        exit(1)
+
+    repositories = None
+    if manifest:
+        from potodo.multi import read_manifest
+
+        try:
+            repositories = read_manifest(Path(manifest))
+        except OSError as err:
+            print(f"Potodo: Can't read the manifest: {err}")
+            exit(1)
+    if manifest or (path and len(path) > 1):
+        from potodo.multi import Repository
+
+        repositories = [
+            Repository(Path(repo_path).resolve()) for repo_path in path or []
+        ] + (repositories or [])
+        if not repositories:
+            print("Potodo: The manifest doesn't list any repository.")
+            exit(1)
+        if is_interactive or watch:
+            print(
+                "Potodo: Cannot pass several repositories with --interactive or --watch."
+            )
+            exit(1)
+        if api_url:
+            print(
+                "Potodo: Cannot pass --api-url with several repositories, "
+                "give their API URL in a manifest instead."
+            )
+            exit(1)
+
     # If no path is specified, use current directory
+    if repositories:
+        path = [str(repositories[0].path)]
     if not path:
-        path = os.getcwd()
+        path = [os.getcwd()]
 
     logging_level = None
     if verbose:
@@ -78,7 +142,12 @@ def check_args(
 
     # Convert strings to `Path` objects and make them absolute
     return {
-        "path": Path(path).resolve(),
+        "path": Path(path[0]).resolve(),
+        "repositories": repositories,
+        "json_format": output_format == "json",
+        "output_format": output_format,
         "exclude": exclude,
         "logging_level": logging_level,
+        "counts": bool(counts),
+        "unit": by or counts or "entries",
     }
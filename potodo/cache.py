@@ -1,42 +1,480 @@
+import json
 import logging
 import os
 import pickle
+import time
 from pathlib import Path
-from tempfile import NamedTemporaryFile
 from typing import cast
 from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import TYPE_CHECKING
+from typing import Union
 
 from potodo import __version__ as VERSION
-from potodo.po_file import PoFileStats
+from potodo.scanner import PoCounts
+from potodo.timings import count
+
+if TYPE_CHECKING:
+    from potodo.po_file import PoFileStats
+
+# Bumped each time the layout of the pickled data changes
+CACHE_FORMAT = 4
+
+CACHE_BACKENDS = ("pickle", "sqlite")
+
+# Bumped each time the SQLite schemas, or the way entries are counted,
+# change. Stored as the user_version of the databases.
+SQLITE_SCHEMA_VERSION = 3
+
+# Columns of the counts of a file or content, in the order of PoCounts
+COUNTS_COLUMNS = ", ".join(PoCounts._fields)
+
+# Maximum number of parameters in a single SQLite query
+SQLITE_BATCH_SIZE = 500
+
+# Bounds of the shared cache: contents unused for this number of seconds
+# are evicted, as are the least recently used ones above this number.
+SHARED_CACHE_MAX_AGE = 90 * 24 * 3600
+SHARED_CACHE_MAX_ENTRIES = 200_000
 
 
 def get_cache_file_content(
     path: str = ".potodo/cache.pickle",
-) -> Dict[Path, PoFileStats]:
+) -> Dict[Path, "PoFileStats"]:
     logging.debug("Trying to load cache from %s", path)
     try:
         with open(path, "rb") as handle:
             data = pickle.load(handle)
+            count("cache_bytes_read", handle.tell())
     except FileNotFoundError:
         logging.warning("No cache found")
         return {}
     else:
         logging.debug("Found cache")
-        if data.get("version") != VERSION:
+        if data.get("version") != VERSION or data.get("format") != CACHE_FORMAT:
             logging.info("Found old cache, ignored it.")
             return {}
         else:
-            return cast(Dict[Path, PoFileStats], data["data"])
+            # Stats are stored as a flat list, their path being the key
+            return {
+                stats.path: stats for stats in cast("List[PoFileStats]", data["data"])
+            }
 
 
 def set_cache_content(
-    obj: Dict[Path, PoFileStats], path: str = ".potodo/cache.pickle"
+    obj: Dict[Path, "PoFileStats"], path: str = ".potodo/cache.pickle"
 ) -> None:
+    from tempfile import NamedTemporaryFile
+
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    data = {"version": VERSION, "data": obj}
+    data = {"version": VERSION, "format": CACHE_FORMAT, "data": list(obj.values())}
     with NamedTemporaryFile(
         mode="wb", delete=False, dir=str(Path(path).parent), prefix=Path(path).name
     ) as tmp:
         pickle.dump(data, tmp)
     os.rename(tmp.name, path)
     logging.debug("Set cache to %s", path)
+
+
+class PickleCache:
+    """Cache of PoFileStats stored in a single pickle file,
+    entirely loaded and rewritten at each run."""
+
+    def __init__(self, repo_path: Path):
+        self.path = str(repo_path) + "/.potodo/cache.pickle"
+        self.files = get_cache_file_content(path=self.path)
+        self.changed = False
+
+    def lookup(self, po_files: Sequence[Path]) -> Dict[Path, "PoFileStats"]:
+        """Returns the known stats of the given files, possibly outdated."""
+        return {
+            po_file: self.files[po_file]
+            for po_file in po_files
+            if po_file in self.files
+        }
+
+    def store(self, stats: Iterable["PoFileStats"]) -> None:
+        for po_file_stats in stats:
+            self.files[po_file_stats.path] = po_file_stats
+            self.changed = True
+
+    def retain(self, po_files: Iterable[Path]) -> None:
+        """Evicts the files not in po_files: deleted, renamed or excluded ones."""
+        kept = {
+            po_file: self.files[po_file]
+            for po_file in po_files
+            if po_file in self.files
+        }
+        if len(kept) != len(self.files):
+            logging.debug(
+                "Evicting %s files from the cache", len(self.files) - len(kept)
+            )
+            self.files = kept
+            self.changed = True
+
+    def paths(self) -> List[Path]:
+        return list(self.files)
+
+    def entries(self) -> int:
+        return len(self.files)
+
+    def close(self) -> None:
+        if self.changed:
+            set_cache_content(self.files, path=self.path)
+
+
+class SQLiteCache:
+    """Cache of PoFileStats stored in a SQLite database, one row per file.
+
+    Only the rows of the requested files are read, and only the changed
+    ones are written. Paths are stored relative to the repository, along
+    with a `directories` view aggregating the counts, so the database can
+    also be queried directly::
+
+        sqlite3 .potodo/cache.sqlite "SELECT * FROM directories"
+    """
+
+    def __init__(self, repo_path: Path):
+        self.repo_path = repo_path
+        os.makedirs(repo_path / ".potodo", exist_ok=True)
+        self.path = repo_path / ".potodo" / "cache.sqlite"
+        logging.debug("Opening cache database %s", self.path)
+        import sqlite3
+
+        self.connection = sqlite3.connect(str(self.path), timeout=30)
+        (user_version,) = self.connection.execute("PRAGMA user_version").fetchone()
+        if user_version != SQLITE_SCHEMA_VERSION:
+            logging.info("Cache schema is missing or outdated, creating it.")
+            self._create_schema()
+
+    def _create_schema(self) -> None:
+        with self.connection:
+            self.connection.executescript(f"""
+                DROP VIEW IF EXISTS directories;
+                DROP TABLE IF EXISTS files;
+                CREATE TABLE files (
+                    path TEXT PRIMARY KEY,
+                    directory TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    sha TEXT NOT NULL,
+                    translated INTEGER NOT NULL,
+                    fuzzy INTEGER NOT NULL,
+                    untranslated INTEGER NOT NULL,
+                    obsolete INTEGER NOT NULL,
+                    translated_words INTEGER NOT NULL,
+                    fuzzy_words INTEGER NOT NULL,
+                    untranslated_words INTEGER NOT NULL,
+                    translated_chars INTEGER NOT NULL,
+                    fuzzy_chars INTEGER NOT NULL,
+                    untranslated_chars INTEGER NOT NULL
+                );
+                CREATE INDEX files_directory ON files (directory);
+                CREATE VIEW directories AS
+                    SELECT
+                        directory,
+                        COUNT(*) AS files,
+                        SUM(translated) AS translated,
+                        SUM(fuzzy) AS fuzzy,
+                        SUM(untranslated) AS untranslated,
+                        SUM(translated + fuzzy + untranslated) AS entries,
+                        100.0 * SUM(translated)
+                            / MAX(SUM(translated + fuzzy + untranslated), 1)
+                            AS percent_translated,
+                        SUM(translated_words + fuzzy_words + untranslated_words)
+                            AS words,
+                        100.0 * SUM(translated_words)
+                            / MAX(SUM(
+                                translated_words + fuzzy_words + untranslated_words
+                            ), 1)
+                            AS percent_words_translated
+                    FROM files GROUP BY directory;
+                PRAGMA user_version = {SQLITE_SCHEMA_VERSION};
+                """)
+
+    def _relative(self, po_file: Path) -> str:
+        return po_file.relative_to(self.repo_path).as_posix()
+
+    def lookup(self, po_files: Sequence[Path]) -> Dict[Path, "PoFileStats"]:
+        """Returns the known stats of the given files, possibly outdated."""
+        from potodo.po_file import PoFileStats
+
+        found = {}
+        for start in range(0, len(po_files), SQLITE_BATCH_SIZE):
+            end = start + SQLITE_BATCH_SIZE
+            batch = [self._relative(po_file) for po_file in po_files[start:end]]
+            rows = self.connection.execute(
+                f"SELECT path, size, mtime_ns, sha, {COUNTS_COLUMNS} FROM files "
+                f"WHERE path IN ({', '.join('?' * len(batch))})",
+                batch,
+            )
+            for path, size, mtime_ns, sha, *counts in rows:
+                po_file = self.repo_path / path
+                found[po_file] = PoFileStats.from_counts(
+                    po_file, size, mtime_ns, sha, PoCounts(*counts)
+                )
+        return found
+
+    def store(self, stats: Iterable["PoFileStats"]) -> None:
+        rows = []
+        for po_file_stats in stats:
+            path = self._relative(po_file_stats.path)
+            rows.append(
+                (
+                    path,
+                    path.rpartition("/")[0],
+                    po_file_stats.size,
+                    po_file_stats.mtime_ns,
+                    po_file_stats.sha,
+                    *po_file_stats.counts,
+                )
+            )
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO files "
+                f"VALUES ({', '.join('?' * (5 + len(PoCounts._fields)))})",
+                rows,
+            )
+        logging.debug("Stored %s files in %s", len(rows), self.path)
+
+    def retain(self, po_files: Iterable[Path]) -> None:
+        """Evicts the files not in po_files: deleted, renamed or excluded ones."""
+        with self.connection:
+            self.connection.execute("CREATE TEMP TABLE seen (path TEXT PRIMARY KEY)")
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO seen VALUES (?)",
+                [(self._relative(po_file),) for po_file in po_files],
+            )
+            evicted = self.connection.execute(
+                "DELETE FROM files WHERE path NOT IN (SELECT path FROM seen)"
+            ).rowcount
+            self.connection.execute("DROP TABLE seen")
+        if evicted:
+            logging.debug("Evicted %s files from the cache", evicted)
+
+    def paths(self) -> List[Path]:
+        rows = self.connection.execute("SELECT path FROM files")
+        return [self.repo_path / path for (path,) in rows]
+
+    def entries(self) -> int:
+        (count,) = self.connection.execute("SELECT COUNT(*) FROM files").fetchone()
+        return cast(int, count)
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def user_cache_dir() -> Path:
+    """Directory where caches shared by all repositories are stored,
+    following the XDG base directory specification."""
+    if os.environ.get("XDG_CACHE_HOME"):
+        return Path(os.environ["XDG_CACHE_HOME"]) / "potodo"
+    if os.name == "nt" and os.environ.get("LOCALAPPDATA"):
+        return Path(os.environ["LOCALAPPDATA"]) / "potodo"
+    return Path.home() / ".cache" / "potodo"
+
+
+class SharedStatsStore:
+    """Counts of `.po` files keyed by the git blob id of their content.
+
+    It is stored in the user cache directory, so all clones, worktrees
+    and branches of a repository share their parse results: a file is
+    only parsed once for a given content. Contents unused for too long,
+    or the least recently used ones when there are too many, are evicted.
+    """
+
+    def __init__(self, directory: Optional[Path] = None):
+        directory = directory or user_cache_dir()
+        os.makedirs(directory, exist_ok=True)
+        self.path = directory / "stats.sqlite"
+        logging.debug("Opening shared cache database %s", self.path)
+        import sqlite3
+
+        self.connection = sqlite3.connect(str(self.path), timeout=30)
+        # Allow concurrent runs to read while another one is writing
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        (user_version,) = self.connection.execute("PRAGMA user_version").fetchone()
+        if user_version != SQLITE_SCHEMA_VERSION:
+            logging.info("Shared cache schema is missing or outdated, creating it.")
+            with self.connection:
+                self.connection.executescript(f"""
+                    DROP TABLE IF EXISTS blobs;
+                    DROP TABLE IF EXISTS counters;
+                    CREATE TABLE blobs (
+                        sha TEXT PRIMARY KEY,
+                        translated INTEGER NOT NULL,
+                        fuzzy INTEGER NOT NULL,
+                        untranslated INTEGER NOT NULL,
+                        obsolete INTEGER NOT NULL,
+                        translated_words INTEGER NOT NULL,
+                        fuzzy_words INTEGER NOT NULL,
+                        untranslated_words INTEGER NOT NULL,
+                        translated_chars INTEGER NOT NULL,
+                        fuzzy_chars INTEGER NOT NULL,
+                        untranslated_chars INTEGER NOT NULL,
+                        last_used INTEGER NOT NULL
+                    );
+                    CREATE INDEX blobs_last_used ON blobs (last_used);
+                    CREATE TABLE counters (
+                        name TEXT PRIMARY KEY,
+                        value INTEGER NOT NULL
+                    );
+                    INSERT INTO counters VALUES ('hits', 0), ('misses', 0);
+                    PRAGMA user_version = {SQLITE_SCHEMA_VERSION};
+                    """)
+
+    def lookup(self, shas: Sequence[str]) -> Dict[str, PoCounts]:
+        """Returns the known counts of the given contents, marking them as used."""
+        found = {}
+        now = int(time.time())
+        with self.connection:
+            for start in range(0, len(shas), SQLITE_BATCH_SIZE):
+                end = start + SQLITE_BATCH_SIZE
+                batch = shas[start:end]
+                placeholders = ", ".join("?" * len(batch))
+                rows = self.connection.execute(
+                    f"SELECT sha, {COUNTS_COLUMNS} FROM blobs "
+                    f"WHERE sha IN ({placeholders})",
+                    batch,
+                )
+                for sha, *counts in rows:
+                    found[sha] = PoCounts(*counts)
+                self.connection.execute(
+                    f"UPDATE blobs SET last_used = ? WHERE sha IN ({placeholders})",
+                    [now, *batch],
+                )
+            self._count(hits=len(found), misses=len(set(shas)) - len(found))
+        return found
+
+    def _count(self, hits: int, misses: int) -> None:
+        self.connection.executemany(
+            "UPDATE counters SET value = value + ? WHERE name = ?",
+            [(hits, "hits"), (misses, "misses")],
+        )
+
+    def store(self, stats: Iterable["PoFileStats"]) -> None:
+        self.store_counts(
+            {po_file_stats.sha: po_file_stats.counts for po_file_stats in stats}
+        )
+
+    def store_counts(self, counts: Dict[str, PoCounts]) -> None:
+        """Stores the counts of contents, given by their blob id."""
+        now = int(time.time())
+        rows = [(sha, *sha_counts, now) for sha, sha_counts in counts.items()]
+        if not rows:
+            return
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO blobs "
+                f"VALUES ({', '.join('?' * (2 + len(PoCounts._fields)))})",
+                rows,
+            )
+        self.prune()
+
+    def prune(
+        self,
+        max_age: float = SHARED_CACHE_MAX_AGE,
+        max_entries: int = SHARED_CACHE_MAX_ENTRIES,
+    ) -> int:
+        """Evicts the contents unused for more than max_age seconds, then the
+        least recently used ones above max_entries. Returns how many were."""
+        with self.connection:
+            evicted = self.connection.execute(
+                "DELETE FROM blobs WHERE last_used < ?", (time.time() - max_age,)
+            ).rowcount
+            evicted += self.connection.execute(
+                "DELETE FROM blobs WHERE sha IN (SELECT sha FROM blobs "
+                "ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (max_entries,),
+            ).rowcount
+        if evicted:
+            logging.debug("Evicted %s contents from the shared cache", evicted)
+        return evicted
+
+    def entries(self) -> int:
+        (count,) = self.connection.execute("SELECT COUNT(*) FROM blobs").fetchone()
+        return cast(int, count)
+
+    def counters(self) -> Dict[str, int]:
+        return dict(self.connection.execute("SELECT name, value FROM counters"))
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def open_cache(
+    repo_path: Path, backend: str = "pickle"
+) -> Union[PickleCache, SQLiteCache]:
+    """Opens the cache of the repository, stored using the given backend."""
+    if backend == "sqlite":
+        return SQLiteCache(repo_path)
+    return PickleCache(repo_path)
+
+
+def repository_cache_path(repo_path: Path, backend: str = "pickle") -> Path:
+    """Path of the cache of the repository for the given backend."""
+    name = "cache.sqlite" if backend == "sqlite" else "cache.pickle"
+    return repo_path / ".potodo" / name
+
+
+def server_info_path(repo_path: Path) -> Path:
+    """Path of the address of the `potodo serve` server of the repository."""
+    return repo_path / ".potodo" / "server.json"
+
+
+def disk_usage(path: Path) -> int:
+    """Size in bytes of a cache file, including SQLite companion files."""
+    return sum(
+        os.path.getsize(str(file))
+        for file in (path, Path(f"{path}-wal"), Path(f"{path}-shm"))
+        if file.exists()
+    )
+
+
+def get_cache_counters(repo_path: Path) -> Dict[str, int]:
+    """Cumulated hits and misses of the cache of the repository."""
+    try:
+        with open(repo_path / ".potodo" / "counters.json") as handle:
+            return cast(Dict[str, int], json.load(handle))
+    except (FileNotFoundError, ValueError):
+        return {"hits": 0, "misses": 0}
+
+
+def record_cache_counters(repo_path: Path, hits: int, misses: int) -> None:
+    """Adds the hits and misses of a run to the repository counters."""
+    if not hits and not misses:
+        return
+    counters = get_cache_counters(repo_path)
+    counters["hits"] += hits
+    counters["misses"] += misses
+    from tempfile import NamedTemporaryFile
+
+    (repo_path / ".potodo").mkdir(exist_ok=True)
+    # Written aside then moved, so concurrent runs never read a partial file
+    with NamedTemporaryFile(
+        mode="w", delete=False, dir=str(repo_path / ".potodo"), prefix="counters"
+    ) as tmp:
+        json.dump(counters, tmp)
+    os.replace(tmp.name, str(repo_path / ".potodo" / "counters.json"))
+
+
+def clear_cache(repo_path: Path, shared: bool = False) -> None:
+    """Removes the caches of the repository, and the shared one if asked to."""
+    from potodo.entries import entries_database_path
+    from potodo.history import history_database_path
+
+    paths = [repository_cache_path(repo_path, backend) for backend in CACHE_BACKENDS]
+    paths.append(repo_path / ".potodo" / "counters.json")
+    paths.append(repo_path / ".potodo" / "reservations.json")
+    paths.append(entries_database_path(repo_path))
+    paths.append(history_database_path(repo_path))
+    if shared:
+        paths.append(user_cache_dir() / "stats.sqlite")
+    for path in paths:
+        for file in (path, Path(f"{path}-wal"), Path(f"{path}-shm")):
+            if file.exists():
+                logging.info("Removing %s", file)
+                file.unlink()
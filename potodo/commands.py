@@ -0,0 +1,400 @@
+"""Subcommands of potodo, like `potodo cache stats`.
+
+Each of them gets the remaining command line arguments.
+"""
+
+import argparse
+import logging
+import os
+from pathlib import Path
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+
+
+def _format_size(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def _format_hit_rate(counters: Dict[str, int]) -> str:
+    lookups = counters["hits"] + counters["misses"]
+    if not lookups:
+        return "no lookups yet"
+    return (
+        f"{100 * counters['hits'] / lookups:.1f}% "
+        f"({counters['hits']} hits, {counters['misses']} misses)"
+    )
+
+
+def _common_parser(
+    path_help: str, json_help: Optional[str] = "format output as JSON"
+) -> argparse.ArgumentParser:
+    """Parent parser of the options shared by the subcommands: the
+    repository, the patterns to exclude, the verbosity and, unless
+    `json_help` is None, the JSON output."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("-p", "--path", help=path_help, metavar="path")
+    parser.add_argument(
+        "-e",
+        "--exclude",
+        nargs="+",
+        default=[],
+        help="gitignore-style patterns to exclude from search.",
+        metavar="path",
+    )
+    if json_help is not None:
+        parser.add_argument(
+            "-j", "--json", action="store_true", dest="json_format", help=json_help
+        )
+    parser.add_argument(
+        "-v", "--verbose", action="count", default=0, help="Increases output verbosity"
+    )
+    return parser
+
+
+def _setup_logging(verbose: int) -> None:
+    from potodo.logging import setup_logging
+
+    if verbose:
+        setup_logging(max(logging.DEBUG, logging.ERROR - 10 * verbose))
+    else:
+        logging.disable(logging.CRITICAL)
+
+
+def cache_command(argv: List[str]) -> None:
+    from potodo.cache import CACHE_BACKENDS
+    from potodo.cache import clear_cache
+    from potodo.cache import disk_usage
+    from potodo.cache import get_cache_counters
+    from potodo.cache import open_cache
+    from potodo.cache import repository_cache_path
+    from potodo.cache import SharedStatsStore
+    from potodo.cache import SHARED_CACHE_MAX_AGE
+    from potodo.cache import SHARED_CACHE_MAX_ENTRIES
+    from potodo.cache import user_cache_dir
+    from potodo.entries import entries_database_path
+    from potodo.entries import EntryIndex
+    from potodo.history import history_database_path
+    from potodo.history import HistoryDatabase
+
+    parser = argparse.ArgumentParser(
+        prog="potodo cache",
+        description="Inspect and manage the potodo caches.",
+    )
+    parser.add_argument(
+        "action",
+        choices=("stats", "prune", "clear"),
+        help="stats: show entries, size and hit rate of the caches; "
+        "prune: evict outdated entries; clear: remove the caches",
+    )
+    parser.add_argument(
+        "-p", "--path", help="repository whose cache to manage", metavar="path"
+    )
+    parser.add_argument(
+        "--shared",
+        action="store_true",
+        help="also clear the cache shared by all repositories",
+    )
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=SHARED_CACHE_MAX_AGE / (24 * 3600),
+        metavar="DAYS",
+        help="prune shared cache entries unused for DAYS days (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--max-entries",
+        type=int,
+        default=SHARED_CACHE_MAX_ENTRIES,
+        metavar="N",
+        help="prune the least recently used shared cache entries above N "
+        "(default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+    repo_path = Path(args.path or os.getcwd()).resolve()
+    shared_cache_path = user_cache_dir() / "stats.sqlite"
+
+    if args.action == "clear":
+        clear_cache(repo_path, shared=args.shared)
+        return
+
+    for backend in CACHE_BACKENDS:
+        path = repository_cache_path(repo_path, backend)
+        if not path.exists():
+            continue
+        cache = open_cache(repo_path, backend)
+        if args.action == "prune":
+            # Excluded files are evicted by the next run, deleted ones right now
+            cache.retain([po_file for po_file in cache.paths() if po_file.exists()])
+        print(f"# Repository cache ({path})")
+        print(f"- entries:  {cache.entries()}")
+        print(f"- size:     {_format_size(disk_usage(path))}")
+        print(f"- hit rate: {_format_hit_rate(get_cache_counters(repo_path))}")
+        cache.close()
+
+    entries_path = entries_database_path(repo_path)
+    if entries_path.exists():
+        index = EntryIndex(repo_path)
+        print(f"# Entries index ({entries_path})")
+        print(f"- files:    {index.files()}")
+        print(f"- entries:  {index.entries()}")
+        print(f"- size:     {_format_size(disk_usage(entries_path))}")
+        index.close()
+    history_path = history_database_path(repo_path)
+    if history_path.exists():
+        database = HistoryDatabase(repo_path)
+        print(f"# History ({history_path})")
+        print(f"- commits:  {database.commits()}")
+        print(f"- size:     {_format_size(disk_usage(history_path))}")
+        database.close()
+
+    if shared_cache_path.exists():
+        store = SharedStatsStore()
+        if args.action == "prune":
+            evicted = store.prune(args.max_age * 24 * 3600, args.max_entries)
+            print(f"Evicted {evicted} entries from the shared cache.")
+        print(f"# Shared cache ({shared_cache_path})")
+        print(f"- entries:  {store.entries()}")
+        print(f"- size:     {_format_size(disk_usage(shared_cache_path))}")
+        print(f"- hit rate: {_format_hit_rate(store.counters())}")
+        store.close()
+
+
+def serve_command(argv: List[str]) -> None:
+    import socket
+
+    from potodo.scanner import ENGINES
+    from potodo.server import serve
+
+    parser = argparse.ArgumentParser(
+        prog="potodo serve",
+        description="Keep the stats of a repository in memory, up to date, and "
+        "serve them over HTTP to potodo, editors or dashboards.",
+        parents=[_common_parser("repository whose stats to serve", None)],
+    )
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="Unix socket to listen on (defaults to .potodo/potodo.sock in the "
+        "repository, where Unix sockets are available)",
+    )
+    parser.add_argument(
+        "--http",
+        type=int,
+        metavar="PORT",
+        help="also listen on localhost on PORT (0 picks a free port)",
+    )
+    parser.add_argument(
+        "-u", "--api-url", help="API URL to retrieve reservation tickets"
+    )
+    parser.add_argument(
+        "--reservations-max-age",
+        type=float,
+        default=300.0,
+        metavar="SECONDS",
+        help="fetch the reservations again once older than SECONDS seconds "
+        "(default: %(default)s)",
+    )
+    parser.add_argument("--engine", choices=ENGINES, default="scan")
+    args = parser.parse_args(argv)
+    _setup_logging(args.verbose)
+    repo_path = Path(args.path or os.getcwd()).resolve()
+    socket_path = None
+    if args.socket:
+        socket_path = Path(args.socket).resolve()
+    elif hasattr(socket, "AF_UNIX"):
+        socket_path = repo_path / ".potodo" / "potodo.sock"
+        socket_path.parent.mkdir(exist_ok=True)
+    if socket_path is None and args.http is None:
+        args.http = 0
+    serve(
+        repo_path,
+        args.exclude,
+        socket_path,
+        args.http,
+        args.api_url,
+        args.engine,
+        args.reservations_max_age,
+    )
+
+
+def history_command(argv: List[str]) -> None:
+    from potodo.history import history
+
+    parser = argparse.ArgumentParser(
+        prog="potodo history",
+        description="Show the progress of a repository along its git history, "
+        "at each commit changing its po files (following the first parents of "
+        "merges). It is stored in .potodo/history.sqlite, so next runs only "
+        "read the new commits.",
+        parents=[
+            _common_parser(
+                "repository whose history to show",
+                "format output as JSON, giving the progress of every directory "
+                "changed by each commit",
+            )
+        ],
+    )
+    parser.add_argument(
+        "--since",
+        metavar="REV",
+        help="start after the commit REV (default: from the first commit)",
+    )
+    parser.add_argument(
+        "-d",
+        "--directory",
+        help="show the progress of this directory, relative to the repository, "
+        "instead of the whole repository",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="read the whole history again instead of only the new commits",
+    )
+    parser.add_argument(
+        "--no-shared-cache",
+        action="store_true",
+        help="parse every content instead of reusing the counts of the cache "
+        "shared by all repositories",
+    )
+    args = parser.parse_args(argv)
+    _setup_logging(args.verbose)
+    directory = args.directory
+    if directory is not None:
+        directory = Path(directory).as_posix().strip("/") or "."
+    history(
+        Path(args.path or os.getcwd()).resolve(),
+        args.since,
+        args.exclude,
+        directory,
+        args.json_format,
+        args.rebuild,
+        not args.no_shared_cache,
+    )
+
+
+def reuse_command(argv: List[str]) -> None:
+    from potodo.reuse import reuse
+
+    parser = argparse.ArgumentParser(
+        prog="potodo reuse",
+        description="List the untranslated and fuzzy entries whose msgid is "
+        "already translated in another place of the repository, with these "
+        "translations. The entries are indexed in .potodo/entries.sqlite, so next "
+        "runs only read the files which changed.",
+        parents=[_common_parser("repository whose entries to look at")],
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        metavar="N",
+        help="number of processes used to read the changed po files (defaults to "
+        "the number of CPUs)",
+    )
+    args = parser.parse_args(argv)
+    _setup_logging(args.verbose)
+    if args.jobs is not None and args.jobs < 1:
+        print("Potodo: 'jobs' value must be at least 1.")
+        exit(1)
+    reuse(
+        Path(args.path or os.getcwd()).resolve(),
+        args.exclude,
+        args.json_format,
+        args.jobs,
+    )
+
+
+def search_command(argv: List[str]) -> None:
+    from potodo.entries import STATES
+    from potodo.search import search
+
+    parser = argparse.ArgumentParser(
+        prog="potodo search",
+        description="Find the entries whose msgid or msgstr contain the given "
+        "text, ignoring case and line wrapping, giving their file, line and "
+        "state. Their words are indexed in .potodo/entries.sqlite, so next "
+        "searches only read the files which changed.",
+        parents=[_common_parser("repository whose entries to search")],
+    )
+    parser.add_argument("query", nargs="+", help="text to search")
+    parser.add_argument(
+        "--in",
+        choices=("msgid", "msgstr"),
+        dest="field",
+        help="only search the msgids, or the msgstrs (default: both)",
+    )
+    parser.add_argument(
+        "-s",
+        "--state",
+        choices=STATES,
+        action="append",
+        help="only give the entries in this state, can be given several times",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        metavar="N",
+        help="number of processes used to read the changed po files (defaults to "
+        "the number of CPUs)",
+    )
+    args = parser.parse_args(argv)
+    _setup_logging(args.verbose)
+    if args.jobs is not None and args.jobs < 1:
+        print("Potodo: 'jobs' value must be at least 1.")
+        exit(1)
+    search(
+        Path(args.path or os.getcwd()).resolve(),
+        " ".join(args.query),
+        args.exclude,
+        (args.field,) if args.field else ("msgid", "msgstr"),
+        args.state or STATES,
+        args.json_format,
+        args.jobs,
+    )
+
+
+def diff_command(argv: List[str]) -> None:
+    from potodo.diff import diff
+
+    parser = argparse.ArgumentParser(
+        prog="potodo diff",
+        description="Show the progress of the po files changed between two "
+        "revisions, and of their directories. Only the changed files are read, "
+        "from the git objects, leaving the working tree alone.",
+        parents=[_common_parser("repository whose revisions to compare")],
+    )
+    parser.add_argument("base", help="revision to compare from")
+    parser.add_argument(
+        "head", nargs="?", default="HEAD", help="revision to compare to (HEAD)"
+    )
+    parser.add_argument(
+        "--no-shared-cache",
+        action="store_true",
+        help="parse every content instead of reusing the counts of the cache "
+        "shared by all repositories",
+    )
+    args = parser.parse_args(argv)
+    _setup_logging(args.verbose)
+    diff(
+        Path(args.path or os.getcwd()).resolve(),
+        args.base,
+        args.head,
+        args.exclude,
+        args.json_format,
+        not args.no_shared_cache,
+    )
+
+
+COMMANDS: Dict[str, Callable[[List[str]], None]] = {
+    "cache": cache_command,
+    "diff": diff_command,
+    "history": history_command,
+    "reuse": reuse_command,
+    "search": search_command,
+    "serve": serve_command,
+}
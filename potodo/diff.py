@@ -0,0 +1,191 @@
+"""Progress between two revisions, for `potodo diff`.
+
+Only the `.po` files changed between the revisions are read, straight from
+the git objects with `git cat-file --batch`, without touching the working
+tree. Each content is parsed once, its counts being kept in the shared
+cache, keyed by blob id, as for `potodo history`.
+"""
+
+import json
+from collections import defaultdict
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from potodo.json import counts_record
+from potodo.scanner import PoCounts
+from potodo.tree import add_counts
+from potodo.tree import ancestor_directories
+from potodo.tree import NO_COUNTS
+from potodo.tree import percent_translated
+from potodo.walk import IgnoreMatcher
+from potodo.walk import select_po_files
+
+
+class FileDelta(NamedTuple):
+    # Posix path relative to the repository
+    path: str
+    # Counts in the base revision, None when the file is added
+    before: Optional[PoCounts]
+    # Counts in the head revision, None when the file is deleted
+    after: Optional[PoCounts]
+
+    @property
+    def status(self) -> str:
+        if self.before is None:
+            return "added"
+        if self.after is None:
+            return "deleted"
+        return "modified"
+
+    @property
+    def delta(self) -> PoCounts:
+        return _subtract(self.after or NO_COUNTS, self.before or NO_COUNTS)
+
+
+def _subtract(first: PoCounts, second: PoCounts) -> PoCounts:
+    return PoCounts(*(a - b for a, b in zip(first, second)))
+
+
+def diff_files(
+    repo_path: Path,
+    base: str,
+    head: str,
+    ignore_matches: IgnoreMatcher,
+    shared_cache: bool = True,
+) -> List[FileDelta]:
+    """The `.po` files whose counts changed between the commits `base` and
+    `head`, sorted by path."""
+    from potodo.cache import SharedStatsStore
+    from potodo.git import git_diff_po_files
+    from potodo.history import blob_counts
+
+    changes = git_diff_po_files(repo_path, base, head)
+    selected = [
+        path.relative_to(repo_path).as_posix()
+        for path in select_po_files(repo_path, ignore_matches, changes)
+    ]
+    shas = {sha for path in selected for sha in changes[path] if sha}
+    store = SharedStatsStore() if shared_cache else None
+    try:
+        counts = blob_counts(repo_path, shas, store)
+    finally:
+        if store is not None:
+            store.close()
+    deltas = []
+    for path in selected:
+        old_sha, new_sha = changes[path]
+        before = counts.get(old_sha, NO_COUNTS) if old_sha else None
+        after = counts.get(new_sha, NO_COUNTS) if new_sha else None
+        if before != after:
+            deltas.append(FileDelta(path, before, after))
+    return deltas
+
+
+def directory_deltas(deltas: Sequence[FileDelta]) -> Dict[str, PoCounts]:
+    """Sums the changes of the files by directory, "." being the whole
+    repository."""
+    directories: Dict[str, PoCounts] = defaultdict(lambda: NO_COUNTS)
+    for file_delta in deltas:
+        for directory in ancestor_directories(file_delta.path):
+            directories[directory] = add_counts(
+                directories[directory], file_delta.delta
+            )
+    return dict(sorted(directories.items()))
+
+
+def _delta_record(delta: PoCounts) -> Dict[str, int]:
+    return dict(zip(PoCounts._fields, delta))
+
+
+def _format_delta(delta: PoCounts) -> str:
+    return (
+        f"{delta.translated:+d} translated, {delta.fuzzy:+d} fuzzy, "
+        f"{delta.untranslated:+d} untranslated"
+    )
+
+
+def _format_progress(file_delta: FileDelta) -> str:
+    if file_delta.after is None:
+        return "deleted"
+    after = f"{percent_translated(file_delta.after):.2f}%"
+    if file_delta.before is None:
+        return f"added, {after}"
+    return f"{percent_translated(file_delta.before):.2f}% -> {after}"
+
+
+def print_diff(
+    revisions: Tuple[str, str], deltas: Sequence[FileDelta], json_format: bool
+) -> None:
+    directories = directory_deltas(deltas)
+    if json_format:
+        files: List[Dict[str, Any]] = [
+            dict(
+                path=file_delta.path,
+                status=file_delta.status,
+                before=file_delta.before and counts_record(file_delta.before),
+                after=file_delta.after and counts_record(file_delta.after),
+                delta=_delta_record(file_delta.delta),
+            )
+            for file_delta in deltas
+        ]
+        print(
+            json.dumps(
+                dict(
+                    base=revisions[0],
+                    head=revisions[1],
+                    files=files,
+                    directories=[
+                        dict(path=path, delta=_delta_record(delta))
+                        for path, delta in directories.items()
+                    ],
+                ),
+                indent=4,
+            )
+        )
+        return
+    print(f"# Files changed between {revisions[0][:10]} and {revisions[1][:10]}\n")
+    for file_delta in deltas:
+        print(
+            f"- {file_delta.path}: {_format_delta(file_delta.delta)} "
+            f"({_format_progress(file_delta)})"
+        )
+    print("\n\n# Directories\n")
+    for path, delta in directories.items():
+        print(f"- {path}: {_format_delta(delta)}")
+
+
+def diff(
+    repo_path: Path,
+    base: str,
+    head: str,
+    exclude: List[str],
+    json_format: bool = False,
+    shared_cache: bool = True,
+) -> None:
+    from potodo.git import git_rev_parse
+    from potodo.potodo import build_ignore_matcher
+
+    if git_rev_parse(repo_path, "HEAD") is None:
+        print(f"Potodo: {repo_path} isn't a git repository with commits.")
+        exit(1)
+    revisions = []
+    for rev in (base, head):
+        sha = git_rev_parse(repo_path, rev)
+        if sha is None:
+            print(f"Potodo: Unknown revision {rev!r}.")
+            exit(1)
+        revisions.append(sha)
+    deltas = diff_files(
+        repo_path,
+        revisions[0],
+        revisions[1],
+        build_ignore_matcher(repo_path, exclude),
+        shared_cache,
+    )
+    print_diff((revisions[0], revisions[1]), deltas, json_format)
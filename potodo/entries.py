@@ -0,0 +1,329 @@
+"""Index of the entries of the `.po` files of a repository, for `potodo
+reuse` and `potodo search`.
+
+The entries are stored in `.potodo/entries.sqlite`, along with the size and
+modification time of their files, so each run only reads the files which
+changed. They are indexed by a hash of their msgctxt and msgid, to find the
+translations of an msgid, and by the words of their msgid and msgstr, to
+search them.
+"""
+
+import hashlib
+import logging
+import os
+import re
+from pathlib import Path
+from typing import cast
+from typing import Iterable
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+from typing import Set
+from typing import Tuple
+
+from potodo.po_file import POOL_MIN_FILES
+
+# Bumped each time the schema, or the way entries are read, changes
+ENTRIES_SCHEMA_VERSION = 1
+
+STATES = ("translated", "fuzzy", "untranslated")
+
+_WORD_RE = re.compile(r"\w+")
+
+# Read entry: key, path, line, state, msgctxt, msgid, msgstr, and words
+_Entry = Tuple[str, str, int, str, Optional[str], str, str, Set[str]]
+
+
+class Suggestion(NamedTuple):
+    """An entry left to translate or review, and the translations of the
+    same msgid found elsewhere in the repository."""
+
+    # Path of its file, relative to the repository
+    path: str
+    line: int
+    # "untranslated" or "fuzzy"
+    state: str
+    msgctxt: Optional[str]
+    msgid: str
+    # Each translation, the number of entries translated so, and the path
+    # of one of their files, most used first
+    translations: List[Tuple[str, int, str]]
+
+
+class Match(NamedTuple):
+    """An entry found by a search."""
+
+    # Path of its file, relative to the repository
+    path: str
+    line: int
+    state: str
+    msgctxt: Optional[str]
+    msgid: str
+    msgstr: str
+
+
+def entries_database_path(repo_path: Path) -> Path:
+    return repo_path / ".potodo" / "entries.sqlite"
+
+
+def entry_key(msgctxt: Optional[str], msgid: str) -> str:
+    """Hash under which entries with this msgctxt and msgid are indexed."""
+    return hashlib.sha1(f"{msgctxt or ''}\x04{msgid}".encode()).hexdigest()[:16]
+
+
+def text_words(text: str) -> List[str]:
+    """The words of a text, as indexed: lowercased."""
+    return _WORD_RE.findall(text.lower())
+
+
+def read_entries(path: Path, rel_path: str) -> List[_Entry]:
+    """Reads the entries of a `.po` file, as rows of the index.
+
+    The header, obsolete entries and entries with plural forms are left out.
+    """
+    import polib
+
+    entries: List[_Entry] = []
+    for entry in polib.pofile(str(path)):
+        if entry.obsolete or not entry.msgid or entry.msgid_plural:
+            continue
+        if entry.fuzzy:
+            state = "fuzzy"
+        elif entry.translated():
+            state = "translated"
+        else:
+            state = "untranslated"
+        entries.append(
+            (
+                entry_key(entry.msgctxt, entry.msgid),
+                rel_path,
+                entry.linenum or 0,
+                state,
+                entry.msgctxt,
+                entry.msgid,
+                entry.msgstr,
+                set(text_words(entry.msgid)) | set(text_words(entry.msgstr)),
+            )
+        )
+    return entries
+
+
+def _read_all_entries(
+    paths: Sequence[Path], rel_paths: Sequence[str], jobs: Optional[int]
+) -> List[List[_Entry]]:
+    """Reads the entries of the files, using processes when there are many
+    of them, as parse_po_files does."""
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(paths))
+    if jobs > 1 and len(paths) >= POOL_MIN_FILES:
+        from concurrent.futures import ProcessPoolExecutor
+
+        try:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                return list(
+                    pool.map(
+                        read_entries,
+                        paths,
+                        rel_paths,
+                        chunksize=max(1, len(paths) // (jobs * 4)),
+                    )
+                )
+        except (OSError, NotImplementedError) as err:
+            logging.warning("Can't use a process pool (%s), reading serially", err)
+    return [read_entries(path, rel_path) for path, rel_path in zip(paths, rel_paths)]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class EntryIndex:
+    """The entries of the `.po` files of a repository, indexed by the hash
+    of their msgctxt and msgid and by their words, along with the size and
+    modification time of the files they were read from."""
+
+    def __init__(self, repo_path: Path):
+        self.repo_path = repo_path
+        path = entries_database_path(repo_path)
+        path.parent.mkdir(exist_ok=True)
+        import sqlite3
+
+        self.connection = sqlite3.connect(str(path), timeout=30)
+        (user_version,) = self.connection.execute("PRAGMA user_version").fetchone()
+        if user_version != ENTRIES_SCHEMA_VERSION:
+            logging.info("Entries index schema is missing or outdated, creating it.")
+            with self.connection:
+                self.connection.executescript(f"""
+                    DROP TABLE IF EXISTS files;
+                    DROP TABLE IF EXISTS entries;
+                    DROP TABLE IF EXISTS words;
+                    CREATE TABLE files (
+                        path TEXT PRIMARY KEY,
+                        size INTEGER NOT NULL,
+                        mtime_ns INTEGER NOT NULL
+                    );
+                    CREATE TABLE entries (
+                        id INTEGER PRIMARY KEY,
+                        key TEXT NOT NULL,
+                        path TEXT NOT NULL,
+                        line INTEGER NOT NULL,
+                        state TEXT NOT NULL,
+                        msgctxt TEXT,
+                        msgid TEXT NOT NULL,
+                        msgstr TEXT NOT NULL
+                    );
+                    CREATE INDEX entries_key ON entries (key);
+                    CREATE INDEX entries_path ON entries (path);
+                    CREATE TABLE words (
+                        word TEXT NOT NULL,
+                        entry INTEGER NOT NULL,
+                        PRIMARY KEY (word, entry)
+                    ) WITHOUT ROWID;
+                    CREATE INDEX words_entry ON words (entry);
+                    PRAGMA user_version = {ENTRIES_SCHEMA_VERSION};
+                    """)
+
+    def update(self, po_files: Sequence[Path], jobs: Optional[int] = None) -> int:
+        """Reads the entries of the files which changed since they were
+        indexed, and forgets the files which aren't in `po_files` anymore.
+        Returns the number of files read."""
+        known = {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in self.connection.execute(
+                "SELECT path, size, mtime_ns FROM files"
+            )
+        }
+        changed = []
+        stats = []
+        for po_file in po_files:
+            rel_path = po_file.relative_to(self.repo_path).as_posix()
+            stat = po_file.stat()
+            if known.pop(rel_path, None) != (stat.st_size, stat.st_mtime_ns):
+                changed.append((po_file, rel_path))
+                stats.append((rel_path, stat.st_size, stat.st_mtime_ns))
+        logging.debug(
+            "Indexing %s changed files, forgetting %s", len(changed), len(known)
+        )
+        entries = _read_all_entries(
+            [po_file for po_file, _ in changed],
+            [rel_path for _, rel_path in changed],
+            jobs,
+        )
+        outdated = [(rel_path,) for _, rel_path in changed] + [
+            (path,) for path in known
+        ]
+        with self.connection:
+            self.connection.executemany(
+                "DELETE FROM words WHERE entry IN "
+                "(SELECT id FROM entries WHERE path = ?)",
+                outdated,
+            )
+            self.connection.executemany("DELETE FROM entries WHERE path = ?", outdated)
+            self.connection.executemany(
+                "DELETE FROM files WHERE path = ?", [(path,) for path in known]
+            )
+            for file_entries in entries:
+                for *row, words in file_entries:
+                    entry_id = self.connection.execute(
+                        "INSERT INTO entries "
+                        "(key, path, line, state, msgctxt, msgid, msgstr) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        row,
+                    ).lastrowid
+                    self.connection.executemany(
+                        "INSERT INTO words VALUES (?, ?)",
+                        [(word, entry_id) for word in words],
+                    )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?)", stats
+            )
+        return len(changed)
+
+    def suggestions(self) -> List[Suggestion]:
+        """The untranslated and fuzzy entries whose msgctxt and msgid are
+        translated elsewhere, sorted by file and line."""
+        rows = self.connection.execute("""
+            SELECT
+                todo.path, todo.line, todo.state, todo.msgctxt, todo.msgid,
+                done.msgstr, COUNT(*), MIN(done.path)
+            FROM entries AS todo
+            JOIN entries AS done
+                ON done.key = todo.key
+                AND done.msgid = todo.msgid
+                AND done.msgctxt IS todo.msgctxt
+            WHERE todo.state != 'translated' AND done.state = 'translated'
+            GROUP BY todo.id, done.msgstr
+            ORDER BY todo.path, todo.line, COUNT(*) DESC, done.msgstr
+            """)
+        suggestions: List[Suggestion] = []
+        for path, line, state, msgctxt, msgid, msgstr, uses, example in rows:
+            if not suggestions or suggestions[-1][:2] != (path, line):
+                suggestions.append(Suggestion(path, line, state, msgctxt, msgid, []))
+            suggestions[-1].translations.append((msgstr, uses, example))
+        return suggestions
+
+    def search(
+        self,
+        query: str,
+        fields: Iterable[str] = ("msgid", "msgstr"),
+        states: Iterable[str] = STATES,
+    ) -> List[Match]:
+        """The entries whose `fields` contain `query`, ignoring case and
+        line wrapping, sorted by file and line.
+
+        Only the entries having words starting with each word of the query
+        are read, then checked to contain the whole query.
+        """
+        words = text_words(query)
+        if not words:
+            raise ValueError(f"No word to search in {query!r}")
+        # Entries having a word starting with each word of the query
+        candidates = " INTERSECT ".join(
+            ["SELECT entry FROM words WHERE word >= ? AND word < ?"] * len(words)
+        )
+        states = list(states)
+        rows = self.connection.execute(
+            "SELECT path, line, state, msgctxt, msgid, msgstr FROM entries "
+            f"WHERE id IN ({candidates}) "
+            f"AND state IN ({', '.join('?' * len(states))}) "
+            "ORDER BY path, line",
+            [bound for word in words for bound in (word, word + "\U0010ffff")] + states,
+        )
+        query = _normalize(query)
+        fields = list(fields)
+        matches = []
+        for row in rows:
+            match = Match(*row)
+            if any(query in _normalize(getattr(match, field)) for field in fields):
+                matches.append(match)
+        return matches
+
+    def files(self) -> int:
+        (files,) = self.connection.execute("SELECT COUNT(*) FROM files").fetchone()
+        return cast(int, files)
+
+    def entries(self) -> int:
+        (entries,) = self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()
+        return cast(int, entries)
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def open_entry_index(
+    repo_path: Path, exclude: List[str], jobs: Optional[int] = None
+) -> EntryIndex:
+    """Opens the index of the entries of the repository, up to date."""
+    from potodo.potodo import build_ignore_matcher
+    from potodo.walk import walk_po_files
+
+    po_files = walk_po_files(repo_path, build_ignore_matcher(repo_path, exclude))
+    index = EntryIndex(repo_path)
+    try:
+        index.update(po_files, jobs)
+    except BaseException:
+        index.close()
+        raise
+    return index
@@ -1,33 +1,245 @@
+import json
 import logging
+import os
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from email.utils import parsedate_to_datetime
+from pathlib import Path
 from typing import Any
 from typing import Dict
+from typing import Iterable
 from typing import List
+from typing import Optional
+from typing import Set
 from typing import Tuple
+from typing import TYPE_CHECKING
+from urllib.parse import parse_qsl
+from urllib.parse import urlencode
+from urllib.parse import urlsplit
+from urllib.parse import urlunsplit
 
-import requests
+from potodo.timings import record_request
 
+if TYPE_CHECKING:
+    import requests
 
-def _get_reservation_list(api_url: str) -> Dict[str, Tuple[Any, Any]]:
+# A page of a list, as {"items", "links", "etag", "last_modified", "fetched_at"}
+Page = Dict[str, Any]
+
+
+class ForgeClient:
+    """Gets paginated lists from the API of a forge (GitHub or Gitea).
+
+    Connections are kept alive in a pool, pages are fetched concurrently once
+    the number of pages is known, and rate limited requests are retried after
+    the delay requested by the forge, within `max_wait` seconds.
+
+    Pages are kept in `page_cache`, by URL, with their `ETag` and
+    `Last-Modified` headers so they're then requested conditionally. Pages
+    fetched less than `max_age` seconds ago aren't requested again, and with
+    `stale_if_error` cached pages are used when the forge can't be reached.
+    """
+
+    def __init__(
+        self,
+        session: Optional["requests.Session"] = None,
+        workers: int = 8,
+        max_retries: int = 4,
+        max_wait: float = 60.0,
+        page_cache: Optional[Dict[str, Page]] = None,
+        max_age: float = 0.0,
+        stale_if_error: bool = False,
+    ):
+        self._session = session
+        self.workers = workers
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+        self.page_cache: Dict[str, Page] = {} if page_cache is None else page_cache
+        self.max_age = max_age
+        self.stale_if_error = stale_if_error
+        # URLs of the pages got by this client, from the cache or not
+        self.used_urls: Set[str] = set()
+        self.sleep = time.sleep
+
+    @property
+    def session(self) -> "requests.Session":
+        """The session, only created once a request is made: requests is long
+        to import, and isn't needed when all the pages are cached."""
+        if self._session is None:
+            import requests
+            import requests.adapters
+
+            self._session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.workers)
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+        return self._session
+
+    def retry_delay(self, resp: "requests.Response", attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying the request, None if it shouldn't be."""
+        rate_limited = resp.status_code == 429 or (
+            resp.status_code == 403
+            and (
+                "Retry-After" in resp.headers
+                or resp.headers.get("X-RateLimit-Remaining") == "0"
+            )
+        )
+        if not rate_limited and resp.status_code < 500:
+            return None
+        delay = 2.0**attempt
+        retry_after = resp.headers.get("Retry-After")
+        reset = resp.headers.get("X-RateLimit-Reset")
+        if retry_after:
+            if retry_after.isdigit():
+                delay = float(retry_after)
+            else:
+                try:
+                    retry_date = parsedate_to_datetime(retry_after)
+                except (TypeError, ValueError):
+                    pass
+                else:
+                    delay = retry_date.timestamp() - time.time()
+        elif reset and reset.isdigit():
+            delay = int(reset) - time.time()
+        return min(max(delay, 0.0), self.max_wait)
+
+    def get(
+        self, url: str, headers: Optional[Dict[str, str]] = None
+    ) -> "requests.Response":
+        """Gets the url, retrying while the forge is rate limiting us."""
+        for attempt in range(self.max_retries + 1):
+            logging.debug("Getting %s", url)
+            start = time.perf_counter()
+            resp = self.session.get(url, headers=headers)
+            record_request(url, resp.status_code, time.perf_counter() - start)
+            delay = self.retry_delay(resp, attempt)
+            if delay is None or attempt == self.max_retries:
+                break
+            logging.info(
+                "Got %s for %s, retrying in %.1fs", resp.status_code, url, delay
+            )
+            self.sleep(delay)
+        resp.raise_for_status()
+        return resp
+
+    def get_page(self, url: str) -> Page:
+        """Gets a page of a list: its items and links, from the cache if possible."""
+        self.used_urls.add(url)
+        cached = self.page_cache.get(url)
+        if cached and time.time() - cached["fetched_at"] < self.max_age:
+            logging.debug("Using %s from the cache", url)
+            return cached
+        headers = {}
+        if cached and cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+        try:
+            resp = self.get(url, headers)
+            if resp.status_code == 304 and cached:
+                logging.debug("%s didn't change", url)
+                page = dict(cached)
+            else:
+                page = {
+                    "etag": resp.headers.get("ETag"),
+                    "last_modified": resp.headers.get("Last-Modified"),
+                    "items": resp.json(),
+                    "links": {rel: link["url"] for rel, link in resp.links.items()},
+                }
+        # requests.RequestException is an OSError
+        except (OSError, ValueError) as err:
+            if not (cached and self.stale_if_error):
+                raise
+            logging.warning("Can't get %s (%s), using the cached page", url, err)
+            return cached
+        page["fetched_at"] = time.time()
+        self.page_cache[url] = page
+        return page
+
+    def get_all_pages(self, url: str) -> List[Any]:
+        """Gets the items of all the pages of a list, in order."""
+        page = self.get_page(url)
+        items: List[Any] = list(page["items"])
+        last_url = page["links"].get("last")
+        page_urls = _page_urls(last_url) if last_url else None
+        if page_urls is None:
+            # The number of pages is unknown, follow them one by one
+            next_url = page["links"].get("next")
+            while next_url:
+                page = self.get_page(next_url)
+                items.extend(page["items"])
+                next_url = page["links"].get("next")
+            return items
+        with ThreadPoolExecutor(self.workers) as executor:
+            for page in executor.map(self.get_page, page_urls):
+                items.extend(page["items"])
+        return items
+
+
+class ReservationCache:
+    """Pages of issues fetched from the forge, stored in the `.potodo`
+    directory of the repository to be reused by the next runs."""
+
+    def __init__(self, repo_path: Path):
+        self.path = repo_path / ".potodo" / "reservations.json"
+        try:
+            with open(self.path) as handle:
+                self.pages: Dict[str, Page] = json.load(handle)
+        except (OSError, ValueError):
+            self.pages = {}
+
+    def save(self, used_urls: Iterable[str]) -> None:
+        """Writes the pages of the given URLs, dropping the others."""
+        pages = {url: self.pages[url] for url in used_urls if url in self.pages}
+        self.path.parent.mkdir(exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as handle:
+            json.dump(pages, handle)
+        os.replace(str(tmp_path), str(self.path))
+
+
+def _page_urls(last_url: str) -> Optional[List[str]]:
+    """URLs of the pages following the first one, up to the last one,
+    None if its page number can't be found."""
+    scheme, netloc, path, query, fragment = urlsplit(last_url)
+    params = parse_qsl(query, keep_blank_values=True)
+    pages = [value for key, value in params if key == "page"]
+    if len(pages) != 1 or not pages[0].isdigit():
+        return None
+    urls = []
+    for page in range(2, int(pages[0]) + 1):
+        page_params = [
+            (key, str(page) if key == "page" else value) for key, value in params
+        ]
+        urls.append(
+            urlunsplit((scheme, netloc, path, urlencode(page_params), fragment))
+        )
+    return urls
+
+
+def _get_reservation_list(
+    api_url: str,
+    client: Optional[ForgeClient] = None,
+    cache: Optional[ReservationCache] = None,
+) -> Dict[str, Tuple[Any, Any]]:
     """Will get the repository name then request all the issues and put them in a dict"""  # noqa
-    issues: List[Dict[Any, Any]] = []
-    logging.debug("Getting %s", api_url)
-    next_url = api_url
-    while next_url:
-        logging.debug("Getting %s", next_url)
-        resp = requests.get(next_url)
-        if resp.status_code == 403:
-            # Rate limit exceeded
-            return {}
-        issues.extend(resp.json())
-        next_url = resp.links.get("next", {}).get("url")
-
-    resp = requests.get(api_url)
-    if resp.status_code == 403:
-        # Rate limit exceeded
+    if client is None:
+        client = ForgeClient()
+    if cache is not None:
+        client.page_cache = cache.pages
+    try:
+        issues: List[Dict[Any, Any]] = client.get_all_pages(api_url)
+    # requests.RequestException is an OSError
+    except (OSError, ValueError) as err:
+        logging.warning("Can't get the reservations from %s: %s", api_url, err)
         return {}
-    issues.extend(resp.json())
+    if cache is not None:
+        try:
+            cache.save(client.used_urls)
+        except OSError as err:
+            logging.warning("Can't write the reservations cache: %s", err)
     logging.debug("Found %s issues", len(issues))
 
     reservations = {}
@@ -48,13 +260,22 @@ def _get_reservation_list(api_url: str) -> Dict[str, Tuple[Any, Any]]:
 def get_issue_reservations(
     hide_reserved: bool,
     api_url: str,
+    repo_path: Optional[Path] = None,
+    max_age: float = 0.0,
+    stale_if_error: bool = False,
 ) -> Dict[str, Tuple[Any, Any]]:
-    """Retrieve info about reservation if needed."""
+    """Retrieve info about reservation if needed.
+
+    Unless `repo_path` is None, the issues are cached in its `.potodo`
+    directory, see ForgeClient for `max_age` and `stale_if_error`.
+    """
 
     if api_url and not hide_reserved:
         logging.info("Getting issue reservations from git.afpy.org")
         # If the reservations are to be displayed, then get them
-        issue_reservations = _get_reservation_list(api_url)
+        cache = ReservationCache(repo_path) if repo_path else None
+        client = ForgeClient(max_age=max_age, stale_if_error=stale_if_error)
+        issue_reservations = _get_reservation_list(api_url, client, cache)
     else:
         logging.debug(
             "Reservation list set to be empty because Potodo was started offline"
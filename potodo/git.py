@@ -0,0 +1,264 @@
+import logging
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+
+def _git(repo_path: Path, *args: str) -> bytes:
+    """Runs a git command in repo_path, returning its output."""
+    return subprocess.run(
+        ["git", "-C", str(repo_path), *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        check=True,
+    ).stdout
+
+
+def _split_z(output: bytes) -> List[str]:
+    """Splits the output of a git command run with -z."""
+    return [
+        item.decode("utf-8", "surrogateescape") for item in output.split(b"\0") if item
+    ]
+
+
+def _tracked_po_files(
+    repo_path: Path, refresh: bool = False
+) -> Dict[str, Optional[str]]:
+    """Maps the tracked `.po` files under `repo_path`, as posix paths
+    relative to it, to their blob id when their working tree content is the
+    one in the git index, else to None. Files deleted from the working tree
+    are left out.
+
+    With `refresh`, the stat data of the index is refreshed first, as `git
+    status` does, so files touched without being modified aren't seen as
+    modified.
+
+    Raises OSError or CalledProcessError when git can't be run.
+    """
+    if refresh:
+        # Fails when the index is locked by another git command, then files
+        # are only compared using their stat data
+        subprocess.run(
+            ["git", "-C", str(repo_path), "update-index", "-q", "--refresh"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+    staged = _git(repo_path, "ls-files", "--stage", "-z", "--", "*.po")
+    changed = _split_z(
+        _git(repo_path, "diff-files", "--name-status", "--relative", "-z", "--", "*.po")
+    )
+    # The output alternates statuses and paths
+    statuses = dict(zip(changed[1::2], changed[::2]))
+    files: Dict[str, Optional[str]] = {}
+    for line in _split_z(staged):
+        info, _, path = line.partition("\t")
+        mode, sha, stage = info.split()
+        if statuses.get(path) == "D":
+            continue
+        if stage != "0" or mode == "120000" or path in statuses:
+            # Conflicting, symlinked or modified files have to be hashed
+            files[path] = None
+        else:
+            files[path] = sha
+    return files
+
+
+def git_blob_shas(repo_path: Path) -> Dict[Path, str]:
+    """Gets the blob id of the tracked `.po` files under `repo_path`
+    whose working tree content is the one in the git index.
+
+    This gives their content hash without reading them. Outside of a
+    git repository, or without git, an empty dict is returned.
+    """
+    try:
+        files = _tracked_po_files(repo_path)
+    except (OSError, subprocess.CalledProcessError):
+        logging.debug("Can't read the git index of %s", repo_path)
+        return {}
+    shas = {repo_path / path: sha for path, sha in files.items() if sha}
+    logging.debug("Found %s unmodified po files in the git index", len(shas))
+    return shas
+
+
+def git_po_files(repo_path: Path) -> Optional[Dict[str, Optional[str]]]:
+    """Lists the `.po` files under `repo_path` using git instead of walking
+    the file system: the tracked ones, and the untracked ones which aren't
+    ignored by git.
+
+    They're given as posix paths relative to `repo_path`, mapped to their
+    blob id when their content is the one in the git index, else to None.
+    Outside of a git repository, or without git, None is returned.
+    """
+    try:
+        files = _tracked_po_files(repo_path, refresh=True)
+        untracked = _git(
+            repo_path, "ls-files", "--others", "--exclude-standard", "-z", "--", "*.po"
+        )
+    except (OSError, subprocess.CalledProcessError):
+        logging.debug("Can't list the files of %s using git", repo_path)
+        return None
+    for path in _split_z(untracked):
+        files[path] = None
+    logging.debug("Found %s po files using git", len(files))
+    return files
+
+
+def git_rev_parse(repo_path: Path, rev: str) -> Optional[str]:
+    """Gives the id of the commit `rev`, or None if it isn't one."""
+    try:
+        output = _git(repo_path, "rev-parse", "--verify", "--quiet", rev + "^{commit}")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode().strip()
+
+
+def git_first_parent_base(repo_path: Path, since: Optional[str]) -> Optional[str]:
+    """Gives the commit from which the first-parent history of HEAD since
+    `since` starts: the first parent of its oldest commit, usually `since`
+    itself, None when starting from the root commit. With nothing new since
+    `since`, HEAD is given."""
+    output = _git(
+        repo_path,
+        "rev-list",
+        "--first-parent",
+        "--parents",
+        "--reverse",
+        f"{since}..HEAD" if since else "HEAD",
+    )
+    for line in output.decode().splitlines():
+        oldest = line.split()
+        return oldest[1] if len(oldest) > 1 else None
+    return git_rev_parse(repo_path, "HEAD")
+
+
+def git_tree_po_files(repo_path: Path, rev: str) -> Dict[str, str]:
+    """Maps the `.po` files under `repo_path` in the commit `rev`, as posix
+    paths relative to `repo_path`, to their blob id."""
+    files = {}
+    for line in _split_z(_git(repo_path, "ls-tree", "-r", "-z", rev)):
+        info, _, path = line.partition("\t")
+        mode, object_type, sha = info.split()
+        if path.endswith(".po") and object_type == "blob" and mode != "120000":
+            files[path] = sha
+    return files
+
+
+def git_po_changes(
+    repo_path: Path, since: Optional[str]
+) -> List[Tuple[str, int, Dict[str, Optional[str]]]]:
+    """Lists the commits of the first-parent history of HEAD since `since`
+    (or since the root commit) changing `.po` files under `repo_path`,
+    oldest first, as their id, their commit time, and the files they
+    changed, as posix paths relative to `repo_path`, mapped to their new
+    blob id, or None when deleted. Merges are compared to their first parent.
+    """
+    output = _git(
+        repo_path,
+        "log",
+        "--reverse",
+        "--first-parent",
+        "-m",
+        "--raw",
+        "--no-abbrev",
+        "--no-renames",
+        "--relative",
+        "-z",
+        "--format=%x01%H %ct",
+        f"{since}..HEAD" if since else "HEAD",
+        "--",
+        "*.po",
+    )
+    commits = []
+    for chunk in output.split(b"\x01")[1:]:
+        header, _, raw = chunk.partition(b"\0")
+        sha, commit_time = header.decode().split()
+        items = _split_z(raw.lstrip(b"\n"))
+        changes: Dict[str, Optional[str]] = {}
+        # The output alternates ":<modes> <blob ids> <status>" and paths
+        for info, path in zip(items[::2], items[1::2]):
+            _, new_mode, _, new_sha, _ = info.split()
+            if not path.endswith(".po"):
+                continue
+            deleted = new_mode in ("000000", "120000")
+            changes[path] = None if deleted else new_sha
+        commits.append((sha, int(commit_time), changes))
+    return commits
+
+
+def git_read_blobs(repo_path: Path, shas: Sequence[str]) -> Iterator[Tuple[str, bytes]]:
+    """Reads the content of the given blobs, streaming them from a single
+    `git cat-file --batch` process. Missing blobs are skipped."""
+    process = subprocess.Popen(
+        ["git", "-C", str(repo_path), "cat-file", "--batch"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    assert process.stdin is not None and process.stdout is not None
+    stdin, stdout = process.stdin, process.stdout
+
+    def write_requests() -> None:
+        # From a thread, as git blocks writing its output until it's read
+        try:
+            for sha in shas:
+                stdin.write(sha.encode() + b"\n")
+            stdin.close()
+        except OSError:
+            pass
+
+    writer = threading.Thread(target=write_requests, daemon=True)
+    writer.start()
+    try:
+        for sha in shas:
+            header = stdout.readline().split()
+            if len(header) != 3:
+                continue
+            data = stdout.read(int(header[2]))
+            stdout.read(1)
+            yield sha, data
+    finally:
+        if process.poll() is None:
+            process.kill()
+        writer.join()
+        stdout.close()
+        process.wait()
+
+
+def git_diff_po_files(
+    repo_path: Path, base: str, head: str
+) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    """Maps the `.po` files under `repo_path` changed between the commits
+    `base` and `head`, as posix paths relative to `repo_path`, to their blob
+    id in `base` and in `head`, None where they don't exist (or aren't
+    regular files)."""
+    output = _git(
+        repo_path,
+        "diff",
+        "--raw",
+        "--no-abbrev",
+        "--no-renames",
+        "--relative",
+        "-z",
+        base,
+        head,
+        "--",
+        "*.po",
+    )
+    files = {}
+    items = _split_z(output)
+    # The output alternates ":<modes> <blob ids> <status>" and paths
+    for info, path in zip(items[::2], items[1::2]):
+        old_mode, new_mode, old_sha, new_sha, _ = info.lstrip(":").split()
+        if not path.endswith(".po"):
+            continue
+        files[path] = (
+            None if old_mode in ("000000", "120000") else old_sha,
+            None if new_mode in ("000000", "120000") else new_sha,
+        )
+    return files
@@ -0,0 +1,375 @@
+"""Progress of a repository along its git history, for `potodo history`.
+
+Files aren't parsed at each commit: `git log` gives the blobs changed by
+each commit, the counts of the other files being carried forward. Each
+content is parsed once, read with `git cat-file --batch`, its counts being
+kept in the shared cache, keyed by blob id.
+
+The progress is stored in `.potodo/history.sqlite`, along with the files
+at the last commit read, so the next run only reads the new commits.
+"""
+
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime
+from datetime import timezone
+from pathlib import Path
+from typing import cast
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+from typing import TYPE_CHECKING
+
+from potodo.cache import COUNTS_COLUMNS
+from potodo.json import counts_record
+from potodo.scanner import PoCounts
+from potodo.scanner import scan_po_lines
+from potodo.tree import ancestor_directories
+from potodo.tree import NO_COUNTS
+from potodo.tree import percent_translated
+from potodo.walk import IgnoreMatcher
+from potodo.walk import select_po_files
+
+if TYPE_CHECKING:
+    from potodo.cache import SharedStatsStore
+
+HISTORY_SCHEMA_VERSION = 2
+
+
+class HistoryPoint(NamedTuple):
+    commit: str
+    # Commit time, as a UNIX timestamp
+    time: int
+    # Counts of the directories changed by the commit, as posix paths
+    # relative to the repository, "." being the whole repository
+    directories: Dict[str, PoCounts]
+
+    @property
+    def date(self) -> datetime:
+        return datetime.fromtimestamp(self.time, timezone.utc)
+
+
+def history_database_path(repo_path: Path) -> Path:
+    return repo_path / ".potodo" / "history.sqlite"
+
+
+def _add(first: PoCounts, second: PoCounts, sign: int = 1) -> PoCounts:
+    return PoCounts(*(a + sign * b for a, b in zip(first, second)))
+
+
+class HistoryDatabase:
+    """The progress of a repository at each commit changing its `.po` files,
+    and the state of the history read so far: the commits it was read from
+    and to, the exclusion rules, and the files at the last commit."""
+
+    def __init__(self, repo_path: Path):
+        path = history_database_path(repo_path)
+        path.parent.mkdir(exist_ok=True)
+        import sqlite3
+
+        self.connection = sqlite3.connect(str(path), timeout=30)
+        (user_version,) = self.connection.execute("PRAGMA user_version").fetchone()
+        if user_version != HISTORY_SCHEMA_VERSION:
+            logging.info("History schema is missing or outdated, creating it.")
+            with self.connection:
+                self.connection.executescript(f"""
+                    DROP TABLE IF EXISTS state;
+                    DROP TABLE IF EXISTS files;
+                    DROP TABLE IF EXISTS progress;
+                    CREATE TABLE state (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL
+                    );
+                    CREATE TABLE files (
+                        path TEXT PRIMARY KEY,
+                        sha TEXT NOT NULL
+                    );
+                    CREATE TABLE progress (
+                        position INTEGER NOT NULL,
+                        sha TEXT NOT NULL,
+                        time INTEGER NOT NULL,
+                        directory TEXT NOT NULL,
+                        translated INTEGER NOT NULL,
+                        fuzzy INTEGER NOT NULL,
+                        untranslated INTEGER NOT NULL,
+                        obsolete INTEGER NOT NULL,
+                        translated_words INTEGER NOT NULL,
+                        fuzzy_words INTEGER NOT NULL,
+                        untranslated_words INTEGER NOT NULL,
+                        translated_chars INTEGER NOT NULL,
+                        fuzzy_chars INTEGER NOT NULL,
+                        untranslated_chars INTEGER NOT NULL,
+                        PRIMARY KEY (position, directory)
+                    );
+                    PRAGMA user_version = {HISTORY_SCHEMA_VERSION};
+                    """)
+
+    def state(self) -> Dict[str, str]:
+        return dict(self.connection.execute("SELECT key, value FROM state"))
+
+    def files(self) -> Dict[str, str]:
+        return dict(self.connection.execute("SELECT path, sha FROM files"))
+
+    def reset(self, state: Dict[str, str]) -> None:
+        """Forgets the history read so far, to read it again with `state`."""
+        with self.connection:
+            self.connection.execute("DELETE FROM files")
+            self.connection.execute("DELETE FROM progress")
+            self.connection.execute("DELETE FROM state")
+            self.connection.executemany(
+                "INSERT INTO state VALUES (?, ?)", state.items()
+            )
+
+    def append(
+        self, points: Sequence[HistoryPoint], files: Dict[str, str], head: str
+    ) -> None:
+        """Adds the points following the stored ones, `files` being the
+        files at `head`, the last commit read."""
+        with self.connection:
+            (position,) = self.connection.execute(
+                "SELECT COALESCE(MAX(position), -1) + 1 FROM progress"
+            ).fetchone()
+            self.connection.executemany(
+                "INSERT INTO progress "
+                f"VALUES ({', '.join('?' * (4 + len(PoCounts._fields)))})",
+                [
+                    (position + index, point.commit, point.time, directory, *counts)
+                    for index, point in enumerate(points)
+                    for directory, counts in point.directories.items()
+                ],
+            )
+            self.connection.execute("DELETE FROM files")
+            self.connection.executemany(
+                "INSERT INTO files VALUES (?, ?)", files.items()
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO state VALUES ('head', ?)", (head,)
+            )
+
+    def points(self, directory: Optional[str] = None) -> List[HistoryPoint]:
+        """The stored points, oldest first, only those changing `directory`
+        if given."""
+        query = "SELECT position, sha, time, directory, "
+        query += f"{COUNTS_COLUMNS} FROM progress"
+        parameters: List[str] = []
+        if directory is not None:
+            query += " WHERE directory = ?"
+            parameters.append(directory)
+        points: List[HistoryPoint] = []
+        last_position = None
+        for position, sha, time, row_directory, *counts in self.connection.execute(
+            query + " ORDER BY position, directory", parameters
+        ):
+            if position != last_position:
+                points.append(HistoryPoint(sha, time, {}))
+                last_position = position
+            points[-1].directories[row_directory] = PoCounts(*counts)
+        return points
+
+    def commits(self) -> int:
+        (commits,) = self.connection.execute(
+            "SELECT COUNT(DISTINCT position) FROM progress"
+        ).fetchone()
+        return cast(int, commits)
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def blob_counts(
+    repo_path: Path, shas: Iterable[str], store: Optional["SharedStatsStore"] = None
+) -> Dict[str, PoCounts]:
+    """Counts the entries of the given blobs, only reading and parsing those
+    unknown to the shared cache, then storing their counts in it."""
+    from potodo.git import git_read_blobs
+
+    wanted = sorted(set(shas))
+    counts = store.lookup(wanted) if store is not None else {}
+    missing = [sha for sha in wanted if sha not in counts]
+    logging.debug("Parsing %s of %s blobs", len(missing), len(wanted))
+    parsed = {
+        sha: scan_po_lines(data.splitlines())
+        for sha, data in git_read_blobs(repo_path, missing)
+    }
+    if store is not None:
+        store.store_counts(parsed)
+    counts.update(parsed)
+    return counts
+
+
+def _rules_key(ignore_matches: IgnoreMatcher) -> str:
+    """Identifies the exclusion rules, to read the history again when they
+    change."""
+    return json.dumps(
+        [
+            (rule.regex, rule.negation, rule.directory_only)
+            for rule in ignore_matches.rules
+        ]
+    )
+
+
+def update_history(
+    repo_path: Path,
+    since: Optional[str],
+    ignore_matches: IgnoreMatcher,
+    database: HistoryDatabase,
+    shared_cache: bool = True,
+) -> None:
+    """Reads the commits of the first-parent history of HEAD since `since`
+    which weren't read yet, storing their progress in `database`.
+
+    The history is read again from the start when `since`, or the exclusion
+    rules changed, or when HEAD doesn't follow the last commit read.
+    `since` has to be a commit id, None meaning the root commit.
+    """
+    from potodo.cache import SharedStatsStore
+    from potodo.git import git_first_parent_base
+    from potodo.git import git_po_changes
+    from potodo.git import git_tree_po_files
+
+    state = dict(since=since or "", rules=_rules_key(ignore_matches))
+    stored = database.state()
+    head = stored.get("head")
+    base = git_first_parent_base(repo_path, head or since)
+    if any(stored.get(key) != value for key, value in state.items()) or (
+        head and base != head
+    ):
+        logging.info("Reading the history from %s", since or "the root commit")
+        database.reset(state)
+        head = None
+        base = git_first_parent_base(repo_path, since)
+    files = database.files() if head else {}
+    if not head and base:
+        files = git_tree_po_files(repo_path, base)
+    commits = git_po_changes(repo_path, head or since)
+    if not commits:
+        return
+    logging.debug("Reading %s new commits", len(commits))
+
+    paths = set(files)
+    for _, _, changes in commits:
+        paths.update(changes)
+    selected = {
+        path.relative_to(repo_path).as_posix()
+        for path in select_po_files(repo_path, ignore_matches, paths)
+    }
+    files = {path: sha for path, sha in files.items() if path in selected}
+    shas = set(files.values())
+    for _, _, changes in commits:
+        shas.update(sha for path, sha in changes.items() if sha and path in selected)
+    store = SharedStatsStore() if shared_cache else None
+    try:
+        counts = blob_counts(repo_path, shas, store)
+    finally:
+        if store is not None:
+            store.close()
+
+    totals: Dict[str, PoCounts] = defaultdict(lambda: NO_COUNTS)
+    for path, sha in files.items():
+        for directory in ancestor_directories(path):
+            totals[directory] = _add(totals[directory], counts.get(sha, NO_COUNTS))
+    points = []
+    for commit, commit_time, changes in commits:
+        changed = set()
+        for path, new_sha in changes.items():
+            if path not in selected:
+                continue
+            old_sha = files.pop(path, None)
+            old_counts = counts.get(old_sha, NO_COUNTS) if old_sha else NO_COUNTS
+            new_counts = counts.get(new_sha, NO_COUNTS) if new_sha else NO_COUNTS
+            if new_sha:
+                files[path] = new_sha
+            for directory in ancestor_directories(path):
+                totals[directory] = _add(
+                    _add(totals[directory], old_counts, -1), new_counts
+                )
+                changed.add(directory)
+        if changed:
+            points.append(
+                HistoryPoint(
+                    commit,
+                    commit_time,
+                    {directory: totals[directory] for directory in sorted(changed)},
+                )
+            )
+    database.append(points, files, commits[-1][0])
+
+
+def print_history(
+    points: Sequence[HistoryPoint], directory: Optional[str], json_format: bool
+) -> None:
+    """Prints the progress of `directory`, or of the whole repository, at
+    each point, or the progress of every directory as JSON."""
+    if json_format:
+        print(
+            json.dumps(
+                [
+                    dict(
+                        commit=point.commit,
+                        date=point.date.isoformat(),
+                        directories={
+                            name: counts_record(counts)
+                            for name, counts in point.directories.items()
+                        },
+                    )
+                    for point in points
+                ],
+                indent=4,
+            )
+        )
+        return
+    name = directory or "."
+    print(f"# Progress of {name}\n")
+    for point in points:
+        if name not in point.directories:
+            continue
+        counts = point.directories[name]
+        entries = counts.translated + counts.fuzzy + counts.untranslated
+        print(
+            f"{point.date:%Y-%m-%d}  {point.commit[:10]}  "
+            f"{percent_translated(counts):6.2f}%  "
+            f"{counts.translated}/{entries} translated, {counts.fuzzy} fuzzy"
+        )
+
+
+def history(
+    repo_path: Path,
+    since: Optional[str],
+    exclude: List[str],
+    directory: Optional[str] = None,
+    json_format: bool = False,
+    rebuild: bool = False,
+    shared_cache: bool = True,
+) -> None:
+    from potodo.git import git_rev_parse
+    from potodo.potodo import build_ignore_matcher
+
+    if git_rev_parse(repo_path, "HEAD") is None:
+        print(f"Potodo: {repo_path} isn't a git repository with commits.")
+        exit(1)
+    since_sha = None
+    if since:
+        since_sha = git_rev_parse(repo_path, since)
+        if since_sha is None:
+            print(f"Potodo: Unknown revision {since!r}.")
+            exit(1)
+    if rebuild and history_database_path(repo_path).exists():
+        os.remove(str(history_database_path(repo_path)))
+    database = HistoryDatabase(repo_path)
+    try:
+        update_history(
+            repo_path,
+            since_sha,
+            build_ignore_matcher(repo_path, exclude),
+            database,
+            shared_cache,
+        )
+        points = database.points(directory)
+    finally:
+        database.close()
+    print_history(points, directory, json_format)
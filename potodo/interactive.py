@@ -1,11 +1,16 @@
 import webbrowser
 from pathlib import Path
-from typing import Callable
 from typing import cast
 from typing import List
+from typing import Mapping
 
 from simple_term_menu import TerminalMenu
 
+from potodo.po_file import PoFileStats
+from potodo.tree import add_counts
+from potodo.tree import NO_COUNTS
+from potodo.tree import percent_translated
+
 IS_CURSOR_CYCLING = True
 IS_SCREEN_CLEARED = True
 
@@ -60,43 +65,58 @@ def _confirmation_menu(choosen_file: str, directory: str) -> int:
     return cast(int, choice)
 
 
-def get_dir_list(repo_path: Path, ignore_matches: Callable[[str], bool]) -> List[str]:
-    return list(
-        set(
-            [
-                file.parent.name
-                for file in repo_path.rglob("*.po")
-                if not ignore_matches(str(file))
-            ]
-        )
+def directory_label(directory: str, po_files: List[PoFileStats]) -> str:
+    """Menu entry of a directory: its name, completion and fuzzy count."""
+    counts = NO_COUNTS
+    for po_file in po_files:
+        counts = add_counts(counts, po_file.counts)
+    return (
+        f"{directory} ({percent_translated(counts):.2f}% done, "
+        f"{counts.fuzzy} fuzzy)"
     )
 
 
-def get_files_from_dir(
-    directory: str, repo_path: Path, ignore_matches: Callable[[str], bool]
-) -> List[str]:
-    path = Path(str(repo_path) + "/" + directory)
-    return [file.name for file in path.rglob("*.po") if not ignore_matches(str(file))]
+def file_label(po_file: PoFileStats) -> str:
+    """Menu entry of a file: its name, completion and fuzzy count."""
+    return (
+        f"{po_file.filename} ({po_file.translated_nb} / {po_file.po_file_size}, "
+        f"{po_file.percent_translated}% translated, {po_file.fuzzy_nb} fuzzy)"
+    )
 
 
-def interactive_output(path: Path, ignore_matches: Callable[[str], bool]) -> None:
-    directory_options = get_dir_list(repo_path=path, ignore_matches=ignore_matches)
+def interactive_output(
+    repo_path: Path, po_files: Mapping[str, List[PoFileStats]]
+) -> None:
+    """Lets the user pick a file to work on, through menus built once from
+    the stats of the po files, given by directory as by
+    get_po_stats_from_repo_or_cache."""
+    directories = sorted(po_files)
+    directory_files = {
+        directory: sorted(po_files[directory]) for directory in directories
+    }
+    directory_options = [
+        directory_label(directory, directory_files[directory])
+        for directory in directories
+    ]
+    file_options = {
+        directory: [file_label(po_file) for po_file in files]
+        for directory, files in directory_files.items()
+    }
     while True:
         selected_dir = _directory_list_menu(directory_options)
         if selected_dir == (len(directory_options) - 1):
             exit(0)
-        directory = directory_options[selected_dir]
-        file_options = get_files_from_dir(
-            directory=directory, repo_path=path, ignore_matches=ignore_matches
-        )
-        # TODO: Add stats on files and also add reservations
-        selected_file = _file_list_menu(directory, file_options)
-        if selected_file == (len(file_options) + 1):
+        directory = directories[selected_dir]
+        files = directory_files[directory]
+        # Files at the root are named after the repository, as dir/file
+        name = repo_path.name if directory == "." else directory
+        selected_file = _file_list_menu(name, file_options[directory])
+        if selected_file == (len(files) + 1):
             exit(0)
-        elif selected_file == len(file_options):
+        elif selected_file == len(files):
             continue
-        file = file_options[selected_file]
-        final_choice = _confirmation_menu(file, directory)
+        file = files[selected_file].filename
+        final_choice = _confirmation_menu(file, name)
         if final_choice == 3:
             exit(0)
         elif final_choice == 2:
@@ -106,7 +126,7 @@ def interactive_output(path: Path, ignore_matches: Callable[[str], bool]) -> Non
     if final_choice == 0:
         webbrowser.open(
             f"https://github.com/python/python-docs-fr/issues/new?title=Je%20travaille%20sur%20"
-            f"{directory}/{file}"
+            f"{name}/{file}"
             f"&body=%0A%0A%0A---%0AThis+issue+was+created+using+potodo+interactive+mode."
         )
     else:
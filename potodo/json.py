@@ -1,8 +1,52 @@
+import json
+import sys
 from datetime import date
+from typing import Any
+from typing import Dict
 from typing import Optional
 
+from potodo.scanner import PoCounts
+from potodo.tree import percent_translated
+
 
 def json_dateconv(o: object) -> Optional[str]:
     if isinstance(o, date):
         return o.__str__()
     return None
+
+
+def print_ndjson(record_type: str, **fields: Any) -> None:
+    """Prints a record of the NDJSON output on its own line, `type` first."""
+    sys.stdout.write(
+        json.dumps(
+            dict(type=record_type, **fields),
+            separators=(",", ":"),
+            default=json_dateconv,
+        )
+        + "\n"
+    )
+
+
+def text_size_record(counts: PoCounts) -> Dict[str, int]:
+    """Words and characters of the msgids, in all, fuzzy and translated
+    entries, following the keys of the entries counts."""
+    return dict(
+        words=sum(counts.measure("words")),
+        fuzzy_words=counts.fuzzy_words,
+        translated_words=counts.translated_words,
+        chars=sum(counts.measure("chars")),
+        fuzzy_chars=counts.fuzzy_chars,
+        translated_chars=counts.translated_chars,
+    )
+
+
+def counts_record(counts: PoCounts, unit: str = "entries") -> Dict[str, Any]:
+    """Entries counts of a directory or of the whole repository,
+    with the keys used for files in the JSON output."""
+    return dict(
+        entries=counts.translated + counts.fuzzy + counts.untranslated,
+        fuzzies=counts.fuzzy,
+        translated=counts.translated,
+        percent_translated=float(f"{percent_translated(counts, unit):.2f}"),
+        **text_size_record(counts),
+    )
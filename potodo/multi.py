@@ -0,0 +1,341 @@
+"""Reports about several repositories at once, like the translations of a
+project in several languages, followed by a comparison of their files.
+
+The repositories are read concurrently: their reservations are fetched and
+their directories walked in threads, and their files parsed by a single
+pool of processes.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from potodo.json import json_dateconv
+from potodo.json import print_ndjson
+from potodo.po_file import PoFileStats
+from potodo.timings import phase
+from potodo.tree import percent_translated
+
+
+class Repository(NamedTuple):
+    path: Path
+    # URL of the issues where its files are reserved, see --api-url
+    api_url: Optional[str] = None
+
+
+def read_manifest(manifest_path: Path) -> List[Repository]:
+    """Reads the repositories listed in a manifest: one per line, as its
+    path, relative to the manifest, optionally followed by the API URL of its
+    reservations. Empty lines and lines starting with # are skipped."""
+    repositories = []
+    for line in manifest_path.read_text().splitlines():
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        path, _, api_url = line.strip().partition(" ")
+        repositories.append(
+            Repository((manifest_path.parent / path).resolve(), api_url.strip() or None)
+        )
+    return repositories
+
+
+def repository_labels(repositories: Sequence[Repository]) -> List[str]:
+    """Names of the repositories: the name of their directory, or their
+    whole path when several have the same name."""
+    names = [repository.path.name for repository in repositories]
+    return [
+        str(repository.path) if names.count(name) > 1 else name
+        for repository, name in zip(repositories, names)
+    ]
+
+
+def read_repositories(
+    repositories: Sequence[Repository],
+    exclude: List[str],
+    hide_reserved: bool,
+    no_cache: bool,
+    jobs: Optional[int] = None,
+    engine: str = "scan",
+    cache_backend: str = "pickle",
+    no_shared_cache: bool = False,
+    reservations_max_age: float = 0.0,
+    stale_reservations: bool = False,
+    use_git: bool = False,
+) -> List[Tuple[List[PoFileStats], Dict[str, Tuple[Any, Any]]]]:
+    """Gets the stats of the po files, and the reservations, of each
+    repository, reading them all concurrently."""
+    from concurrent.futures import Executor
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures import ThreadPoolExecutor
+
+    from potodo.forge_api import get_issue_reservations
+    from potodo.po_file import get_po_stats_from_repo_or_cache
+    from potodo.potodo import build_ignore_matcher
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    workers: Optional[Executor] = None
+    if jobs > 1:
+        try:
+            workers = ProcessPoolExecutor(max_workers=jobs)
+        except (OSError, NotImplementedError):
+            # Each repository is then parsed on its own, see parse_po_files
+            pass
+
+    def read_stats(repository: Repository) -> List[PoFileStats]:
+        with phase("stats"):
+            po_files = get_po_stats_from_repo_or_cache(
+                repository.path,
+                build_ignore_matcher(repository.path, exclude),
+                no_cache,
+                jobs,
+                engine,
+                cache_backend,
+                not no_shared_cache,
+                use_git,
+                workers,
+            )
+        return [po_file for files in po_files.values() for po_file in files]
+
+    def read_reservations(repository: Repository) -> Dict[str, Tuple[Any, Any]]:
+        if not repository.api_url:
+            return {}
+        with phase("reservations"):
+            return get_issue_reservations(
+                hide_reserved,
+                repository.api_url,
+                None if no_cache else repository.path,
+                reservations_max_age,
+                stale_reservations,
+            )
+
+    try:
+        with ThreadPoolExecutor(2 * len(repositories)) as threads:
+            # Reservations are requested first, to wait for the forges while
+            # the repositories are read
+            reservations = [
+                threads.submit(read_reservations, repository)
+                for repository in repositories
+            ]
+            stats = [
+                threads.submit(read_stats, repository) for repository in repositories
+            ]
+            return [
+                (po_files.result(), repository_reservations.result())
+                for po_files, repository_reservations in zip(stats, reservations)
+            ]
+    finally:
+        if workers is not None:
+            workers.shutdown()
+
+
+def comparison_matrix(
+    repositories: Sequence[Repository],
+    po_files: Sequence[List[PoFileStats]],
+    selected: Sequence[List[Path]],
+    unit: str = "entries",
+) -> List[Tuple[str, List[Optional[int]]]]:
+    """Compares the files selected in any repository with the files at the
+    same place in the others: gives the path of each of them, relative to
+    the repositories, and the percentage of it translated in each repository
+    (None when missing), in `unit`."""
+    percents = [
+        {
+            po_file.path.relative_to(repository.path).as_posix(): int(
+                percent_translated(po_file.counts, unit)
+            )
+            for po_file in files
+        }
+        for repository, files in zip(repositories, po_files)
+    ]
+    rows = sorted(
+        {
+            path.relative_to(repository.path).as_posix()
+            for repository, paths in zip(repositories, selected)
+            for path in paths
+        }
+    )
+    return [
+        (path, [repository_percents.get(path) for repository_percents in percents])
+        for path in rows
+    ]
+
+
+def print_comparison(
+    labels: Sequence[str], matrix: List[Tuple[str, List[Optional[int]]]]
+) -> None:
+    print("\n\n# Comparison (% translated)\n")
+    path_width = max([len(path) for path, _ in matrix] + [4])
+    widths = [max(len(label), 5) for label in labels]
+    header = "".join(f"  {label:>{width}}" for label, width in zip(labels, widths))
+    print(f"{'file':<{path_width}}{header}")
+    for path, percents in matrix:
+        cells = "".join(
+            f"  {'-' if percent is None else f'{percent}%':>{width}}"
+            for percent, width in zip(percents, widths)
+        )
+        print(f"{path:<{path_width}}{cells}")
+
+
+def multi_repository_output(
+    repositories: Sequence[Repository],
+    exclude: List[str],
+    above: int,
+    below: int,
+    only_fuzzy: bool,
+    hide_reserved: bool,
+    counts: bool,
+    json_format: bool,
+    exclude_fuzzy: bool,
+    exclude_reserved: bool,
+    only_reserved: bool,
+    show_reservation_dates: bool,
+    no_cache: bool,
+    matching_files: bool,
+    jobs: Optional[int] = None,
+    engine: str = "scan",
+    cache_backend: str = "pickle",
+    no_shared_cache: bool = False,
+    depth: Optional[int] = None,
+    output_format: str = "text",
+    reservations_max_age: float = 0.0,
+    stale_reservations: bool = False,
+    use_git: bool = False,
+    unit: str = "entries",
+) -> None:
+    """Prints the report of each repository, then compares their files."""
+    from potodo.api import select_files
+    from potodo.potodo import add_dir_stats
+    from potodo.potodo import iter_directory_reports
+    from potodo.potodo import print_report
+    from potodo.tree import build_tree
+
+    read = read_repositories(
+        repositories,
+        exclude,
+        hide_reserved,
+        no_cache,
+        jobs,
+        engine,
+        cache_backend,
+        no_shared_cache,
+        reservations_max_age,
+        stale_reservations,
+        use_git,
+    )
+    labels = repository_labels(repositories)
+    if json_format:
+        output_format = "json"
+    json_repositories = []
+    selected = []
+    for repository, label, (po_files, issue_reservations) in zip(
+        repositories, labels, read
+    ):
+        filters = (
+            above,
+            below,
+            only_fuzzy,
+            exclude_fuzzy,
+            exclude_reserved,
+            only_reserved,
+            unit,
+        )
+        selected.append(
+            [
+                file_result.path
+                for file_result in select_files(
+                    po_files, repository.path, issue_reservations, *filters
+                )
+            ]
+        )
+        if output_format == "json":
+            dir_stats: List[Any] = []
+            for directory_name, group, buffer, printed_list in iter_directory_reports(
+                repository.path,
+                build_tree(po_files, repository.path),
+                issue_reservations,
+                above,
+                below,
+                only_fuzzy,
+                counts,
+                True,
+                exclude_fuzzy,
+                exclude_reserved,
+                only_reserved,
+                show_reservation_dates,
+                False,
+                depth,
+                unit,
+            ):
+                add_dir_stats(
+                    directory_name,
+                    buffer,
+                    percent_translated(group.counts, unit),
+                    printed_list,
+                    dir_stats,
+                )
+            json_repositories.append(
+                dict(name=label, path=str(repository.path), directories=dir_stats)
+            )
+            continue
+        if output_format == "ndjson":
+            print_ndjson("repository", name=label, path=str(repository.path))
+        elif not matching_files:
+            print(f"\n\n# == {label} ({repository.path}) ==")
+        with phase("render"):
+            print_report(
+                repository.path,
+                po_files,
+                issue_reservations,
+                above,
+                below,
+                only_fuzzy,
+                counts,
+                False,
+                exclude_fuzzy,
+                exclude_reserved,
+                only_reserved,
+                show_reservation_dates,
+                matching_files,
+                depth,
+                output_format,
+                unit,
+            )
+
+    if matching_files:
+        return
+    matrix = comparison_matrix(
+        repositories, [po_files for po_files, _ in read], selected, unit
+    )
+    if output_format == "json":
+        print(
+            json.dumps(
+                dict(
+                    repositories=json_repositories,
+                    comparison=[
+                        dict(path=path, percent_translated=dict(zip(labels, percents)))
+                        for path, percents in matrix
+                    ],
+                ),
+                indent=4,
+                separators=(",", ": "),
+                default=json_dateconv,
+            )
+        )
+    elif output_format == "ndjson":
+        for path, percents in matrix:
+            print_ndjson(
+                "comparison",
+                path=path,
+                percent_translated=dict(zip(labels, percents)),
+            )
+        sys.stdout.flush()
+    else:
+        print_comparison(labels, matrix)
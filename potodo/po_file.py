@@ -1,58 +1,186 @@
+import hashlib
 import itertools
 import logging
 import os
+import time
 from pathlib import Path
 from typing import Callable
 from typing import Dict
 from typing import List
 from typing import Mapping
+from typing import Optional
 from typing import Sequence
-from typing import Set
+from typing import Tuple
+from typing import TYPE_CHECKING
 
-import polib
+from potodo.scanner import PoCounts
+from potodo.scanner import polib_po_counts
+from potodo.scanner import scan_po_lines
+from potodo.timings import count
+from potodo.timings import phase
+from potodo.timings import record_parse
+from potodo.walk import select_po_files
+from potodo.walk import walk_po_files
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+    from potodo.cache import SharedStatsStore
+
+# Path, size, mtime_ns, sha, then the fields of PoCounts
+_State = Tuple[str, int, int, str, int, int, int, int, int, int, int, int, int, int]
+
+
+def content_hash(data: bytes) -> str:
+    """Hashes a file content the way git hashes blobs."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def get_po_counts(path: Path, data: bytes, engine: str = "scan") -> PoCounts:
+    """Counts the entries of a `.po` file, whose content is `data`,
+    using the given engine."""
+    if engine == "polib":
+        return polib_po_counts(path)
+    counts = scan_po_lines(data.splitlines())
+    if engine == "verify":
+        reference = polib_po_counts(path)
+        if counts != reference:
+            logging.warning(
+                "Scanner and polib disagree on %s: %s != %s", path, counts, reference
+            )
+            return reference
+    return counts
 
 
 class PoFileStats:
-    """Class for each `.po` file containing all the necessary information about its progress"""  # noqa
+    """Class for each `.po` file containing all the necessary information about its progress
+
+    Only the entry counters are kept, so instances stay small in memory
+    and in the cache, however big the file is.
+    """  # noqa
+
+    __slots__ = (
+        "path",
+        "size",
+        "mtime_ns",
+        "sha",
+        "translated_nb",
+        "fuzzy_nb",
+        "untranslated_nb",
+        "obsolete_nb",
+        "translated_words",
+        "fuzzy_words",
+        "untranslated_words",
+        "translated_chars",
+        "fuzzy_chars",
+        "untranslated_chars",
+    )
+
+    def __init__(self, path: Path, engine: str = "scan"):
+        """Initializes the class with all the correct information
+
+        `engine` selects how the file is read: "scan" counts the entries in
+        a single pass, "polib" uses polib, and "verify" does both and warns
+        when they disagree, trusting polib.
+        """
+        stat = path.stat()
+        data = path.read_bytes()
+        self._set(
+            path,
+            stat.st_size,
+            stat.st_mtime_ns,
+            content_hash(data),
+            get_po_counts(path, data, engine),
+        )
+
+    @classmethod
+    def from_counts(
+        cls, path: Path, size: int, mtime_ns: int, sha: str, counts: PoCounts
+    ) -> "PoFileStats":
+        """Builds stats from already known counts, without reading the file."""
+        stats = cls.__new__(cls)
+        stats._set(path, size, mtime_ns, sha, counts)
+        return stats
 
-    def __init__(self, path: Path):
-        """Initializes the class with all the correct information"""
+    def _set(
+        self, path: Path, size: int, mtime_ns: int, sha: str, counts: PoCounts
+    ) -> None:
         self.path: Path = path
-        self.filename: str = path.name
-        self.mtime = os.path.getmtime(path)
-        self.pofile: polib.POFile = polib.pofile(str(self.path))
-        self.directory: str = self.path.parent.name
-
-        self.obsolete_entries: Sequence[polib.POEntry] = self.pofile.obsolete_entries()
-        self.obsolete_nb: int = len(self.pofile.obsolete_entries())
-
-        self.fuzzy_entries: List[polib.POEntry] = [
-            entry for entry in self.pofile if entry.fuzzy and not entry.obsolete
-        ]
-        self.fuzzy_nb: int = len(self.fuzzy_entries)
-
-        self.translated_entries: Sequence[
-            polib.POEntry
-        ] = self.pofile.translated_entries()
-        self.translated_nb: int = len(self.translated_entries)
-
-        self.untranslated_entries: Sequence[
-            polib.POEntry
-        ] = self.pofile.untranslated_entries()
-        self.untranslated_nb: int = len(self.untranslated_entries)
-
-        self.entries_count: int = len([e for e in self.pofile if not e.obsolete])
-        self.percent_translated: int = self.pofile.percent_translated()
-        self.po_file_size = len(self.pofile) - self.obsolete_nb
-        self.filename_dir: str = self.directory + "/" + self.filename
+        self.size: int = size
+        self.mtime_ns: int = mtime_ns
+        self.sha: str = sha
+        self.translated_nb: int = counts.translated
+        self.fuzzy_nb: int = counts.fuzzy
+        self.untranslated_nb: int = counts.untranslated
+        self.obsolete_nb: int = counts.obsolete
+        self.translated_words: int = counts.translated_words
+        self.fuzzy_words: int = counts.fuzzy_words
+        self.untranslated_words: int = counts.untranslated_words
+        self.translated_chars: int = counts.translated_chars
+        self.fuzzy_chars: int = counts.fuzzy_chars
+        self.untranslated_chars: int = counts.untranslated_chars
+
+    def is_up_to_date(self, stat: os.stat_result) -> bool:
+        """Tells if the file, as currently stat'ed, is the one counted."""
+        return stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns
+
+    @property
+    def counts(self) -> PoCounts:
+        return PoCounts(
+            self.translated_nb,
+            self.fuzzy_nb,
+            self.untranslated_nb,
+            self.obsolete_nb,
+            self.translated_words,
+            self.fuzzy_words,
+            self.untranslated_words,
+            self.translated_chars,
+            self.fuzzy_chars,
+            self.untranslated_chars,
+        )
+
+    def __getstate__(self) -> _State:
+        """Pickled as a plain tuple, to keep the cache compact."""
+        return (str(self.path), self.size, self.mtime_ns, self.sha, *self.counts)
+
+    def __setstate__(self, state: _State) -> None:
+        path, size, mtime_ns, sha, *counts = state
+        self._set(Path(path), size, mtime_ns, sha, PoCounts(*counts))
+
+    @property
+    def filename(self) -> str:
+        return self.path.name
+
+    @property
+    def directory(self) -> str:
+        return self.path.parent.name
+
+    @property
+    def filename_dir(self) -> str:
+        return self.directory + "/" + self.filename
+
+    @property
+    def entries_count(self) -> int:
+        """Number of entries, obsolete ones excluded."""
+        return self.translated_nb + self.fuzzy_nb + self.untranslated_nb
+
+    @property
+    def po_file_size(self) -> int:
+        return self.entries_count
+
+    @property
+    def percent_translated(self) -> int:
+        if self.entries_count == 0:
+            return 100
+        return int(self.translated_nb * 100 / float(self.entries_count))
 
     def __str__(self) -> str:
         return (
             f"Filename: {self.filename}\n"
-            f"Fuzzy Entries: {self.fuzzy_entries}\n"
+            f"Fuzzy Entries: {self.fuzzy_nb}\n"
             f"Percent Translated: {self.percent_translated}\n"
-            f"Translated Entries: {self.translated_entries}\n"
-            f"Untranslated Entries: {self.untranslated_entries}"
+            f"Translated Entries: {self.translated_nb}\n"
+            f"Untranslated Entries: {self.untranslated_nb}"
         )
 
     def __lt__(self, other: "PoFileStats") -> bool:
@@ -60,65 +188,250 @@ class PoFileStats:
         return self.filename < other.filename
 
 
-from potodo.cache import get_cache_file_content  # noqa
-from potodo.cache import set_cache_content  # noqa
+# Below this number of files to parse, starting worker processes
+# costs more than it saves, so parsing is done serially.
+POOL_MIN_FILES = 32
+
+
+def _timed_po_file_stats(path: Path, engine: str) -> Tuple[PoFileStats, float]:
+    """Builds a PoFileStats, also giving the seconds it took."""
+    start = time.perf_counter()
+    return PoFileStats(path, engine), time.perf_counter() - start
+
+
+def parse_po_files(
+    paths: Sequence[Path],
+    jobs: Optional[int] = None,
+    engine: str = "scan",
+    executor: Optional["Executor"] = None,
+    on_parsed: Optional[Callable[[PoFileStats], None]] = None,
+) -> List[PoFileStats]:
+    """Builds a PoFileStats for each of the given paths, in the same order.
+
+    Up to `jobs` worker processes are used (defaulting to the number of
+    CPUs), falling back to a serial parse for a single job, for a small
+    number of files, or when processes can't be started. The processes of
+    `executor` are used if given, instead of starting new ones, so several
+    parses can share them. `on_parsed` is called with each of them as soon
+    as it's parsed.
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(paths))
+    results: List[PoFileStats] = []
+
+    def add(po_file: PoFileStats, seconds: float) -> None:
+        record_parse(po_file.path, seconds)
+        count("bytes_parsed", po_file.size)
+        results.append(po_file)
+        if on_parsed is not None:
+            on_parsed(po_file)
+
+    if jobs > 1 and len(paths) >= POOL_MIN_FILES:
+        from concurrent.futures import ProcessPoolExecutor
+
+        def parse_with(pool: "Executor") -> None:
+            for po_file, seconds in pool.map(
+                _timed_po_file_stats,
+                paths,
+                itertools.repeat(engine),
+                chunksize=max(1, len(paths) // (jobs * 4)),
+            ):
+                add(po_file, seconds)
+
+        logging.debug("Parsing %s files using %s processes", len(paths), jobs)
+        try:
+            if executor is not None:
+                parse_with(executor)
+            else:
+                with ProcessPoolExecutor(max_workers=jobs) as pool:
+                    parse_with(pool)
+        except (OSError, NotImplementedError) as err:
+            # Some platforms can't provide the primitives a pool needs
+            logging.warning("Can't use a process pool (%s), parsing serially", err)
+    # Files are given in order, so those left are the last ones
+    done = len(results)
+    remaining = paths[done:]
+    if remaining:
+        logging.debug("Parsing %s files serially", len(remaining))
+    for path in remaining:
+        add(*_timed_po_file_stats(path, engine))
+    return results
+
+
+def lookup_shared_store(
+    repo_path: Path,
+    po_files: List[Path],
+    store: "SharedStatsStore",
+    index_shas: Optional[Dict[Path, str]] = None,
+) -> Tuple[List[PoFileStats], List[Path]]:
+    """Looks the given files up by content in the shared store.
+
+    Their content hash is taken from the git index when possible, else
+    they're hashed. The blob ids of the files are read from the index
+    unless given in `index_shas`. Returns the stats found, and the files
+    still to parse.
+    """
+    if index_shas is None:
+        from potodo.git import git_blob_shas
+
+        index_shas = git_blob_shas(repo_path)
+    shas = {}
+    for po_file in po_files:
+        sha = index_shas.get(po_file)
+        if not sha:
+            data = po_file.read_bytes()
+            count("bytes_hashed", len(data))
+            sha = content_hash(data)
+        shas[po_file] = sha
+    known_counts = store.lookup(list(set(shas.values())))
+    found = []
+    missing = []
+    for po_file in po_files:
+        counts = known_counts.get(shas[po_file])
+        if counts is None:
+            missing.append(po_file)
+        else:
+            stat = po_file.stat()
+            found.append(
+                PoFileStats.from_counts(
+                    po_file, stat.st_size, stat.st_mtime_ns, shas[po_file], counts
+                )
+            )
+    logging.debug("Found %s files in the shared cache", len(found))
+    return found, missing
 
 
 def get_po_stats_from_repo_or_cache(
     repo_path: Path,
     ignore_matches: Callable[[str], bool],
     no_cache: bool = False,
+    jobs: Optional[int] = None,
+    engine: str = "scan",
+    cache_backend: str = "pickle",
+    shared_cache: bool = True,
+    use_git: bool = False,
+    executor: Optional["Executor"] = None,
+    on_listed: Optional[Callable[[List[Path]], None]] = None,
+    on_ready: Optional[Callable[[PoFileStats], None]] = None,
 ) -> Mapping[str, List[PoFileStats]]:
     """Gets all the po files recursively from 'repo_path'
     and cache if no_cache is set to False, excluding those if ignore_matches match them.
-    Return a dict with all directories and PoFile instances of
-    `.po` files in those directories.
+    Files missing from the cache are parsed using up to `jobs` processes,
+    with the given `engine` (see PoFileStats). The cache is stored using
+    `cache_backend`, either "pickle" or "sqlite". Unless `shared_cache` is
+    False, files missing from it are looked up by content in the cache shared
+    by all repositories, before being parsed.
+    With `use_git`, the files are listed by git instead of walking the file
+    system, so those ignored by git are left out, and the cached stats of
+    the files unmodified since they were staged are used when they're for
+    the same blob, without stat'ing them. Outside of a git repository, the
+    file system is walked.
+    Files are parsed using the processes of `executor` if given, see
+    parse_po_files.
+    `on_listed` is called with the files once they're listed, then
+    `on_ready` with the stats of each of them as soon as they're found in
+    a cache or parsed, so they can be reported without waiting for the
+    others.
+    Return a dict with all directories, as posix paths relative to
+    `repo_path` ("." for itself), and PoFile instances of `.po` files in
+    those directories.
     """
 
     # Get all the files matching `**/*.po`
     # not being in the exclusion list or in
     # any (sub)folder from the exclusion list
-    logging.debug("Finding all files matching **/*.po in %s", repo_path)
-    all_po_files: List[Path] = [
-        file for file in repo_path.rglob("*.po") if not ignore_matches(str(file))
-    ]
+    index_shas: Dict[Path, str] = {}
+    git_files = None
+    if use_git:
+        from potodo.git import git_po_files
 
-    # Group files by directory
-    logging.debug("Grouping files per directory")
-    po_files_per_directory: Mapping[str, Set[Path]] = {
-        name: set(files)
-        # We assume the output of rglob to be sorted,
-        # so each 'name' is unique within groupby
-        for name, files in itertools.groupby(
-            all_po_files, key=lambda path: path.parent.name
-        )
-    }
+        logging.debug("Listing the po files of %s using git", repo_path)
+        with phase("git"):
+            git_files = git_po_files(repo_path)
+        if git_files is None:
+            logging.info("Can't list the files using git, walking %s", repo_path)
+    if git_files is None:
+        logging.debug("Finding all files matching **/*.po in %s", repo_path)
+        with phase("walk"):
+            all_po_files = walk_po_files(repo_path, ignore_matches)
+    else:
+        all_po_files = select_po_files(repo_path, ignore_matches, git_files)
+        index_shas = {repo_path / path: sha for path, sha in git_files.items() if sha}
+    count("files", len(all_po_files))
+    if on_listed is not None:
+        on_listed(all_po_files)
 
+    po_files_stats: List[PoFileStats] = []
+    found: List[PoFileStats] = []
+    store: Optional["SharedStatsStore"] = None
     if no_cache:
-        # Turn paths into stat objects
         logging.debug("Creating PoFileStats objects for each file without cache")
-        po_stats_per_directory: Dict[str, List[PoFileStats]] = {
-            directory: [PoFileStats(po_file) for po_file in po_files]
-            for directory, po_files in po_files_per_directory.items()
-        }
+        to_parse: List[Path] = all_po_files
     else:
-        cached_files = get_cache_file_content(
-            path=str(repo_path.resolve()) + "/.potodo/cache.pickle",
-        )
-        po_stats_per_directory = dict()
-        for directory, po_files in po_files_per_directory.items():
-            po_stats_per_directory[directory] = []
-            for po_file in po_files:
-                cached_file = cached_files.get(po_file.resolve())
-                if not (
-                    cached_file
-                    and os.path.getmtime(po_file.resolve()) == cached_file.mtime
+        from potodo.cache import open_cache
+
+        with phase("cache lookup"):
+            cache = open_cache(repo_path, cache_backend)
+            cached_files = cache.lookup(all_po_files)
+            to_parse = []
+            for po_file in all_po_files:
+                cached_file = cached_files.get(po_file)
+                sha = index_shas.get(po_file)
+                if cached_file and (
+                    cached_file.sha == sha
+                    if sha
+                    else cached_file.is_up_to_date(po_file.stat())
                 ):
-                    cached_files[po_file.resolve()] = cached_file = PoFileStats(po_file)
-                po_stats_per_directory[directory].append(cached_file)
-        set_cache_content(
-            cached_files,
-            path=str(repo_path.resolve()) + "/.potodo/cache.pickle",
-        )
+                    po_files_stats.append(cached_file)
+                else:
+                    to_parse.append(po_file)
+        count("cache_hits", len(po_files_stats))
+        if on_ready is not None:
+            for po_file_stats in po_files_stats:
+                on_ready(po_file_stats)
+        if shared_cache and to_parse:
+            from potodo.cache import SharedStatsStore
+
+            with phase("shared cache lookup"):
+                store = SharedStatsStore()
+                found, to_parse = lookup_shared_store(
+                    repo_path, to_parse, store, index_shas if git_files else None
+                )
+            po_files_stats.extend(found)
+            count("shared_cache_hits", len(found))
+            if on_ready is not None:
+                for po_file_stats in found:
+                    on_ready(po_file_stats)
+
+    # Parse all missing files at once so they can be spread over the workers
+    logging.debug("%s files to parse", len(to_parse))
+    with phase("parse"):
+        parsed = parse_po_files(to_parse, jobs, engine, executor, on_ready)
+    po_files_stats.extend(parsed)
+    count("parsed_files", len(parsed))
 
+    if not no_cache:
+        from potodo.cache import record_cache_counters
+
+        with phase("cache store"):
+            cache.store(found + parsed)
+            cache.retain(all_po_files)
+            cache.close()
+            record_cache_counters(
+                repo_path,
+                hits=len(all_po_files) - len(found) - len(parsed),
+                misses=len(found) + len(parsed),
+            )
+            if store:
+                store.store(parsed)
+                store.close()
+
+    # Group files by directory, keyed by their path in the repository, so
+    # directories sharing a name in different places aren't mixed up
+    logging.debug("Grouping files per directory")
+    po_stats_per_directory: Dict[str, List[PoFileStats]] = {}
+    for po_file_stats in po_files_stats:
+        directory = po_file_stats.path.parent.relative_to(repo_path).as_posix()
+        po_stats_per_directory.setdefault(directory, []).append(po_file_stats)
     return po_stats_per_directory
@@ -1,29 +1,59 @@
 import argparse
+import functools
+import itertools
 import json
 import logging
+import sys
+from collections import Counter
 from pathlib import Path
 from typing import Any
 from typing import Callable
 from typing import Dict
+from typing import Iterable
+from typing import Iterator
 from typing import List
+from typing import Optional
 from typing import Sequence
 from typing import Tuple
-
-from gitignore_parser import rule_from_pattern
+from typing import TYPE_CHECKING
 
 from potodo import __version__
 from potodo.arguments_handling import check_args
-from potodo.forge_api import get_issue_reservations
+from potodo.cache import CACHE_BACKENDS
+from potodo.cache import server_info_path
+from potodo.commands import COMMANDS
+from potodo.json import counts_record
 from potodo.json import json_dateconv
+from potodo.json import print_ndjson
+from potodo.json import text_size_record
 from potodo.logging import setup_logging
-from potodo.po_file import get_po_stats_from_repo_or_cache
-from potodo.po_file import PoFileStats
+from potodo.scanner import ENGINES
+from potodo.scanner import PoCounts
+from potodo.scanner import UNITS
+from potodo.timings import enable_timings
+from potodo.timings import phase
+from potodo.timings import print_timings
+from potodo.timings import profiled
+from potodo.tree import add_counts
+from potodo.tree import build_tree
+from potodo.tree import DirectoryGroup
+from potodo.tree import DirectoryNode
+from potodo.tree import NO_COUNTS
+from potodo.tree import percent_translated
+from potodo.walk import IgnoreMatcher
+
+if TYPE_CHECKING:
+    from potodo.api import FileResult
+    from potodo.multi import Repository
+    from potodo.po_file import PoFileStats
+
+OUTPUT_FORMATS = ("text", "json", "ndjson")
 
 
 def print_dir_stats(
     directory_name: str,
     buffer: Sequence[str],
-    folder_stats: Dict[str, int],
+    folder_completion: float,
     printed_list: Sequence[bool],
 ) -> None:
     """This function prints the directory name, its stats and the buffer"""
@@ -33,9 +63,6 @@ def print_dir_stats(
         # folder stats and file(s) Each time a file is went over True
         # or False is placed in the printed_list list.  If False is
         # placed it means it doesnt need to be printed
-
-        folder_completion = 100 * folder_stats["translated"] / folder_stats["total"]
-
         print(f"\n\n# {directory_name} ({folder_completion:.2f}% done)\n")
         print("\n".join(buffer))
     logging.debug("Not printing directory %s", directory_name)
@@ -44,13 +71,12 @@ def print_dir_stats(
 def add_dir_stats(
     directory_name: str,
     buffer: List[Dict[str, str]],
-    folder_stats: Dict[str, int],
+    folder_completion: float,
     printed_list: Sequence[bool],
     all_stats: List[Dict[str, Any]],
 ) -> None:
     """Appends directory name, its stats and the buffer to stats"""
     if any(printed_list):
-        folder_completion = 100 * folder_stats["translated"] / folder_stats["total"]
         all_stats.append(
             dict(
                 name=f"{directory_name}/",
@@ -78,54 +104,380 @@ def non_interactive_output(
     matching_files: bool,
     ignore_matches: Callable[[str], bool],
     api_url: str,
+    jobs: Optional[int] = None,
+    engine: str = "scan",
+    cache_backend: str = "pickle",
+    no_shared_cache: bool = False,
+    depth: Optional[int] = None,
+    output_format: str = "text",
+    reservations_max_age: float = 0.0,
+    stale_reservations: bool = False,
+    watch: bool = False,
+    no_server: bool = False,
+    use_git: bool = False,
+    unit: str = "entries",
 ) -> None:
-    dir_stats: List[Any] = []
+    served = None
+    # Only load the client when a server may be running, it's long to import
+    if not (no_server or no_cache or watch) and server_info_path(path).exists():
+        from potodo.server import get_served_stats
+
+        with phase("server query"):
+            served = get_served_stats(path, exclude, ignore_matches, api_url)
+
     # Initialize the arguments
-    if api_url:
-        issue_reservations = get_issue_reservations(hide_reserved, api_url)
+    if served and served.reservations is not None:
+        issue_reservations = {} if hide_reserved else served.reservations
+    elif api_url:
+        from potodo.forge_api import get_issue_reservations
+
+        with phase("reservations"):
+            issue_reservations = get_issue_reservations(
+                hide_reserved,
+                api_url,
+                None if no_cache else path,
+                reservations_max_age,
+                stale_reservations,
+            )
     else:
         issue_reservations = {}
 
-    total_translated: int = 0
-    total_entries: int = 0
-    po_files_and_dirs = get_po_stats_from_repo_or_cache(path, ignore_matches, no_cache)
-    for directory_name, po_files in sorted(po_files_and_dirs.items()):
+    if watch:
+        from potodo.watch import open_watcher
+        from potodo.watch import watch_repository
+
+        # Watch before reading the files, not to miss changes made meanwhile
+        watcher = open_watcher(path, ignore_matches)
+
+    stream = None
+    if served:
+        po_files = served.po_files
+    else:
+        from potodo.po_file import get_po_stats_from_repo_or_cache
+
+        if output_format == "ndjson":
+            # Files are reported while the others are still being read
+            stream = NdjsonStream(
+                path,
+                issue_reservations,
+                above,
+                below,
+                only_fuzzy,
+                counts,
+                exclude_fuzzy,
+                exclude_reserved,
+                only_reserved,
+                show_reservation_dates,
+                matching_files,
+                depth,
+                unit,
+            )
+        with phase("stats"):
+            po_files_and_dirs = get_po_stats_from_repo_or_cache(
+                path,
+                ignore_matches,
+                no_cache,
+                jobs,
+                engine,
+                cache_backend,
+                not no_shared_cache,
+                use_git,
+                on_listed=stream.listed if stream else None,
+                on_ready=stream.ready if stream else None,
+            )
+        po_files = list(itertools.chain(*po_files_and_dirs.values()))
+    render = functools.partial(
+        print_report,
+        path,
+        issue_reservations=issue_reservations,
+        above=above,
+        below=below,
+        only_fuzzy=only_fuzzy,
+        counts=counts,
+        json_format=json_format,
+        exclude_fuzzy=exclude_fuzzy,
+        exclude_reserved=exclude_reserved,
+        only_reserved=only_reserved,
+        show_reservation_dates=show_reservation_dates,
+        matching_files=matching_files,
+        depth=depth,
+        output_format=output_format,
+        unit=unit,
+    )
+    if stream:
+        stream.finish()
+    else:
+        with phase("render"):
+            render(po_files)
+    if watch:
+        watch_repository(
+            path,
+            ignore_matches,
+            po_files,
+            render,
+            output_format != "text",
+            engine,
+            watcher,
+        )
+
+
+def iter_directory_reports(
+    path: Path,
+    tree: DirectoryNode,
+    issue_reservations: Dict[str, Tuple[Any, Any]],
+    above: int,
+    below: int,
+    only_fuzzy: bool,
+    counts: bool,
+    json_format: bool,
+    exclude_fuzzy: bool,
+    exclude_reserved: bool,
+    only_reserved: bool,
+    show_reservation_dates: bool,
+    matching_files: bool,
+    depth: Optional[int] = None,
+    unit: str = "entries",
+) -> Iterator[Tuple[str, DirectoryGroup, List[Any], List[bool]]]:
+    """Selects the files to report in each directory of the tree of the
+    repository at `path`.
+
+    Yields the name of each directory, its group of files, the buffer of
+    the files to report (see buffer_add) and whether they're printed.
+    """
+    from potodo.api import select_files
+
+    groups = list(tree.groups(depth))
+    labels = directory_labels((group.node for group in groups), path)
+    for group in sorted(groups, key=lambda group: labels[group.node.path]):
         # For each directory and files in this directory
+        directory_name = labels[group.node.path]
+        directory_path = path / group.node.path
         buffer: List[Any] = []
-        folder_stats: Dict[str, int] = {"translated": 0, "total": 0}
         printed_list: List[bool] = []
 
-        for po_file in sorted(po_files):
-            # For each file in those files from that directory
-            if not only_fuzzy or po_file.fuzzy_entries:
-                if exclude_fuzzy and po_file.fuzzy_entries:
-                    continue
-                buffer_add(
-                    buffer,
-                    folder_stats,
-                    printed_list,
-                    po_file,
-                    issue_reservations,
-                    above,
-                    below,
-                    counts,
-                    json_format,
-                    exclude_reserved,
-                    only_reserved,
-                    show_reservation_dates,
-                    matching_files,
-                )
-
-        # Once all files have been processed, print the dir and the files
-        # or store them into a dict to print them once all directories have
-        # been processed.
+        for file_result in select_files(
+            sorted(group.files),
+            path,
+            issue_reservations,
+            above,
+            below,
+            only_fuzzy,
+            exclude_fuzzy,
+            exclude_reserved,
+            only_reserved,
+            unit,
+        ):
+            buffer_add(
+                buffer,
+                printed_list,
+                file_result,
+                counts,
+                json_format,
+                show_reservation_dates,
+                matching_files,
+                directory_name,
+                file_result.path.relative_to(directory_path).as_posix(),
+                unit,
+            )
+        yield directory_name, group, buffer, printed_list
+
+
+class NdjsonStream:
+    """Prints the NDJSON records of the report while the files are read:
+    each file as soon as its stats are ready, each directory once all its
+    files are, and the total at the end.
+
+    The files have to be given to `listed` first, to know which files each
+    directory waits for, then each of them to `ready`.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        issue_reservations: Dict[str, Tuple[Any, Any]],
+        above: int,
+        below: int,
+        only_fuzzy: bool,
+        counts: bool,
+        exclude_fuzzy: bool,
+        exclude_reserved: bool,
+        only_reserved: bool,
+        show_reservation_dates: bool,
+        matching_files: bool,
+        depth: Optional[int] = None,
+        unit: str = "entries",
+    ):
+        self.path = path
+        self.issue_reservations = issue_reservations
+        self.filters = (above, below, only_fuzzy, exclude_fuzzy)
+        self.reservation_filters = (exclude_reserved, only_reserved)
+        self.counts = counts
+        self.show_reservation_dates = show_reservation_dates
+        self.matching_files = matching_files
+        self.depth = depth
+        self.unit = unit
+        # Node of the directory under which the files of each directory are
+        # reported, by directory
+        self.groups: Dict[Path, DirectoryNode] = {}
+        self.labels: Dict[str, str] = {}
+        # By group path, the number of files not ready yet, their counts,
+        # and whether any of them was printed
+        self.pending: Dict[str, int] = Counter()
+        self.group_counts: Dict[str, PoCounts] = {}
+        self.printed: Dict[str, bool] = {}
+        self.total = NO_COUNTS
+
+    def listed(self, po_files: Sequence[Path]) -> None:
+        root = DirectoryNode(".")
+        for po_file in po_files:
+            directory = po_file.parent
+            if directory not in self.groups:
+                node = root
+                for part in directory.relative_to(self.path).parts:
+                    if self.depth is not None and node.depth == self.depth:
+                        break
+                    node = node.child(part)
+                self.groups[directory] = node
+                self.group_counts[node.path] = NO_COUNTS
+                self.printed[node.path] = False
+            self.pending[self.groups[directory].path] += 1
+        self.labels = directory_labels(set(self.groups.values()), self.path)
+
+    def ready(self, po_file: "PoFileStats") -> None:
+        from potodo.api import select_files
+
+        node = self.groups[po_file.path.parent]
+        directory_name = self.labels[node.path]
+        self.total = add_counts(self.total, po_file.counts)
+        self.group_counts[node.path] = add_counts(
+            self.group_counts[node.path], po_file.counts
+        )
+        buffer: List[Any] = []
+        printed_list: List[bool] = []
+        for file_result in select_files(
+            [po_file],
+            self.path,
+            self.issue_reservations,
+            *self.filters,
+            *self.reservation_filters,
+            self.unit,
+        ):
+            buffer_add(
+                buffer,
+                printed_list,
+                file_result,
+                self.counts,
+                True,
+                self.show_reservation_dates,
+                self.matching_files,
+                directory_name,
+                file_result.path.relative_to(self.path / node.path).as_posix(),
+                self.unit,
+            )
+        for file_stats in buffer:
+            print_ndjson("file", directory=f"{directory_name}/", **file_stats)
+        self.printed[node.path] = self.printed[node.path] or any(printed_list)
+        self.pending[node.path] -= 1
+        if not self.pending[node.path] and self.printed[node.path]:
+            print_ndjson(
+                "directory",
+                name=f"{directory_name}/",
+                **counts_record(self.group_counts[node.path], self.unit),
+            )
+        sys.stdout.flush()
+
+    def finish(self) -> None:
+        print_ndjson("total", **counts_record(self.total, self.unit))
+        sys.stdout.flush()
+
+
+def print_report(
+    path: Path,
+    po_files: Iterable["PoFileStats"],
+    issue_reservations: Dict[str, Tuple[Any, Any]],
+    above: int,
+    below: int,
+    only_fuzzy: bool,
+    counts: bool,
+    json_format: bool,
+    exclude_fuzzy: bool,
+    exclude_reserved: bool,
+    only_reserved: bool,
+    show_reservation_dates: bool,
+    matching_files: bool,
+    depth: Optional[int] = None,
+    output_format: str = "text",
+    unit: str = "entries",
+) -> None:
+    """Prints the report about the given po files of the repository at `path`,
+    percentages being of their entries, or of the words or characters of
+    their msgids, depending on `unit`."""
+    if output_format == "ndjson":
+        stream = NdjsonStream(
+            path,
+            issue_reservations,
+            above,
+            below,
+            only_fuzzy,
+            counts,
+            exclude_fuzzy,
+            exclude_reserved,
+            only_reserved,
+            show_reservation_dates,
+            matching_files,
+            depth,
+            unit,
+        )
+        po_files = list(po_files)
+        stream.listed([po_file.path for po_file in po_files])
+        # All stats being there, directories are reported in the usual order
+        for po_file in sorted(
+            po_files,
+            key=lambda po_file: (
+                stream.labels[stream.groups[po_file.path.parent].path],
+                po_file.path,
+            ),
+        ):
+            stream.ready(po_file)
+        stream.finish()
+        return
+    dir_stats: List[Any] = []
+    tree = build_tree(po_files, path)
+    for directory_name, group, buffer, printed_list in iter_directory_reports(
+        path,
+        tree,
+        issue_reservations,
+        above,
+        below,
+        only_fuzzy,
+        counts,
+        json_format,
+        exclude_fuzzy,
+        exclude_reserved,
+        only_reserved,
+        show_reservation_dates,
+        matching_files,
+        depth,
+        unit,
+    ):
+        # Once all files of a directory have been processed, print the dir
+        # and the files or store them into a dict to print them once all
+        # directories have been processed.
         if json_format:
-            add_dir_stats(directory_name, buffer, folder_stats, printed_list, dir_stats)
+            add_dir_stats(
+                directory_name,
+                buffer,
+                percent_translated(group.counts, unit),
+                printed_list,
+                dir_stats,
+            )
         else:
-            print_dir_stats(directory_name, buffer, folder_stats, printed_list)
-
-        total_translated += folder_stats["translated"]
-        total_entries += folder_stats["total"]
+            print_dir_stats(
+                directory_name,
+                buffer,
+                percent_translated(group.counts, unit),
+                printed_list,
+            )
 
     if json_format:
         print(
@@ -138,12 +490,28 @@ def non_interactive_output(
             )
         )
     else:
-        if total_entries != 0:
-            total_completion = 100 * total_translated / total_entries
-            print(f"\n\n# TOTAL ({total_completion:.2f}% done)\n")
+        if tree.counts != NO_COUNTS:
+            print(f"\n\n# TOTAL ({percent_translated(tree.counts, unit):.2f}% done)\n")
 
 
-def build_ignore_matcher(path: Path, exclude: List[str]) -> Callable[[str], bool]:
+def directory_labels(nodes: Iterable[DirectoryNode], repo_path: Path) -> Dict[str, str]:
+    """Names under which directories are reported, by path: their name, or
+    their path in the repository when several of them share a name."""
+    names = {
+        node.path: repo_path.name if node.path == "." else node.name for node in nodes
+    }
+    shared_names = {
+        name for name, count in Counter(names.values()).items() if count > 1
+    }
+    return {
+        path: path if name in shared_names and path != "." else name
+        for path, name in names.items()
+    }
+
+
+def build_ignore_matcher(path: Path, exclude: List[str]) -> IgnoreMatcher:
+    from gitignore_parser import rule_from_pattern
+
     path = path.resolve()
     potodo_ignore = path / ".potodoignore"
     rules = []
@@ -155,7 +523,7 @@ def build_ignore_matcher(path: Path, exclude: List[str]) -> Callable[[str], bool
     rules.append(rule_from_pattern(".git/", path))
     for rule in exclude:
         rules.append(rule_from_pattern(rule, path))
-    return lambda file_path: any(r.match(file_path) for r in rules)
+    return IgnoreMatcher(path, [rule for rule in rules if rule])
 
 
 def exec_potodo(
@@ -175,6 +543,20 @@ def exec_potodo(
     is_interactive: bool,
     matching_files: bool,
     api_url: str,
+    jobs: Optional[int] = None,
+    engine: str = "scan",
+    cache_backend: str = "pickle",
+    no_shared_cache: bool = False,
+    depth: Optional[int] = None,
+    output_format: str = "text",
+    reservations_max_age: float = 0.0,
+    stale_reservations: bool = False,
+    watch: bool = False,
+    no_server: bool = False,
+    timings: bool = False,
+    use_git: bool = False,
+    repositories: Optional[List["Repository"]] = None,
+    unit: str = "entries",
 ) -> None:
     """
     Will run everything based on the given parameters
@@ -195,13 +577,76 @@ def exec_potodo(
     :param is_interactive: Switches output to an interactive CLI menu
     :param matching_files: Should the file paths be printed instead of normal output
     :param api_url: API URL for reservation tickets on Gitea or GitHub
+    :param jobs: Number of processes used to parse files (defaults to the CPU count)
+    :param engine: How po files are read: "scan", "polib" or "verify"
+    :param cache_backend: How the cache is stored: "pickle" or "sqlite"
+    :param no_shared_cache: Disables the cache shared by all repositories
+    :param depth: Merges directories deeper than this into their ancestor
+    :param output_format: "text", "json", or "ndjson" to print one JSON record
+        per line as soon as it's ready
+    :param reservations_max_age: Seconds during which cached reservations are
+        used without asking the forge whether they changed
+    :param stale_reservations: Use cached reservations if the forge can't be reached
+    :param watch: Keep running, updating the output when po files change
+    :param no_server: Don't get the stats from a `potodo serve` server
+    :param timings: Print the time taken by each phase of the run, and what
+        was read, parsed and requested, to stderr
+    :param use_git: List the po files using git, and use the blob ids of the
+        unmodified ones to know whether they changed
+    :param repositories: Report about these repositories instead of `path`,
+        then compare their files
+    :param unit: What percentages, counts and thresholds are of: "entries",
+        or "words" or "chars" of the msgids
     """
 
+    if timings:
+        recorded_timings = enable_timings()
     ignore_matches = build_ignore_matcher(path, exclude)
-    if is_interactive:
+    if repositories:
+        from potodo.multi import multi_repository_output
+
+        multi_repository_output(
+            repositories,
+            exclude,
+            above,
+            below,
+            only_fuzzy,
+            hide_reserved,
+            counts,
+            json_format,
+            exclude_fuzzy,
+            exclude_reserved,
+            only_reserved,
+            show_reservation_dates,
+            no_cache,
+            matching_files,
+            jobs,
+            engine,
+            cache_backend,
+            no_shared_cache,
+            depth,
+            output_format,
+            reservations_max_age,
+            stale_reservations,
+            use_git,
+            unit,
+        )
+    elif is_interactive:
         from potodo.interactive import interactive_output
+        from potodo.po_file import get_po_stats_from_repo_or_cache
 
-        interactive_output(path, ignore_matches)
+        with phase("stats"):
+            po_files = get_po_stats_from_repo_or_cache(
+                path,
+                ignore_matches,
+                no_cache,
+                jobs,
+                engine,
+                cache_backend,
+                not no_shared_cache,
+                use_git,
+            )
+        interactive_output(path, po_files)
     else:
         non_interactive_output(
             path,
@@ -221,71 +666,61 @@ def exec_potodo(
             matching_files,
             ignore_matches,
             api_url,
+            jobs,
+            engine,
+            cache_backend,
+            no_shared_cache,
+            depth,
+            output_format,
+            reservations_max_age,
+            stale_reservations,
+            watch,
+            no_server,
+            use_git,
+            unit,
+        )
+    if timings:
+        print_timings(
+            recorded_timings.report(),
+            json_format or output_format != "text",
+            sys.stderr,
         )
 
 
 def buffer_add(
     buffer: List[Any],
-    folder_stats: Dict[str, int],
     printed_list: List[bool],
-    po_file_stats: PoFileStats,
-    issue_reservations: Dict[str, Tuple[Any, Any]],
-    above: int,
-    below: int,
+    file_result: "FileResult",
     counts: bool,
     json_format: bool,
-    exclude_reserved: bool,
-    only_reserved: bool,
     show_reservation_dates: bool,
     matching_files: bool,
+    directory_name: Optional[str] = None,
+    name: Optional[str] = None,
+    unit: str = "entries",
 ) -> None:
-    """Will add to the buffer the information to print about the file is
-    the file isn't translated entirely or above or below requested
-    values.
-    """
-    # If the file is completely translated,
-    # or is translated below what's requested
-    # or is translated above what's requested
-    if (
-        po_file_stats.percent_translated == 100
-        or po_file_stats.percent_translated < above
-        or po_file_stats.percent_translated > below
-    ):
-        # add the percentage of the file to the stats of the folder
-        folder_stats["translated"] += po_file_stats.translated_nb
-        folder_stats["total"] += po_file_stats.entries_count
-
-        if not json_format:
-            # don't print that file
-            printed_list.append(False)
-
-        # return without adding anything to the buffer
-        return
+    """Will add to the buffer the information to print about the file.
 
-    fuzzy_entries = po_file_stats.fuzzy_entries
-    untranslated_entries = po_file_stats.untranslated_entries
-    # nb of fuzzies in the file IF there are some fuzzies in the file
-    fuzzy_nb = po_file_stats.fuzzy_nb if fuzzy_entries else 0
+    `directory_name` is the name under which its directory is reported, and
+    `name` the name of the file in it, which for files of merged
+    subdirectories includes their relative path. Its progress is given in
+    `unit`: entries, or words or characters of their msgids.
+    """
+    # nb of fuzzies in the file
+    fuzzy_nb = file_result.fuzzy
     # number of entries translated
-    translated_nb = po_file_stats.translated_nb
+    translated_nb = file_result.translated
     # file size
-    po_file_size = po_file_stats.po_file_size
+    po_file_size = file_result.entries
     # percentage of the file already translated
-    percent_translated = po_file_stats.percent_translated
-
+    percent_translated = file_result.percent(unit)
     # `reserved by` if the file is reserved
-    reserved_by, reservation_date = issue_reservations.get(
-        po_file_stats.filename_dir.lower(), (None, None)
-    )
-    # unless the offline/hide_reservation are enabled
-    if exclude_reserved and reserved_by:
-        return
-    if only_reserved and not reserved_by:
-        return
+    reserved_by = file_result.reserved_by
+    reservation_date = file_result.reservation_date
 
-    directory = po_file_stats.directory
-    filename = po_file_stats.filename
-    path = po_file_stats.path
+    directory = directory_name or file_result.path.parent.name
+    filename = name or file_result.filename
+    path = file_result.path
 
     if matching_files:
         print(path)
@@ -299,6 +734,7 @@ def buffer_add(
             fuzzies=fuzzy_nb,
             translated=translated_nb,
             percent_translated=percent_translated,
+            **text_size_record(file_result.counts),
             reserved_by=reserved_by,
             reservation_date=reservation_date,
         )
@@ -308,13 +744,22 @@ def buffer_add(
     else:
         s = f"- {filename:<30} "  # The filename
 
-        if counts:
-            missing = len(fuzzy_entries) + len(untranslated_entries)
+        if counts and unit != "entries":
+            _, fuzzy, untranslated = file_result.counts.measure(unit)
+            s += f"{fuzzy + untranslated:3d} {unit} to do"
+            s += f", including {fuzzy} in fuzzies." if fuzzy else ""
+
+        elif counts:
+            missing = fuzzy_nb + file_result.untranslated
             s += f"{missing:3d} to do"
             s += f", including {fuzzy_nb} fuzzies." if fuzzy_nb else ""
 
         else:
+            if unit != "entries":
+                translated_nb, *_ = file_result.counts.measure(unit)
+                po_file_size = sum(file_result.counts.measure(unit))
             s += f"{translated_nb:3d} / {po_file_size:3d} "
+            s += "" if unit == "entries" else f"{unit} "
             s += f"({percent_translated:5.1f}% translated)"
             s += f", {fuzzy_nb} fuzzy" if fuzzy_nb else ""
 
@@ -325,26 +770,40 @@ def buffer_add(
 
         buffer.append(s)
 
-    # Add the percent translated to the folder statistics
-    folder_stats["translated"] += po_file_stats.translated_nb
-    folder_stats["total"] += po_file_stats.entries_count
     # Indicate to print the file
     printed_list.append(True)
 
 
 def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(
         prog="potodo",
         description="List and prettify the po files left to translate.",
+        epilog="Other commands: "
+        + ", ".join(f"potodo {command}" for command in COMMANDS)
+        + " (see their --help).",
     )
 
     parser.add_argument(
         "-p",
         "--path",
-        help="execute Potodo in path",
+        action="append",
+        help="execute Potodo in path, several times to report about several "
+        "repositories and compare them",
         metavar="path",
     )
 
+    parser.add_argument(
+        "--manifest",
+        metavar="FILE",
+        help="report about the repositories listed in FILE, one per line, as "
+        "their path (relative to FILE) optionally followed by the API URL of "
+        "their reservations",
+    )
+
     parser.add_argument(
         "-e",
         "--exclude",
@@ -388,6 +847,24 @@ def main() -> None:
         ),
     )
 
+    parser.add_argument(
+        "--reservations-max-age",
+        type=float,
+        default=0.0,
+        metavar="SECONDS",
+        dest="reservations_max_age",
+        help="reuse the reservations cached in the .potodo directory for SECONDS "
+        "seconds without contacting the forge, after that they're only "
+        "downloaded again if they changed (defaults to 0)",
+    )
+
+    parser.add_argument(
+        "--stale-reservations",
+        action="store_true",
+        dest="stale_reservations",
+        help="use the cached reservations when the forge can't be reached",
+    )
+
     parser.add_argument(
         "-n",
         "--no-reserved",
@@ -399,9 +876,21 @@ def main() -> None:
     parser.add_argument(
         "-c",
         "--counts",
-        action="store_true",
+        nargs="?",
+        const="entries",
+        choices=UNITS,
         help="render list with the count of remaining entries "
-        "(translate or review) rather than percentage done",
+        "(translate or review) rather than percentage done, or of the "
+        "remaining words or characters of their msgids with --counts=words "
+        "or --counts=chars",
+    )
+
+    parser.add_argument(
+        "--by",
+        choices=UNITS,
+        help="measure progress in entries, or words or characters of their "
+        "msgids, for the percentages and --above/--below (defaults to the "
+        "unit of --counts, else entries)",
     )
 
     parser.add_argument(
@@ -409,7 +898,17 @@ def main() -> None:
         "--json",
         action="store_true",
         dest="json_format",
-        help="format output as JSON",
+        help="format output as JSON (same as --format json)",
+    )
+
+    parser.add_argument(
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default="text",
+        dest="output_format",
+        help="format of the output: text, a JSON document, or NDJSON with one "
+        "JSON record per file, directory and total, printed as they're ready "
+        "(defaults to text)",
     )
 
     parser.add_argument(
@@ -447,6 +946,95 @@ def main() -> None:
         help="Disables cache (Cache is disabled when files are modified)",
     )
 
+    parser.add_argument(
+        "--cache-backend",
+        choices=CACHE_BACKENDS,
+        default="pickle",
+        help="how the cache is stored in the .potodo directory: a single pickle "
+        "file, or a SQLite database only reading and writing changed files "
+        "(defaults to pickle)",
+    )
+
+    parser.add_argument(
+        "--no-shared-cache",
+        action="store_true",
+        dest="no_shared_cache",
+        help="Disables the cache of parsed contents shared by all repositories "
+        "(stored in $XDG_CACHE_HOME/potodo)",
+    )
+
+    parser.add_argument(
+        "--no-server",
+        action="store_true",
+        dest="no_server",
+        help="Don't get the stats from a potodo serve server running for the "
+        "repository (also disabled by --no-cache)",
+    )
+
+    parser.add_argument(
+        "--git",
+        action="store_true",
+        dest="use_git",
+        help="list the po files using git instead of walking the directories, "
+        "leaving out those ignored by git, and only parse again those whose "
+        "content changed (walks them outside of git repositories)",
+    )
+
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        metavar="N",
+        help="number of processes used to parse po files (defaults to the number of CPUs)",
+    )
+
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="scan",
+        help="how po files are read: a fast single pass scan, polib, "
+        "or both to verify they agree (defaults to scan)",
+    )
+
+    parser.add_argument(
+        "--depth",
+        type=int,
+        metavar="N",
+        help="report directories deeper than N levels with their ancestor "
+        "at depth N (0 reports the whole repository at once)",
+    )
+
+    parser.add_argument(
+        "-w",
+        "--watch",
+        action="store_true",
+        help="keep running and update the output as po files change: the text "
+        "output is redrawn, JSON formats print a delta record per update",
+    )
+
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="print to stderr the wall and CPU time of each phase of the run, "
+        "cache hits, bytes read, the slowest files to parse and the HTTP "
+        "requests made (as JSON with the JSON formats)",
+    )
+
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        metavar="FILE",
+        help="write a cProfile dump of the run to FILE, to load with pstats",
+    )
+
+    parser.add_argument(
+        "--trace-malloc",
+        type=Path,
+        metavar="FILE",
+        dest="trace_malloc",
+        help="write a tracemalloc snapshot of the memory allocated at the end "
+        "of the run to FILE, to load with tracemalloc.Snapshot.load",
+    )
+
     parser.add_argument(
         "-i",
         "--interactive",
@@ -485,6 +1073,11 @@ def main() -> None:
     # Removing useless args before running the process
     del args["verbose"]
     del args["logging_level"]
+    del args["manifest"]
+    del args["by"]
+    profile_path = args.pop("profile")
+    trace_malloc_path = args.pop("trace_malloc")
 
     # Launch the processing itself
-    exec_potodo(**args)
+    with profiled(profile_path, trace_malloc_path):
+        exec_potodo(**args)
@@ -0,0 +1,78 @@
+"""Translations which can be reused, for `potodo reuse`.
+
+The untranslated and fuzzy entries are looked up in the index of the
+entries, by the hash of their msgctxt and msgid, instead of comparing
+files with each other, see potodo.entries.
+"""
+
+import json
+from pathlib import Path
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+from potodo.entries import open_entry_index
+from potodo.entries import Suggestion
+
+
+def _shorten(text: str, width: int = 70) -> str:
+    text = " ".join(text.split())
+    if len(text) <= width:
+        return text
+    end = width - 1
+    return text[:end] + "…"
+
+
+def print_suggestions(suggestions: Sequence[Suggestion], json_format: bool) -> None:
+    if json_format:
+        print(
+            json.dumps(
+                [
+                    dict(
+                        path=suggestion.path,
+                        line=suggestion.line,
+                        state=suggestion.state,
+                        msgctxt=suggestion.msgctxt,
+                        msgid=suggestion.msgid,
+                        translations=[
+                            dict(msgstr=msgstr, uses=uses, example=example)
+                            for msgstr, uses, example in suggestion.translations
+                        ],
+                    )
+                    for suggestion in suggestions
+                ],
+                indent=4,
+                ensure_ascii=False,
+            )
+        )
+        return
+    path = None
+    for suggestion in suggestions:
+        if suggestion.path != path:
+            path = suggestion.path
+            print(f"\n\n# {path}\n")
+        print(
+            f"- line {suggestion.line} ({suggestion.state}): "
+            f"{_shorten(suggestion.msgid)}"
+        )
+        for msgstr, uses, example in suggestion.translations:
+            elsewhere = f" and {uses - 1} more" if uses > 1 else ""
+            print(f"    -> {_shorten(msgstr)} (in {example}{elsewhere})")
+    print(
+        f"\n\n# {len(suggestions)} entries to translate or review are "
+        "translated elsewhere"
+    )
+
+
+def reuse(
+    repo_path: Path,
+    exclude: List[str],
+    json_format: bool = False,
+    jobs: Optional[int] = None,
+) -> None:
+    index = open_entry_index(repo_path, exclude, jobs)
+    try:
+        suggestions = index.suggestions()
+    finally:
+        index.close()
+    print_suggestions(suggestions, json_format)
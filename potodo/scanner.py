@@ -0,0 +1,277 @@
+import codecs
+import re
+from pathlib import Path
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+_KEYWORDS = {
+    b"msgctxt": "ct",
+    b"msgid": "mi",
+    b"msgid_plural": "mp",
+    b"msgstr": "ms",
+}
+
+
+# What progress can be measured in: entries, or words or characters of
+# their msgids
+UNITS = ("entries", "words", "chars")
+
+# How files can be counted: with the scanner, with polib, or with both,
+# checking they agree
+ENGINES = ("scan", "polib", "verify")
+
+# Escape sequences of po strings, unescaped the way polib does
+_ESCAPES = {"\\": "\\", "t": "\t", "r": "\r", "n": "\n", '"': '"'}
+_ESCAPE_RE = re.compile(r'\\(\\|n|t|r|")')
+
+
+class PoCounts(NamedTuple):
+    """Number of entries of a `.po` file in each state, and number of
+    words and characters of their msgids.
+
+    The header entry isn't counted. Obsolete entries are only counted
+    as obsolete, whether they are fuzzy or translated, and their words
+    aren't counted.
+    """
+
+    translated: int
+    fuzzy: int
+    untranslated: int
+    obsolete: int
+    translated_words: int = 0
+    fuzzy_words: int = 0
+    untranslated_words: int = 0
+    translated_chars: int = 0
+    fuzzy_chars: int = 0
+    untranslated_chars: int = 0
+
+    def measure(self, unit: str = "entries") -> Tuple[int, int, int]:
+        """Gives how much is translated, fuzzy and untranslated, in `unit`."""
+        if unit == "words":
+            return self.translated_words, self.fuzzy_words, self.untranslated_words
+        if unit == "chars":
+            return self.translated_chars, self.fuzzy_chars, self.untranslated_chars
+        return self.translated, self.fuzzy, self.untranslated
+
+
+def text_size(text: str) -> Tuple[int, int]:
+    """Number of words and characters of an unescaped msgid."""
+    return len(text.split()), len(text)
+
+
+def _has_content(token: bytes) -> bool:
+    """Tells if a quoted string token, like `"foo"`, isn't empty."""
+    start = token.find(b'"')
+    return start != -1 and token.rfind(b'"') - start > 1
+
+
+def _unquote(tokens: List[bytes]) -> str:
+    """Gives the text of the quoted string tokens of a msgid, unescaped."""
+    parts = []
+    for token in tokens:
+        # Content between the first and last quotes
+        first = token.find(b'"') + 1
+        end = token.rfind(b'"')
+        if end < first or not first:
+            continue
+        part = token[first:end].decode("utf-8", "replace")
+        if "\\" in part:
+            part = _ESCAPE_RE.sub(lambda match: _ESCAPES[match.group(1)], part)
+        parts.append(part)
+    return "".join(parts)
+
+
+class _Scanner:
+    """Counts entries of a `.po` file line by line.
+
+    The entries are delimited the same way polib does, but instead of
+    building a POEntry for each of them, only what is needed to classify
+    them is remembered.
+    """
+
+    def __init__(self) -> None:
+        self.translated = 0
+        self.fuzzy = 0
+        self.untranslated = 0
+        self.obsolete = 0
+        # Words and characters of the msgids, translated, fuzzy and untranslated
+        self.words = [0, 0, 0]
+        self.chars = [0, 0, 0]
+        self.header_seen = False
+        self.state: Optional[str] = None
+        self.last_is_comment = True
+        self._reset()
+
+    def _reset(self) -> None:
+        self.has_msgid = False
+        self.is_obsolete = False
+        self.is_fuzzy = False
+        self.msgid_nonempty = False
+        self.msgid_tokens: List[bytes] = []
+        self.msgstr_nonempty = False
+        self.plurals: Dict[bytes, bool] = {}
+        self.plural_index = b""
+
+    def _end_entry(self) -> None:
+        if self.has_msgid:
+            if self.is_obsolete:
+                self.obsolete += 1
+            elif not self.msgid_nonempty and not self.header_seen:
+                # The first entry with an empty msgid holds the metadata
+                self.header_seen = True
+            elif self.is_fuzzy:
+                self.fuzzy += 1
+                self._count_text(1)
+            elif self.msgstr_nonempty or (self.plurals and all(self.plurals.values())):
+                self.translated += 1
+                self._count_text(0)
+            else:
+                self.untranslated += 1
+                self._count_text(2)
+        self._reset()
+
+    def _count_text(self, state: int) -> None:
+        words, chars = text_size(_unquote(self.msgid_tokens))
+        self.words[state] += words
+        self.chars[state] += chars
+
+    def _start(self, state: str) -> None:
+        """A line which can't be part of the current entry was found."""
+        if self.state in ("ms", "mx"):
+            self._end_entry()
+        self.state = state
+
+    def feed(self, line: bytes) -> None:
+        """Handles a single line."""
+        line = line.strip()
+        if line:
+            self.last_is_comment = not self._feed(line)
+
+    def close(self) -> PoCounts:
+        """Handles the end of the file and returns the counts."""
+        if not self.last_is_comment:
+            # Like polib, the last entry is kept unless the file ends with comments
+            self._end_entry()
+        return PoCounts(
+            self.translated,
+            self.fuzzy,
+            self.untranslated,
+            self.obsolete,
+            *self.words,
+            *self.chars,
+        )
+
+    def _feed(self, line: bytes) -> bool:
+        """Handles a non-blank line, returns False for comment lines."""
+        if line.startswith(b"#~"):
+            if line.startswith(b"#~|"):
+                return False
+            line = line[2:].lstrip()
+            obsolete = True
+            if not line:
+                return False
+        else:
+            obsolete = False
+
+        if line.startswith(b"#"):
+            marker = line[:2]
+            if marker == b"#|" and line[2:].lstrip().startswith(b'"'):
+                # Continuation of a previous msgid, not interesting
+                return False
+            if marker in (b"#:", b"#,", b"#.") and not line[2:].strip():
+                return False
+            self._start("comment")
+            if marker == b"#,":
+                flags = [flag.strip() for flag in line[2:].split(b",")]
+                if b"fuzzy" in flags:
+                    self.is_fuzzy = True
+            return False
+
+        if line.startswith(b'"'):
+            # Continuation line of the last keyword
+            if _has_content(line):
+                if self.state == "mi":
+                    self.msgid_nonempty = True
+                    self.msgid_tokens.append(line)
+                elif self.state == "ms":
+                    self.msgstr_nonempty = True
+                elif self.state == "mx":
+                    self.plurals[self.plural_index] = True
+            return True
+
+        if line.startswith(b"msgstr["):
+            self.state = "mx"
+            self.plural_index = line[7:].partition(b"]")[0]
+            self.plurals[self.plural_index] = _has_content(line)
+            return True
+
+        keyword, *value = line.split(None, 1)
+        state = _KEYWORDS.get(keyword) if value else None
+        if state in ("ct", "mi"):
+            self._start(state)
+            if state == "mi":
+                self.has_msgid = True
+                self.is_obsolete = obsolete
+                self.msgid_nonempty = _has_content(value[0])
+                self.msgid_tokens.append(value[0])
+        elif state == "ms":
+            self.state = state
+            self.msgstr_nonempty = _has_content(value[0])
+        elif state == "mp":
+            self.state = state
+        return True
+
+
+def scan_po_lines(lines: Iterable[bytes]) -> PoCounts:
+    """Counts the entries from the lines of a `.po` file, in a single pass."""
+    scanner = _Scanner()
+    lines = iter(lines)
+    for first_line in lines:
+        if first_line.startswith(codecs.BOM_UTF8):
+            first_line = first_line.replace(codecs.BOM_UTF8, b"", 1)
+        scanner.feed(first_line)
+        break
+    for line in lines:
+        scanner.feed(line)
+    return scanner.close()
+
+
+def scan_po_file(path: Path) -> PoCounts:
+    """Counts the entries of a `.po` file without building polib objects."""
+    with open(path, "rb") as handle:
+        return scan_po_lines(handle)
+
+
+def polib_po_counts(path: Path) -> PoCounts:
+    """Counts the entries of a `.po` file using polib, slower but reference."""
+    import polib
+
+    pofile = polib.pofile(str(path))
+    obsolete_nb = 0
+    fuzzy_nb = 0
+    translated_nb = 0
+    words = [0, 0, 0]
+    chars = [0, 0, 0]
+    for entry in pofile:
+        if entry.obsolete:
+            obsolete_nb += 1
+            continue
+        if entry.fuzzy:
+            fuzzy_nb += 1
+            state = 1
+        elif entry.translated():
+            translated_nb += 1
+            state = 0
+        else:
+            state = 2
+        entry_words, entry_chars = text_size(entry.msgid)
+        words[state] += entry_words
+        chars[state] += entry_chars
+    untranslated_nb = len(pofile) - obsolete_nb - fuzzy_nb - translated_nb
+    return PoCounts(
+        translated_nb, fuzzy_nb, untranslated_nb, obsolete_nb, *words, *chars
+    )
@@ -0,0 +1,54 @@
+"""Search of the entries of a repository, for `potodo search`.
+
+Entries are found through the index of their words, which only reads the
+files which changed since the previous search, see potodo.entries.
+"""
+
+import json
+from pathlib import Path
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+from potodo.entries import Match
+from potodo.entries import open_entry_index
+from potodo.entries import STATES
+
+
+def print_matches(matches: Sequence[Match], json_format: bool) -> None:
+    if json_format:
+        print(
+            json.dumps(
+                [match._asdict() for match in matches], indent=4, ensure_ascii=False
+            )
+        )
+        return
+    for match in matches:
+        print(f"{match.path}:{match.line} ({match.state})")
+        if match.msgctxt:
+            print(f"    msgctxt {' '.join(match.msgctxt.split())}")
+        print(f"    msgid   {' '.join(match.msgid.split())}")
+        print(f"    msgstr  {' '.join(match.msgstr.split())}\n")
+    print(f"# {len(matches)} entries found")
+
+
+def search(
+    repo_path: Path,
+    query: str,
+    exclude: List[str],
+    fields: Iterable[str] = ("msgid", "msgstr"),
+    states: Iterable[str] = STATES,
+    json_format: bool = False,
+    jobs: Optional[int] = None,
+) -> None:
+    index = open_entry_index(repo_path, exclude, jobs)
+    try:
+        try:
+            matches = index.search(query, fields, states)
+        except ValueError:
+            print(f"Potodo: No word to search in {query!r}.")
+            exit(1)
+    finally:
+        index.close()
+    print_matches(matches, json_format)
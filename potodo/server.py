@@ -0,0 +1,365 @@
+"""`potodo serve`: keeps the stats of a repository in memory, up to date, and
+answers queries about them over a Unix socket or on localhost, using HTTP.
+
+- GET /files gives the stats of all the po files, with the reservations.
+- GET /stats gives the same report as `potodo --json`, filtered by the
+  `above`, `below`, `only_fuzzy`, `exclude_fuzzy`, `exclude_reserved`,
+  `only_reserved` and `depth` query parameters.
+
+The address of the server is written in `.potodo/server.json`, where potodo
+finds it to get the stats from the server instead of reading the files.
+"""
+
+import http.client
+import json
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+from pathlib import Path
+from socketserver import BaseServer
+from socketserver import ThreadingMixIn
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+from urllib.parse import parse_qs
+from urllib.parse import urlsplit
+
+from potodo.cache import server_info_path
+from potodo.forge_api import get_issue_reservations
+from potodo.json import json_dateconv
+from potodo.po_file import get_po_stats_from_repo_or_cache
+from potodo.po_file import PoFileStats
+from potodo.scanner import PoCounts
+from potodo.scanner import UNITS
+from potodo.tree import build_tree
+from potodo.tree import percent_translated
+from potodo.walk import select_po_files
+from potodo.watch import open_watcher
+from potodo.watch import refresh_index
+from potodo.watch import wait_for_changes
+
+SERVER_TIMEOUT = 2.0
+
+
+class StatsIndex:
+    """The stats of the po files of a repository, kept up to date by watching
+    them, and its reservations, fetched again once older than `max_age`."""
+
+    def __init__(
+        self,
+        repo_path: Path,
+        exclude: List[str],
+        api_url: Optional[str] = None,
+        engine: str = "scan",
+        max_age: float = 300.0,
+    ):
+        from potodo.potodo import build_ignore_matcher
+
+        self.repo_path = repo_path
+        self.exclude = exclude
+        self.api_url = api_url
+        self.engine = engine
+        self.max_age = max_age
+        self.ignore_matches = build_ignore_matcher(repo_path, exclude)
+        self.watcher = open_watcher(repo_path, self.ignore_matches)
+        po_files = get_po_stats_from_repo_or_cache(
+            repo_path, self.ignore_matches, engine=engine
+        )
+        self.index = {
+            po_file.path: po_file for files in po_files.values() for po_file in files
+        }
+        self.lock = threading.Lock()
+        self.reservations_lock = threading.Lock()
+        self.reservations: Dict[str, Tuple[Any, Any]] = {}
+        self.reservations_fetched_at = 0.0
+
+    def refresh_forever(self) -> None:
+        """Parses again the po files as they change."""
+        while True:
+            changes = wait_for_changes(self.watcher)
+            with self.lock:
+                changed, removed = refresh_index(
+                    self.index,
+                    self.repo_path,
+                    self.ignore_matches,
+                    self.engine,
+                    changes,
+                )
+            logging.info("%s files changed, %s removed", len(changed), len(removed))
+
+    def po_files(self) -> List[PoFileStats]:
+        with self.lock:
+            return list(self.index.values())
+
+    def get_reservations(self) -> Dict[str, Tuple[Any, Any]]:
+        with self.reservations_lock:
+            age = time.time() - self.reservations_fetched_at
+            if self.api_url and age > self.max_age:
+                self.reservations = get_issue_reservations(
+                    False, self.api_url, self.repo_path, self.max_age, True
+                )
+                self.reservations_fetched_at = time.time()
+            return self.reservations
+
+    def files_payload(self) -> Dict[str, Any]:
+        return dict(
+            path=str(self.repo_path),
+            exclude=self.exclude,
+            api_url=self.api_url,
+            reservations=self.get_reservations(),
+            files=[
+                dict(
+                    path=str(po_file.path),
+                    size=po_file.size,
+                    mtime_ns=po_file.mtime_ns,
+                    sha=po_file.sha,
+                    counts=list(po_file.counts),
+                )
+                for po_file in self.po_files()
+            ],
+        )
+
+    def stats_payload(self, query: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+        from potodo.potodo import add_dir_stats
+        from potodo.potodo import iter_directory_reports
+
+        def flag(name: str) -> bool:
+            return query.get(name, [""])[-1] not in ("", "0", "false")
+
+        def number(name: str, default: str) -> int:
+            return int(query.get(name, [default])[-1])
+
+        unit = query.get("by", ["entries"])[-1]
+        if unit not in UNITS:
+            raise ValueError(f"by must be one of {', '.join(UNITS)}")
+
+        tree = build_tree(self.po_files(), self.repo_path)
+        dir_stats: List[Dict[str, Any]] = []
+        for directory_name, group, buffer, printed_list in iter_directory_reports(
+            self.repo_path,
+            tree,
+            self.get_reservations(),
+            number("above", "0"),
+            number("below", "100"),
+            flag("only_fuzzy"),
+            False,
+            True,
+            flag("exclude_fuzzy"),
+            flag("exclude_reserved"),
+            flag("only_reserved"),
+            False,
+            False,
+            number("depth", "0") if "depth" in query else None,
+            unit,
+        ):
+            add_dir_stats(
+                directory_name,
+                buffer,
+                percent_translated(group.counts, unit),
+                printed_list,
+                dir_stats,
+            )
+        return dir_stats
+
+
+class StatsRequestHandler(BaseHTTPRequestHandler):
+    server: "StatsHTTPServer"
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        try:
+            if url.path == "/files":
+                payload: Any = self.server.stats.files_payload()
+            elif url.path == "/stats":
+                payload = self.server.stats.stats_payload(parse_qs(url.query))
+            else:
+                self.send_error(404)
+                return
+        except ValueError as err:
+            self.send_error(400, str(err))
+            return
+        body = json.dumps(payload, default=json_dateconv).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        # Clients of Unix sockets have no address
+        return str(self.client_address[0]) if self.client_address else "unix"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logging.debug("%s - %s", self.address_string(), format % args)
+
+
+class StatsHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    stats: StatsIndex
+
+
+if hasattr(socket, "AF_UNIX"):
+    from socketserver import UnixStreamServer
+
+    class StatsUnixServer(ThreadingMixIn, UnixStreamServer):
+        daemon_threads = True
+        stats: StatsIndex
+
+
+def serve(
+    repo_path: Path,
+    exclude: List[str],
+    socket_path: Optional[Path] = None,
+    http_port: Optional[int] = None,
+    api_url: Optional[str] = None,
+    engine: str = "scan",
+    reservations_max_age: float = 300.0,
+) -> None:
+    """Serves the stats of the repository until interrupted, on the given
+    Unix socket and/or localhost port."""
+    stats = StatsIndex(repo_path, exclude, api_url, engine, reservations_max_age)
+    servers: List[BaseServer] = []
+    info: Dict[str, Any] = dict(pid=os.getpid(), exclude=exclude)
+    if socket_path is not None:
+        if socket_path.exists():
+            socket_path.unlink()
+        unix_server = StatsUnixServer(str(socket_path), StatsRequestHandler)
+        servers.append(unix_server)
+        info["socket"] = str(socket_path)
+    if http_port is not None:
+        http_server = StatsHTTPServer(("127.0.0.1", http_port), StatsRequestHandler)
+        servers.append(http_server)
+        info["port"] = http_server.server_port
+    for server in servers:
+        setattr(server, "stats", stats)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    threading.Thread(target=stats.refresh_forever, daemon=True).start()
+
+    info_path = server_info_path(repo_path)
+    info_path.parent.mkdir(exist_ok=True)
+    info_path.write_text(json.dumps(info))
+    print(f"Serving the stats of {repo_path}", end="")
+    if "socket" in info:
+        print(f" on {info['socket']}", end="")
+    if "port" in info:
+        print(f" on http://127.0.0.1:{info['port']}/", end="")
+    print(flush=True)
+    # Clean up when terminated too
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+        if socket_path is not None and socket_path.exists():
+            socket_path.unlink()
+        info_path.unlink()
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def query_server(repo_path: Path, url: str) -> Optional[Any]:
+    """Queries the server of the repository, if there is one running."""
+    try:
+        info = json.loads(server_info_path(repo_path).read_text())
+    except (OSError, ValueError):
+        return None
+    connection: http.client.HTTPConnection
+    if info.get("socket") and hasattr(socket, "AF_UNIX"):
+        connection = UnixHTTPConnection(info["socket"], SERVER_TIMEOUT)
+    elif info.get("port"):
+        connection = http.client.HTTPConnection(
+            "127.0.0.1", info["port"], timeout=SERVER_TIMEOUT
+        )
+    else:
+        return None
+    try:
+        connection.request("GET", url)
+        resp = connection.getresponse()
+        if resp.status != 200:
+            logging.info("The potodo server answered %s", resp.status)
+            return None
+        return json.loads(resp.read())
+    except (OSError, ValueError, http.client.HTTPException) as err:
+        logging.info("Can't query the potodo server: %s", err)
+        return None
+    finally:
+        connection.close()
+
+
+class ServedStats(NamedTuple):
+    po_files: List[PoFileStats]
+    # None when the server doesn't get the requested reservations
+    reservations: Optional[Dict[str, Tuple[Any, Any]]]
+
+
+def get_served_stats(
+    repo_path: Path,
+    exclude: List[str],
+    ignore_matches: Callable[[str], bool],
+    api_url: Optional[str],
+) -> Optional[ServedStats]:
+    """Gets the stats of the po files from the server of the repository,
+    unless none is running, or it excludes files which aren't excluded here."""
+    payload = query_server(repo_path, "/files")
+    if payload is None:
+        return None
+    if not set(payload["exclude"]) <= set(exclude):
+        logging.info("The potodo server excludes other files, not using it")
+        return None
+    logging.info("Using the stats of the potodo server")
+    # Files in excluded directories are left out too, as the walk does
+    selected = set(
+        select_po_files(
+            repo_path,
+            ignore_matches,
+            [
+                Path(file["path"]).relative_to(repo_path).as_posix()
+                for file in payload["files"]
+            ],
+        )
+    )
+    po_files = [
+        PoFileStats.from_counts(
+            Path(file["path"]),
+            file["size"],
+            file["mtime_ns"],
+            file["sha"],
+            PoCounts(*file["counts"]),
+        )
+        for file in payload["files"]
+        if Path(file["path"]) in selected
+    ]
+    reservations = None
+    if api_url and payload["api_url"] == api_url:
+        reservations = {
+            name: (
+                user,
+                datetime.strptime(date, "%Y-%m-%d").date() if date else None,
+            )
+            for name, (user, date) in payload["reservations"].items()
+        }
+    return ServedStats(po_files, reservations)
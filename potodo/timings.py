@@ -0,0 +1,207 @@
+"""Instrumentation of a run, for `--timings`, `--profile` and `--trace-malloc`.
+
+Timings are only recorded once `enable_timings()` has been called, the
+functions recording them doing nothing otherwise:
+
+- `phase(name)` measures the wall and CPU time of a phase of the run,
+  phases started within another one being recorded as its subphases,
+- `count(name, value)` adds to a counter, like cache hits or bytes read,
+- `record_parse(path, seconds)` and `record_request(url, status, seconds)`
+  keep the time taken to parse each file and by each HTTP request.
+"""
+
+import contextlib
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+from typing import Dict
+from typing import IO
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+# Number of files and requests listed as the slowest ones
+SLOWEST_COUNT = 10
+
+
+class Timings:
+    """What was measured during a run."""
+
+    def __init__(self) -> None:
+        self.started = (time.perf_counter(), time.process_time())
+        # Wall time, CPU time and number of calls of each phase, by name,
+        # subphases being named after their parent, as in "stats/parse"
+        self.phases: Dict[str, List[float]] = {}
+        # Phases run by each thread, innermost last
+        self.local = threading.local()
+        self.counters: Dict[str, int] = Counter()
+        self.parse_times: List[Tuple[float, str]] = []
+        self.requests: List[Tuple[float, int, str]] = []
+        # Requests are made, and repositories read, from several threads
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        stack: List[str] = self.local.stack
+        stack.append(name)
+        # Phases are listed in the order they started, before their subphases
+        with self.lock:
+            totals = self.phases.setdefault("/".join(stack), [0.0, 0.0, 0])
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            with self.lock:
+                totals[0] += time.perf_counter() - wall
+                totals[1] += time.process_time() - cpu
+                totals[2] += 1
+            stack.pop()
+
+    def report(self) -> Dict[str, Any]:
+        """The measures, as a JSON-serializable dict."""
+        import statistics
+
+        started_wall, started_cpu = self.started
+        request_times = [seconds for seconds, _, _ in self.requests]
+        slowest_files = sorted(self.parse_times, reverse=True)[:SLOWEST_COUNT]
+        slowest_requests = sorted(self.requests, reverse=True)[:SLOWEST_COUNT]
+        return dict(
+            total=dict(
+                wall=time.perf_counter() - started_wall,
+                cpu=time.process_time() - started_cpu,
+            ),
+            phases=[
+                dict(name=name, wall=wall, cpu=cpu, calls=int(calls))
+                for name, (wall, cpu, calls) in self.phases.items()
+            ],
+            counters=dict(self.counters),
+            slowest_files=[
+                dict(path=path, seconds=seconds) for seconds, path in slowest_files
+            ],
+            requests=dict(
+                count=len(self.requests),
+                total=sum(request_times),
+                median=statistics.median(request_times) if request_times else 0.0,
+                max=max(request_times, default=0.0),
+                statuses=dict(Counter(str(status) for _, status, _ in self.requests)),
+                slowest=[
+                    dict(url=url, status=status, seconds=seconds)
+                    for seconds, status, url in slowest_requests
+                ],
+            ),
+        )
+
+
+_timings: Optional[Timings] = None
+
+
+def enable_timings() -> Timings:
+    """Starts recording timings, measuring the run from now on."""
+    global _timings
+    _timings = Timings()
+    return _timings
+
+
+@contextlib.contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Measures the code run within, as the phase `name` of the run."""
+    if _timings is None:
+        yield
+    else:
+        with _timings.phase(name):
+            yield
+
+
+def count(name: str, value: int = 1) -> None:
+    if _timings is not None:
+        with _timings.lock:
+            _timings.counters[name] += value
+
+
+def record_parse(path: Path, seconds: float) -> None:
+    if _timings is not None:
+        with _timings.lock:
+            _timings.parse_times.append((seconds, str(path)))
+
+
+def record_request(url: str, status: int, seconds: float) -> None:
+    if _timings is not None:
+        with _timings.lock:
+            _timings.requests.append((seconds, status, url))
+
+
+def print_timings(report: Dict[str, Any], json_format: bool, file: IO[str]) -> None:
+    """Prints the report of Timings, for humans unless `json_format`."""
+    if json_format:
+        print(json.dumps(report, indent=4), file=file)
+        return
+    print("\n# Timings (wall / CPU of the potodo process)\n", file=file)
+    for phase_report in report["phases"]:
+        *parents, name = phase_report["name"].split("/")
+        calls = phase_report["calls"]
+        print(
+            f"{'  ' * len(parents)}- {name:<{30 - 2 * len(parents)}} "
+            f"{phase_report['wall']:8.3f}s / {phase_report['cpu']:.3f}s"
+            + (f" ({calls} calls)" if calls > 1 else ""),
+            file=file,
+        )
+    total = report["total"]
+    print(f"- {'total':<30} {total['wall']:8.3f}s / {total['cpu']:.3f}s", file=file)
+    if report["counters"]:
+        print("\nCounters:", file=file)
+        for name, value in sorted(report["counters"].items()):
+            print(f"- {name}: {value}", file=file)
+    if report["slowest_files"]:
+        print("\nSlowest files to parse:", file=file)
+        for parse_report in report["slowest_files"]:
+            print(f"- {parse_report['seconds']:.3f}s {parse_report['path']}", file=file)
+    requests = report["requests"]
+    if requests["count"]:
+        print(
+            f"\nHTTP requests: {requests['count']}, {requests['total']:.3f}s in "
+            f"total, median {requests['median']:.3f}s, max {requests['max']:.3f}s",
+            file=file,
+        )
+        for request in requests["slowest"]:
+            print(
+                f"- {request['seconds']:.3f}s {request['status']} {request['url']}",
+                file=file,
+            )
+
+
+@contextlib.contextmanager
+def profiled(
+    profile_path: Optional[Path] = None, trace_malloc_path: Optional[Path] = None
+) -> Iterator[None]:
+    """Profiles the code run within, writing the cProfile stats (to load
+    with `pstats`) to `profile_path`, and the tracemalloc snapshot (to load
+    with `tracemalloc.Snapshot.load`) to `trace_malloc_path`, if given."""
+    profiler = None
+    if profile_path:
+        import cProfile
+
+        profiler = cProfile.Profile()
+    if trace_malloc_path:
+        import tracemalloc
+
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(str(profile_path))
+            print(f"Profile written to {profile_path}", file=sys.stderr)
+        if trace_malloc_path:
+            tracemalloc.take_snapshot().dump(str(trace_malloc_path))
+            tracemalloc.stop()
+            print(f"Memory snapshot written to {trace_malloc_path}", file=sys.stderr)
@@ -0,0 +1,139 @@
+from pathlib import Path
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import TYPE_CHECKING
+
+from potodo.scanner import PoCounts
+
+if TYPE_CHECKING:
+    from potodo.po_file import PoFileStats
+
+NO_COUNTS = PoCounts(0, 0, 0, 0)
+
+
+def add_counts(first: PoCounts, second: PoCounts) -> PoCounts:
+    return PoCounts(*(a + b for a, b in zip(first, second)))
+
+
+def ancestor_directories(rel_path: str) -> List[str]:
+    """Directories containing the file, given as a posix path relative to
+    the repository, innermost first, "." (the repository) last."""
+    directories = []
+    while "/" in rel_path:
+        rel_path = rel_path.rpartition("/")[0]
+        directories.append(rel_path)
+    return directories + ["."]
+
+
+def percent_translated(counts: PoCounts, unit: str = "entries") -> float:
+    """Translated percentage of the (non obsolete) entries of the counts,
+    or of the words or characters of their msgids, depending on `unit`."""
+    translated, fuzzy, untranslated = counts.measure(unit)
+    total = translated + fuzzy + untranslated
+    if not total:
+        return 100.0
+    return 100 * translated / total
+
+
+class DirectoryGroup(NamedTuple):
+    """Files reported together under a directory."""
+
+    node: "DirectoryNode"
+    files: List["PoFileStats"]
+    counts: PoCounts
+
+    @property
+    def percent_translated(self) -> float:
+        return percent_translated(self.counts)
+
+
+class DirectoryNode:
+    """A directory of the repository containing `.po` files,
+    directly or in its subdirectories.
+
+    `own_counts` sums the counts of the files directly in it, `counts`
+    also includes all its subdirectories.
+    """
+
+    def __init__(self, path: str, parent: Optional["DirectoryNode"] = None):
+        """`path` is relative to the repository, in posix form, "." for its root."""
+        self.path = path
+        self.parent = parent
+        self.depth: int = 0 if parent is None else parent.depth + 1
+        self.children: Dict[str, DirectoryNode] = {}
+        self.files: List["PoFileStats"] = []
+        self.own_counts = NO_COUNTS
+        self.counts = NO_COUNTS
+
+    @property
+    def name(self) -> str:
+        return self.path.rpartition("/")[2]
+
+    def child(self, name: str) -> "DirectoryNode":
+        node = self.children.get(name)
+        if node is None:
+            path = name if self.parent is None else f"{self.path}/{name}"
+            node = self.children[name] = DirectoryNode(path, self)
+        return node
+
+    def iter_nodes(self) -> Iterator["DirectoryNode"]:
+        """This node and all its descendants, parents first, sorted by name."""
+        to_visit = [self]
+        while to_visit:
+            node = to_visit.pop()
+            yield node
+            to_visit.extend(
+                node.children[name] for name in sorted(node.children, reverse=True)
+            )
+
+    def iter_files(self) -> Iterator["PoFileStats"]:
+        """The files of this directory and all its subdirectories."""
+        for node in self.iter_nodes():
+            yield from node.files
+
+    def rollup(self) -> None:
+        """Computes the counts of each node of the tree, bottom-up, at once."""
+        for node in reversed(list(self.iter_nodes())):
+            own_counts = NO_COUNTS
+            for po_file in node.files:
+                own_counts = add_counts(own_counts, po_file.counts)
+            node.own_counts = node.counts = own_counts
+            for child in node.children.values():
+                node.counts = add_counts(node.counts, child.counts)
+
+    def groups(self, depth: Optional[int] = None) -> Iterator[DirectoryGroup]:
+        """The files of the tree, grouped by directory.
+
+        Directories deeper than `depth` are merged into their ancestor at
+        that depth, whose group then holds all the files below it.
+        """
+        for node in self.iter_nodes():
+            if depth is not None and node.depth > depth:
+                continue
+            if depth is not None and node.depth == depth:
+                files = list(node.iter_files())
+                counts = node.counts
+            else:
+                files = node.files
+                counts = node.own_counts
+            if files:
+                yield DirectoryGroup(node, files, counts)
+
+
+def build_tree(po_files: Iterable["PoFileStats"], repo_path: Path) -> DirectoryNode:
+    """Builds the tree of the directories of the given files, in a single pass,
+    with their counts rolled up."""
+    root = DirectoryNode(".")
+    for po_file in po_files:
+        node = root
+        for part in po_file.path.parent.relative_to(repo_path).parts:
+            node = node.child(part)
+        node.files.append(po_file)
+    for node in root.iter_nodes():
+        node.files.sort(key=lambda po_file: po_file.path)
+    root.rollup()
+    return root
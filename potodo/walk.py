@@ -0,0 +1,167 @@
+import os
+import re
+from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Sequence
+from typing import Tuple
+
+
+class IgnoreMatcher:
+    """gitignore-style rules of a repository, compiled into a single regex.
+
+    Paths are matched relative to the repository, so the walker can also
+    match directories and skip them before descending into them.
+    """
+
+    def __init__(self, base_path: Path, rules: Sequence[Any]):
+        """`rules` are gitignore_parser rules, relative to `base_path`."""
+        self.base_path = base_path
+        self.rules = list(rules)
+        self.has_negation = any(rule.negation for rule in self.rules)
+        if self.has_negation:
+            # Later rules override earlier ones, so they're checked one by one
+            self.regexes = [re.compile(rule.regex) for rule in reversed(self.rules)]
+        else:
+            self.regex = re.compile(
+                "|".join(f"(?:{rule.regex})" for rule in self.rules) or "(?!)"
+            )
+
+    def match_relative(self, rel_path: str, is_dir: bool = False) -> bool:
+        """Tells if the posix path relative to the repository is ignored."""
+        if not self.has_negation:
+            return self.regex.search(rel_path) is not None
+        for rule, regex in zip(reversed(self.rules), self.regexes):
+            if rule.negation and rule.directory_only and is_dir:
+                matched = regex.search(rel_path + "/")
+            else:
+                matched = regex.search(rel_path)
+            if matched:
+                return not rule.negation
+        return False
+
+    def __call__(self, file_path: str) -> bool:
+        """Tells if the given absolute path is ignored."""
+        rel_path = os.path.relpath(file_path, str(self.base_path))
+        if rel_path.startswith(os.pardir):
+            return False
+        return self.match_relative(Path(rel_path).as_posix())
+
+
+def _relative_matcher(
+    repo_path: Path, ignore_matches: Callable[[str], bool]
+) -> Callable[[str, bool], bool]:
+    """Gives a function telling if a path relative to `repo_path` is ignored."""
+    if isinstance(ignore_matches, IgnoreMatcher):
+        return ignore_matches.match_relative
+
+    def match_relative(rel_path: str, is_dir: bool = False) -> bool:
+        return ignore_matches(str(repo_path / rel_path))
+
+    return match_relative
+
+
+def iter_po_directories(
+    repo_path: Path, ignore_matches: Callable[[str], bool], start: str = ""
+) -> Iterator[Tuple[str, List[Path]]]:
+    """Lazily finds the `.po` files under `repo_path` which aren't ignored,
+    yielding them directory by directory with its relative posix path ("."
+    for `repo_path` itself).
+
+    Only the `start` subdirectory is walked if given. Ignored directories are
+    skipped without being walked. Directories come out sorted, each before
+    its subdirectories.
+    """
+    match_relative = _relative_matcher(repo_path, ignore_matches)
+    start = start.strip("/")
+    prefix = start + "/" if start and start != "." else ""
+    # Directories left to walk, as (relative posix path prefix, absolute path)
+    to_walk = [(prefix, str(repo_path / prefix))]
+    while to_walk:
+        prefix, directory = to_walk.pop()
+        try:
+            with os.scandir(directory) as scanner:
+                entries = sorted(scanner, key=lambda entry: entry.name)
+        except OSError:
+            continue
+        po_files = []
+        subdirectories = []
+        for entry in entries:
+            rel_path = prefix + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if not match_relative(rel_path, True):
+                    subdirectories.append((rel_path + "/", entry.path))
+            elif entry.name.endswith(".po") and entry.is_file():
+                if not match_relative(rel_path, False):
+                    po_files.append(Path(entry.path))
+        # Reversed so they're popped in order
+        to_walk.extend(reversed(subdirectories))
+        if po_files:
+            yield prefix.rstrip("/") or ".", po_files
+
+
+def walk_po_files(repo_path: Path, ignore_matches: Callable[[str], bool]) -> List[Path]:
+    """Finds all the `.po` files under `repo_path` which aren't ignored.
+
+    Ignored directories are skipped without being walked. Files come out
+    sorted, those of a directory before those of its subdirectories.
+    """
+    return [
+        po_file
+        for _, po_files in iter_po_directories(repo_path, ignore_matches)
+        for po_file in po_files
+    ]
+
+
+def select_po_files(
+    repo_path: Path, ignore_matches: Callable[[str], bool], rel_paths: Iterable[str]
+) -> List[Path]:
+    """Keeps the `.po` files, given as posix paths relative to `repo_path`,
+    which the walk wouldn't skip: those not ignored, nor in ignored
+    directories. They're returned sorted."""
+    match_relative = _relative_matcher(repo_path, ignore_matches)
+    ignored_directories: Dict[str, bool] = {}
+
+    def is_ignored_directory(rel_path: str) -> bool:
+        if rel_path not in ignored_directories:
+            parent = rel_path.rpartition("/")[0]
+            ignored_directories[rel_path] = bool(
+                parent and is_ignored_directory(parent)
+            ) or match_relative(rel_path, True)
+        return ignored_directories[rel_path]
+
+    selected = []
+    for rel_path in sorted(rel_paths):
+        directory = rel_path.rpartition("/")[0]
+        if directory and is_ignored_directory(directory):
+            continue
+        if not match_relative(rel_path, False):
+            selected.append(repo_path / rel_path)
+    return selected
+
+
+def walk_directories(
+    repo_path: Path, ignore_matches: Callable[[str], bool]
+) -> List[Path]:
+    """Finds `repo_path` and all its directories which aren't ignored."""
+    match_relative = _relative_matcher(repo_path, ignore_matches)
+    directories = []
+    to_walk = [("", repo_path)]
+    while to_walk:
+        prefix, directory = to_walk.pop()
+        directories.append(directory)
+        try:
+            with os.scandir(str(directory)) as scanner:
+                for entry in scanner:
+                    rel_path = prefix + entry.name
+                    if entry.is_dir(follow_symlinks=False) and not match_relative(
+                        rel_path, True
+                    ):
+                        to_walk.append((rel_path + "/", Path(entry.path)))
+        except OSError:
+            continue
+    return directories
@@ -0,0 +1,328 @@
+"""Watch mode: keeps the stats of the po files in memory and updates the
+output as they change.
+
+Changes are watched using inotify on Linux, or by polling elsewhere.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+from typing import Union
+
+from potodo.json import counts_record
+from potodo.json import print_ndjson
+from potodo.json import text_size_record
+from potodo.po_file import PoFileStats
+from potodo.tree import add_counts
+from potodo.tree import NO_COUNTS
+from potodo.walk import iter_po_directories
+from potodo.walk import select_po_files
+from potodo.walk import walk_directories
+from potodo.walk import walk_po_files
+
+# Seconds without new events after which a save is considered done
+DEBOUNCE_DELAY = 0.02
+POLLING_INTERVAL = 0.5
+
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_Q_OVERFLOW = 0x4000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (
+    IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """Watches the directories of a repository using Linux's inotify."""
+
+    def __init__(self, repo_path: Path, ignore_matches: Callable[[str], bool]):
+        self.repo_path = repo_path
+        self.ignore_matches = ignore_matches
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.watches: Dict[int, Path] = {}
+        for directory in walk_directories(repo_path, ignore_matches):
+            self.add_watch(directory)
+        logging.debug("Watching %s directories with inotify", len(self.watches))
+
+    def add_watch(self, directory: Path) -> None:
+        wd = self.libc.inotify_add_watch(
+            self.fd, os.fsencode(str(directory)), WATCH_MASK
+        )
+        if wd < 0:
+            logging.debug("Can't watch %s", directory)
+        else:
+            self.watches[wd] = directory
+
+    def wait(self, timeout: Optional[float]) -> Optional[Set[Path]]:
+        """Waits up to `timeout` seconds (forever if None) for po files to
+        change, giving the paths which may have, or None if events were lost
+        and the whole repository has to be read again."""
+        changes: Optional[Set[Path]] = set()
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return changes
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changes
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            start = offset + EVENT_HEADER.size
+            offset = start + length
+            name = os.fsdecode(data[start:offset].rstrip(b"\0"))
+            if mask & IN_Q_OVERFLOW:
+                changes = None
+                continue
+            if wd not in self.watches:
+                continue
+            if mask & IN_DELETE_SELF:
+                paths = {self.watches[wd]}
+            elif mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # Also watch the new directory and its own subdirectories,
+                # and read the files moved in with it
+                path = self.watches[wd] / name
+                for directory in walk_directories(path, self.ignore_matches):
+                    self.add_watch(directory)
+                paths = {
+                    po_file
+                    for _, po_files in iter_po_directories(
+                        self.repo_path,
+                        self.ignore_matches,
+                        path.relative_to(self.repo_path).as_posix(),
+                    )
+                    for po_file in po_files
+                }
+            elif mask & IN_ISDIR or name.endswith(".po"):
+                paths = {self.watches[wd] / name}
+            else:
+                continue
+            if changes is not None:
+                changes.update(paths)
+        return changes
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Watches the po files of a repository by checking them periodically."""
+
+    def __init__(self, repo_path: Path, ignore_matches: Callable[[str], bool]):
+        self.repo_path = repo_path
+        self.ignore_matches = ignore_matches
+        self.snapshot = self.take_snapshot()
+
+    def take_snapshot(self) -> Dict[Path, Tuple[int, int]]:
+        snapshot = {}
+        for po_file in walk_po_files(self.repo_path, self.ignore_matches):
+            try:
+                stat = po_file.stat()
+            except OSError:
+                continue
+            snapshot[po_file] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def wait(self, timeout: Optional[float]) -> Optional[Set[Path]]:
+        """Waits up to `timeout` seconds (forever if None) for po files to
+        change, giving the paths which did."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self.take_snapshot()
+            if snapshot != self.snapshot:
+                changes = {
+                    po_file
+                    for po_file in snapshot.keys() | self.snapshot.keys()
+                    if snapshot.get(po_file) != self.snapshot.get(po_file)
+                }
+                self.snapshot = snapshot
+                return changes
+            if deadline is None:
+                time.sleep(POLLING_INTERVAL)
+            elif time.monotonic() >= deadline:
+                return set()
+            else:
+                time.sleep(min(POLLING_INTERVAL, deadline - time.monotonic()))
+
+    def close(self) -> None:
+        pass
+
+
+Watcher = Union[InotifyWatcher, PollingWatcher]
+
+
+def open_watcher(repo_path: Path, ignore_matches: Callable[[str], bool]) -> Watcher:
+    """Watches using inotify where available, by polling otherwise."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(repo_path, ignore_matches)
+        except (OSError, AttributeError) as err:
+            logging.info("Can't use inotify (%s), polling instead", err)
+    return PollingWatcher(repo_path, ignore_matches)
+
+
+def wait_for_changes(watcher: Watcher) -> Optional[Set[Path]]:
+    """Waits for po files to change, and for the editors saving them to be
+    done, giving the paths which may have changed, or None if the whole
+    repository has to be read again."""
+    changes = watcher.wait(None)
+    while changes == set():
+        changes = watcher.wait(None)
+    # Editors save in several steps, wait for them to be done
+    while True:
+        more = watcher.wait(DEBOUNCE_DELAY)
+        if more == set():
+            return changes
+        if changes is None or more is None:
+            changes = None
+        else:
+            changes |= more
+
+
+def refresh_index(
+    index: Dict[Path, PoFileStats],
+    repo_path: Path,
+    ignore_matches: Callable[[str], bool],
+    engine: str = "scan",
+    paths: Optional[Iterable[Path]] = None,
+) -> Tuple[List[PoFileStats], List[Path]]:
+    """Updates the stats of the po files which changed, returning them along
+    with the paths of the files which were removed.
+
+    Only `paths`, as given by a watcher, are checked if given, otherwise the
+    whole repository is walked again.
+    """
+    if paths is None:
+        po_files = walk_po_files(repo_path, ignore_matches)
+        removed = sorted(set(index) - set(po_files))
+    else:
+        paths = list(paths)
+        po_files = select_po_files(
+            repo_path,
+            ignore_matches,
+            [
+                path.relative_to(repo_path).as_posix()
+                for path in paths
+                if path.name.endswith(".po") and path.is_file()
+            ],
+        )
+        gone = set()
+        for path in paths:
+            if path.exists():
+                continue
+            if path in index:
+                gone.add(path)
+            else:
+                # A directory, removed along with its files
+                gone.update(po_file for po_file in index if path in po_file.parents)
+        removed = sorted(gone)
+    changed = []
+    for po_file in po_files:
+        po_file_stats = index.get(po_file)
+        try:
+            if po_file_stats and po_file_stats.is_up_to_date(po_file.stat()):
+                continue
+            po_file_stats = PoFileStats(po_file, engine)
+        except OSError:
+            # Removed since the walk
+            continue
+        index[po_file] = po_file_stats
+        changed.append(po_file_stats)
+    for po_file in removed:
+        del index[po_file]
+    return changed, removed
+
+
+def print_delta(
+    changed: Iterable[PoFileStats],
+    removed: Iterable[Path],
+    po_files: Iterable[PoFileStats],
+) -> None:
+    """Prints the files which changed, and the new total, as a NDJSON record."""
+    total = NO_COUNTS
+    for po_file in po_files:
+        total = add_counts(total, po_file.counts)
+    print_ndjson(
+        "delta",
+        changed=[
+            dict(
+                path=str(po_file.path),
+                entries=po_file.po_file_size,
+                fuzzies=po_file.fuzzy_nb,
+                translated=po_file.translated_nb,
+                percent_translated=po_file.percent_translated,
+                **text_size_record(po_file.counts),
+            )
+            for po_file in changed
+        ],
+        removed=[str(po_file) for po_file in removed],
+        total=counts_record(total),
+    )
+
+
+def watch_repository(
+    repo_path: Path,
+    ignore_matches: Callable[[str], bool],
+    po_files: Iterable[PoFileStats],
+    render: Callable[[List[PoFileStats]], None],
+    json_delta: bool = False,
+    engine: str = "scan",
+    watcher: Optional[Watcher] = None,
+) -> None:
+    """Updates the output each time po files change, until interrupted.
+
+    Only the changed files are parsed again. Then the whole output is redrawn
+    using `render`, or with `json_delta` only the changes are printed.
+    """
+    index = {po_file.path: po_file for po_file in po_files}
+    if watcher is None:
+        watcher = open_watcher(repo_path, ignore_matches)
+    sys.stdout.flush()
+    try:
+        while True:
+            changes = wait_for_changes(watcher)
+            changed, removed = refresh_index(
+                index, repo_path, ignore_matches, engine, changes
+            )
+            if not changed and not removed:
+                continue
+            logging.info("%s files changed, %s removed", len(changed), len(removed))
+            if json_delta:
+                print_delta(changed, removed, index.values())
+            else:
+                if sys.stdout.isatty():
+                    # Clear the screen
+                    sys.stdout.write("\033[H\033[2J")
+                render(list(index.values()))
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
@@ -1,13 +1,58 @@
+import shutil
+import subprocess
 from pathlib import Path
 
 import pytest
 
 
+def git(repo, *args):
+    """Runs git in `repo`, giving its output."""
+    return subprocess.run(
+        ["git", "-c", "user.name=potodo", "-c", "user.email=potodo@example.com"]
+        + list(args),
+        cwd=str(repo),
+        check=True,
+        stdout=subprocess.PIPE,
+    ).stdout.decode()
+
+
+def write_po(path, translated, untranslated):
+    """Writes a po file with this number of translated and untranslated
+    entries."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    entries = [f'msgid "t{i}"\nmsgstr "T{i}"\n' for i in range(translated)]
+    entries += [f'msgid "u{i}"\nmsgstr ""\n' for i in range(untranslated)]
+    path.write_text("\n".join(entries))
+
+
+def commit(repo, message):
+    """Commits all the files of `repo`, giving the sha of the commit."""
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", message)
+    return git(repo, "rev-parse", "HEAD").strip()
+
+
+@pytest.fixture(autouse=True)
+def user_cache_dir(tmp_path, monkeypatch):
+    """Keep the cache shared by all repositories out of the user's home."""
+    cache_dir = tmp_path / "user-cache"
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache_dir))
+    return cache_dir / "potodo"
+
+
 @pytest.fixture
 def repo_dir():
     return Path(__file__).resolve().parent / "fixtures" / "repository"
 
 
+@pytest.fixture
+def repo_copy(repo_dir, tmp_path):
+    """A copy of the fixture repository, which tests can change."""
+    repo = tmp_path / "repository"
+    shutil.copytree(str(repo_dir), str(repo), ignore=shutil.ignore_patterns(".potodo"))
+    return repo
+
+
 @pytest.fixture
 def base_config(repo_dir):
     return {
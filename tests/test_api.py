@@ -0,0 +1,52 @@
+import itertools
+
+import potodo
+import potodo.api
+from potodo.po_file import PoFileStats
+
+
+def test_scan(repo_dir):
+    results = list(potodo.scan(repo_dir, exclude=["excluded/"], cache_backend=None))
+
+    assert [(type(result).__name__, result.path.name) for result in results[:2]] == [
+        ("FileResult", "file1.po"),
+        ("FileResult", "file2.po"),
+    ]
+    file1 = results[0]
+    assert (file1.directory, file1.entries, file1.fuzzy) == (".", 3, 1)
+    assert file1.percent_translated == 33
+    assert file1.reserved_by is None
+
+    directories = [
+        result for result in results if isinstance(result, potodo.DirectoryResult)
+    ]
+    assert [directory.path for directory in directories] == [".", "folder"]
+    assert [len(directory.files) for directory in directories] == [2, 2]
+    assert directories[1].percent_translated == 100 / 3
+
+
+def test_scan_filters(repo_dir):
+    results = potodo.scan(repo_dir, only_fuzzy=True, cache_backend=None)
+    files = [result for result in results if isinstance(result, potodo.FileResult)]
+    assert [po_file.filename for po_file in files] == ["file1.po"]
+
+    results = list(potodo.scan(repo_dir, directory="folder", cache_backend=None))
+    assert [result.path.name for result in results[:-1]] == ["excluded.po", "file3.po"]
+    assert results[-1].path == "folder"
+
+
+def test_scan_is_lazy(repo_dir, monkeypatch):
+    parsed = []
+
+    def parse(path, engine="scan"):
+        parsed.append(path.name)
+        return PoFileStats(path, engine)
+
+    monkeypatch.setattr(potodo.api, "PoFileStats", parse)
+    results = potodo.scan(repo_dir, cache_backend=None)
+    assert parsed == []
+    assert [result.filename for result in itertools.islice(results, 2)] == [
+        "file1.po",
+        "file2.po",
+    ]
+    assert parsed == ["file1.po", "file2.po"]
@@ -0,0 +1,31 @@
+from benchmarks.generate import generate_repository
+from benchmarks.generate import RepositorySpec
+from potodo.scanner import polib_po_counts
+from potodo.scanner import scan_po_file
+from potodo.tree import add_counts
+from potodo.tree import NO_COUNTS
+
+
+def read_repository(path):
+    return {
+        po_file.relative_to(path).as_posix(): po_file.read_bytes()
+        for po_file in path.rglob("*.po")
+    }
+
+
+def test_generated_repository(tmp_path):
+    spec = RepositorySpec(files=20, entries=50, plural=0.2, depth=2, seed=42)
+    counts = generate_repository(tmp_path / "first", spec)
+    generate_repository(tmp_path / "second", spec)
+
+    first = read_repository(tmp_path / "first")
+    assert len(first) == 20
+    assert "section2/section0/file2.po" in first
+    assert first == read_repository(tmp_path / "second")
+    assert all(counts)
+
+    for count_po_file in (scan_po_file, polib_po_counts):
+        total = NO_COUNTS
+        for po_file in (tmp_path / "first").rglob("*.po"):
+            total = add_counts(total, count_po_file(po_file))
+        assert total == counts
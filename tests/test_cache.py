@@ -0,0 +1,98 @@
+import subprocess
+import sys
+import time
+
+import pytest
+
+import potodo.cache
+from potodo.cache import get_cache_counters
+from potodo.cache import open_cache
+from potodo.cache import record_cache_counters
+from potodo.cache import SharedStatsStore
+from potodo.commands import cache_command
+from potodo.entries import open_entry_index
+from potodo.history import HistoryDatabase
+from potodo.po_file import get_po_stats_from_repo_or_cache
+from potodo.po_file import PoFileStats
+from potodo.potodo import build_ignore_matcher
+
+
+@pytest.mark.parametrize("backend", ["pickle", "sqlite"])
+def test_deleted_and_excluded_files_are_evicted(repo_copy, backend):
+    get_po_stats_from_repo_or_cache(
+        repo_copy, build_ignore_matcher(repo_copy, []), cache_backend=backend
+    )
+    (repo_copy / "file2.po").unlink()
+    get_po_stats_from_repo_or_cache(
+        repo_copy, build_ignore_matcher(repo_copy, ["excluded/"]), cache_backend=backend
+    )
+    cache = open_cache(repo_copy, backend)
+    assert sorted(path.name for path in cache.paths()) == [
+        "excluded.po",
+        "file1.po",
+        "file3.po",
+    ]
+    cache.close()
+    assert get_cache_counters(repo_copy) == {"hits": 3, "misses": 5}
+
+
+def test_counters_are_never_partially_written(tmp_path, monkeypatch):
+    record_cache_counters(tmp_path, 1, 2)
+
+    def interrupted_dump(obj, handle):
+        handle.write('{"hits": ')
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(potodo.cache.json, "dump", interrupted_dump)
+    with pytest.raises(KeyboardInterrupt):
+        record_cache_counters(tmp_path, 1, 2)
+    assert get_cache_counters(tmp_path) == {"hits": 1, "misses": 2}
+
+
+def test_empty_repository(tmp_path):
+    # Used to fail writing the counters, .potodo/ not being created
+    subprocess.check_output(
+        [sys.executable, "-m", "potodo", "-p", str(tmp_path), "--no-server"]
+    )
+    assert get_cache_counters(tmp_path) == {"hits": 0, "misses": 0}
+
+
+def test_shared_store_evicts_least_recently_used(repo_dir, user_cache_dir):
+    store = SharedStatsStore()
+    stats = [PoFileStats(path) for path in sorted(repo_dir.rglob("*.po"))]
+    store.store(stats)
+    store.connection.execute(
+        "UPDATE blobs SET last_used = ? WHERE sha = ?",
+        (time.time() - 3600, stats[0].sha),
+    )
+    assert store.entries() == 3  # Some fixtures have the same content
+    assert store.prune(max_age=24 * 3600, max_entries=1) == 2
+    assert store.entries() == 1
+    assert stats[0].sha not in store.lookup([s.sha for s in stats])
+    store.close()
+
+
+def test_cache_command(repo_copy, capsys, user_cache_dir):
+    ignore_matches = build_ignore_matcher(repo_copy, [])
+    get_po_stats_from_repo_or_cache(repo_copy, ignore_matches)
+    get_po_stats_from_repo_or_cache(repo_copy, ignore_matches)
+
+    open_entry_index(repo_copy, [], jobs=1).close()
+    HistoryDatabase(repo_copy).close()
+
+    cache_command(["stats", "-p", str(repo_copy)])
+    out = capsys.readouterr().out
+    assert "# Repository cache" in out
+    assert "- entries:  5" in out
+    assert "- hit rate: 50.0% (5 hits, 5 misses)" in out
+    assert "# Entries index" in out
+    assert "- files:    5" in out
+    assert "# History" in out
+    assert "- commits:  0" in out
+    assert "# Shared cache" in out
+
+    cache_command(["clear", "-p", str(repo_copy), "--shared"])
+    assert not (repo_copy / ".potodo" / "cache.pickle").exists()
+    assert not (repo_copy / ".potodo" / "entries.sqlite").exists()
+    assert not (repo_copy / ".potodo" / "history.sqlite").exists()
+    assert not (user_cache_dir / "stats.sqlite").exists()
@@ -0,0 +1,82 @@
+import json
+import shutil
+
+import pytest
+from conftest import commit
+from conftest import git
+from conftest import write_po
+
+from potodo.commands import diff_command
+from potodo.diff import diff_files
+from potodo.diff import directory_deltas
+from potodo.potodo import build_ignore_matcher
+
+pytestmark = pytest.mark.skipif(not shutil.which("git"), reason="needs git")
+
+
+@pytest.fixture
+def diff_repo(tmp_path):
+    repo = tmp_path / "repository"
+    repo.mkdir()
+    git(repo, "init", "-q")
+    (repo / ".gitignore").write_text(".potodo/\n")
+    write_po(repo / "library" / "os.po", 0, 4)
+    write_po(repo / "library" / "sys.po", 2, 2)
+    write_po(repo / "tutorial.po", 1, 1)
+    commit(repo, "Initial commit")
+    write_po(repo / "library" / "os.po", 3, 1)
+    write_po(repo / "library" / "io.po", 1, 0)
+    (repo / "tutorial.po").unlink()
+    commit(repo, "Translate os and io, remove the tutorial")
+    return repo
+
+
+def test_diff_files(diff_repo, monkeypatch):
+    deltas = diff_files(diff_repo, "HEAD~", "HEAD", build_ignore_matcher(diff_repo, []))
+    assert [(delta.path, delta.status) for delta in deltas] == [
+        ("library/io.po", "added"),
+        ("library/os.po", "modified"),
+        ("tutorial.po", "deleted"),
+    ]
+    assert tuple(deltas[1].delta)[:4] == (3, 0, -3, 0)
+    assert {
+        path: tuple(delta)[:4] for path, delta in directory_deltas(deltas).items()
+    } == {".": (3, 0, -4, 0), "library": (4, 0, -3, 0)}
+
+    deltas = diff_files(
+        diff_repo, "HEAD~", "HEAD", build_ignore_matcher(diff_repo, ["library/"])
+    )
+    assert [delta.path for delta in deltas] == ["tutorial.po"]
+
+    # The working tree isn't read
+    (diff_repo / "library" / "os.po").unlink()
+    deltas = diff_files(diff_repo, "HEAD", "HEAD~", build_ignore_matcher(diff_repo, []))
+    assert tuple(deltas[1].delta)[:4] == (-3, 0, 3, 0)
+
+
+def test_diff_command(diff_repo, capsys):
+    diff_command(["-p", str(diff_repo), "HEAD~"])
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith("# Files changed between ")
+    assert (
+        "- library/io.po: +1 translated, +0 fuzzy, +0 untranslated (added, "
+        "100.00%)" in lines
+    )
+    assert (
+        "- library/os.po: +3 translated, +0 fuzzy, -3 untranslated "
+        "(0.00% -> 75.00%)" in lines
+    )
+    assert "- tutorial.po: -1 translated, +0 fuzzy, -1 untranslated (deleted)" in lines
+    assert "- .: +3 translated, +0 fuzzy, -4 untranslated" in lines
+
+    diff_command(["-p", str(diff_repo), "--json", "HEAD~", "HEAD"])
+    result = json.loads(capsys.readouterr().out)
+    assert result["files"][0]["before"] is None
+    assert result["files"][1]["after"]["percent_translated"] == 75.0
+    assert result["directories"][1] == dict(
+        path="library", delta=dict(result["directories"][1]["delta"], translated=4)
+    )
+
+    with pytest.raises(SystemExit):
+        diff_command(["-p", str(diff_repo), "unknown"])
+    assert "Unknown revision" in capsys.readouterr().out
@@ -1,4 +1,8 @@
+import os
+
+from potodo.potodo import build_ignore_matcher
 from potodo.potodo import exec_potodo
+from potodo.walk import walk_po_files
 
 
 def test_no_exclude(capsys, base_config):
@@ -42,3 +46,31 @@ def test_exclude_single_file(capsys, base_config):
     assert "file2" not in out
     assert "file3" in out
     assert "file4" in out
+
+
+def test_ignored_directories_are_not_walked(tmp_path, monkeypatch):
+    for directory in "library", "venv/lib/python", ".git/objects":
+        (tmp_path / directory).mkdir(parents=True)
+        (tmp_path / directory / "file.po").write_text('msgid "a"\nmsgstr ""\n')
+    (tmp_path / ".potodoignore").write_text("venv/\n")
+
+    walked = []
+    scandir = os.scandir
+
+    def recording_scandir(path):
+        walked.append(os.path.relpath(path, str(tmp_path)))
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", recording_scandir)
+    po_files = walk_po_files(tmp_path, build_ignore_matcher(tmp_path, []))
+    assert po_files == [tmp_path / "library" / "file.po"]
+    assert sorted(walked) == [".", "library"]
+
+
+def test_negated_patterns_reinclude_files(capsys, base_config):
+    base_config["exclude"] = ["*.po", "!file1.po"]
+    exec_potodo(**base_config)
+    out, err = capsys.readouterr()
+    assert "file1" in out
+    assert "file2" not in out
+    assert "file3" not in out
@@ -0,0 +1,158 @@
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs
+from urllib.parse import urlsplit
+
+import pytest
+
+from potodo.forge_api import _get_reservation_list
+from potodo.forge_api import ForgeClient
+from potodo.forge_api import ReservationCache
+
+PAGES = 5
+LATENCY = 0.2
+
+
+class ForgeServer(ThreadingMixIn, HTTPServer):
+    """Stand-in for the issues API of a forge, with latency and rate limits."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), ForgeHandler)
+        self.requests = Counter()
+        self.not_modified = Counter()
+        # Responses to give instead of the pages, as (status, headers)
+        self.rate_limits = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/issues?state=open&page=1"
+
+
+class ForgeHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        page = int(parse_qs(urlsplit(self.path).query)["page"][0])
+        with self.server.lock:
+            self.server.requests[page] += 1
+            rate_limit = (
+                self.server.rate_limits.pop(0) if self.server.rate_limits else None
+            )
+        if rate_limit:
+            status, headers = rate_limit
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+        etag = f'"page-{page}"'
+        if self.headers.get("If-None-Match") == etag:
+            with self.server.lock:
+                self.server.not_modified[page] += 1
+            self.send_response(304)
+            self.end_headers()
+            return
+        base = f"http://127.0.0.1:{self.server.server_port}/issues?state=open"
+        links = [f'<{base}&page={PAGES}>; rel="last"']
+        if page < PAGES:
+            links.append(f'<{base}&page={page + 1}>; rel="next"')
+        body = json.dumps(
+            [
+                {
+                    "title": f"Traduction de library/file{page}.po",
+                    "created_at": "2020-10-1{}T12:00:00Z".format(page),
+                    "user": {"login": f"user{page}"},
+                }
+            ]
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Link", ", ".join(links))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def forge():
+    server = ForgeServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_pages_are_fetched_concurrently_and_once(forge):
+    start = time.monotonic()
+    reservations = _get_reservation_list(forge.url)
+    elapsed = time.monotonic() - start
+
+    assert sorted(reservations) == [f"library/file{page}.po" for page in range(1, 6)]
+    assert reservations["library/file3.po"][0] == "user3"
+    assert forge.requests == {page: 1 for page in range(1, PAGES + 1)}
+    # The first page, then all the others at once
+    assert elapsed < (PAGES - 1) * LATENCY
+
+
+def test_rate_limits_are_honoured(forge):
+    forge.rate_limits = [
+        (429, {"Retry-After": "2"}),
+        (403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "0"}),
+    ]
+    client = ForgeClient(workers=1, max_wait=1.5)
+    delays = []
+    client.sleep = delays.append
+
+    assert len(client.get_all_pages(forge.url)) == PAGES
+    # Bounded by max_wait, and the reset time is already past
+    assert delays == [1.5, 0.0]
+    assert forge.requests[1] == 3
+
+
+def test_reservations_are_empty_when_rate_limit_persists(forge):
+    forge.rate_limits = [(429, {"Retry-After": "0"})] * 3
+    client = ForgeClient(max_retries=2)
+
+    assert _get_reservation_list(forge.url, client) == {}
+    assert forge.requests == {1: 3}
+
+
+def test_reservations_are_cached(forge, tmp_path):
+    reservations = _get_reservation_list(forge.url, cache=ReservationCache(tmp_path))
+    assert (tmp_path / ".potodo" / "reservations.json").exists()
+
+    # Pages are requested again, but only downloaded if they changed
+    cache = ReservationCache(tmp_path)
+    assert _get_reservation_list(forge.url, cache=cache) == reservations
+    assert forge.requests == {page: 2 for page in range(1, PAGES + 1)}
+    assert forge.not_modified == {page: 1 for page in range(1, PAGES + 1)}
+
+    # Recently fetched pages aren't requested at all
+    client = ForgeClient(max_age=60)
+    assert _get_reservation_list(forge.url, client, cache) == reservations
+    assert forge.requests == {page: 2 for page in range(1, PAGES + 1)}
+
+
+def test_stale_reservations_are_used_when_the_forge_fails(forge, tmp_path):
+    reservations = _get_reservation_list(forge.url, cache=ReservationCache(tmp_path))
+    forge.rate_limits = [(503, {})] * 2
+
+    client = ForgeClient(max_retries=0)
+    assert _get_reservation_list(forge.url, client, ReservationCache(tmp_path)) == {}
+    client = ForgeClient(max_retries=0, stale_if_error=True)
+    assert (
+        _get_reservation_list(forge.url, client, ReservationCache(tmp_path))
+        == reservations
+    )
@@ -0,0 +1,70 @@
+import shutil
+
+import pytest
+from conftest import git
+
+from potodo.po_file import get_po_stats_from_repo_or_cache
+from potodo.potodo import build_ignore_matcher
+
+pytestmark = pytest.mark.skipif(not shutil.which("git"), reason="needs git")
+
+
+@pytest.fixture
+def git_repo(repo_dir, tmp_path):
+    repo = tmp_path / "repository"
+    shutil.copytree(str(repo_dir), str(repo), ignore=shutil.ignore_patterns(".potodo"))
+    (repo / ".gitignore").write_text(".potodo/\nfolder/excluded.po\n")
+    git(repo, "init", "-q")
+    git(repo, "add", ".")
+    git(repo, "commit", "-q", "-m", "Initial commit")
+    return repo
+
+
+def stats(repo, exclude=(), **kwargs):
+    po_files = get_po_stats_from_repo_or_cache(
+        repo, build_ignore_matcher(repo, list(exclude)), use_git=True, **kwargs
+    )
+    return {
+        po_file.path.relative_to(repo).as_posix(): po_file
+        for files in po_files.values()
+        for po_file in files
+    }
+
+
+def test_git_lists_the_files_not_ignored_by_git(git_repo):
+    (git_repo / "untracked.po").write_text('msgid "Untracked"\nmsgstr ""\n')
+    (git_repo / "folder" / "file3.po").unlink()
+    assert sorted(stats(git_repo, ["excluded/"])) == [
+        "file1.po",
+        "file2.po",
+        "untracked.po",
+    ]
+
+
+def test_git_only_parses_changed_blobs(git_repo, monkeypatch):
+    stats(git_repo)
+    # Unmodified files are known by their blob id, without being stat'ed
+    # or parsed, even when their modification time changed
+    (git_repo / "file1.po").touch()
+
+    def parse_po_files(paths, *args):
+        assert not paths
+        return []
+
+    monkeypatch.setattr("potodo.po_file.parse_po_files", parse_po_files)
+    assert stats(git_repo, shared_cache=False)["file1.po"].fuzzy_nb == 1
+
+    monkeypatch.undo()
+    with open(git_repo / "file2.po", "a") as po_file:
+        po_file.write('\nmsgid "Another"\nmsgstr ""\n')
+    assert stats(git_repo)["file2.po"].untranslated_nb == 2
+
+
+def test_git_falls_back_to_the_walk(repo_dir, tmp_path):
+    repo = tmp_path / "repository"
+    shutil.copytree(str(repo_dir), str(repo), ignore=shutil.ignore_patterns(".potodo"))
+    assert sorted(stats(repo, ["excluded/", "excluded.po"])) == [
+        "file1.po",
+        "file2.po",
+        "folder/file3.po",
+    ]
@@ -0,0 +1,114 @@
+import json
+import shutil
+
+import pytest
+from conftest import commit
+from conftest import git
+from conftest import write_po
+
+from potodo.commands import history_command
+from potodo.history import HistoryDatabase
+from potodo.history import update_history
+from potodo.potodo import build_ignore_matcher
+
+pytestmark = pytest.mark.skipif(not shutil.which("git"), reason="needs git")
+
+
+@pytest.fixture
+def history_repo(tmp_path):
+    repo = tmp_path / "repository"
+    repo.mkdir()
+    git(repo, "init", "-q")
+    (repo / ".gitignore").write_text(".potodo/\n")
+    write_po(repo / "library" / "os.po", 0, 4)
+    write_po(repo / "tutorial.po", 1, 1)
+    commit(repo, "Initial commit")
+    write_po(repo / "library" / "os.po", 2, 2)
+    commit(repo, "Translate os")
+    (repo / "README").write_text("Hello\n")
+    commit(repo, "Add a README")
+    write_po(repo / "library" / "sys.po", 4, 0)
+    (repo / "tutorial.po").unlink()
+    commit(repo, "Translate sys, remove the tutorial")
+    return repo
+
+
+def read_history(repo, since=None, exclude=(), directory=None):
+    database = HistoryDatabase(repo)
+    update_history(repo, since, build_ignore_matcher(repo, list(exclude)), database)
+    points = database.points(directory)
+    database.close()
+    return [
+        {name: tuple(counts)[:4] for name, counts in point.directories.items()}
+        for point in points
+    ]
+
+
+def test_history_carries_unchanged_files_forward(history_repo):
+    assert read_history(history_repo) == [
+        {".": (1, 0, 5, 0), "library": (0, 0, 4, 0)},
+        {".": (3, 0, 3, 0), "library": (2, 0, 2, 0)},
+        # The README commit doesn't change any po file
+        {".": (6, 0, 2, 0), "library": (6, 0, 2, 0)},
+    ]
+    assert read_history(history_repo, directory="library") == [
+        {"library": (0, 0, 4, 0)},
+        {"library": (2, 0, 2, 0)},
+        {"library": (6, 0, 2, 0)},
+    ]
+
+
+def test_history_since_and_exclude(history_repo):
+    since = git(history_repo, "rev-parse", "HEAD~2").strip()
+    assert read_history(history_repo, since) == [
+        {".": (6, 0, 2, 0), "library": (6, 0, 2, 0)},
+    ]
+    assert read_history(history_repo, exclude=["library/"]) == [
+        {".": (1, 0, 1, 0)},
+        {".": (0, 0, 0, 0)},
+    ]
+
+
+def test_history_only_reads_new_commits(history_repo, monkeypatch):
+    read_history(history_repo)
+    parsed = []
+    import potodo.history
+
+    def scan_po_lines(lines):
+        parsed.append(lines)
+        return scan(lines)
+
+    scan = potodo.history.scan_po_lines
+    monkeypatch.setattr(potodo.history, "scan_po_lines", scan_po_lines)
+    write_po(history_repo / "library" / "os.po", 3, 1)
+    commit(history_repo, "Translate os further")
+    # Only the new content is parsed, the others being in the shared cache
+    assert read_history(history_repo)[-1] == {
+        ".": (7, 0, 1, 0),
+        "library": (7, 0, 1, 0),
+    }
+    assert len(parsed) == 1
+
+    # The history is read again once HEAD doesn't follow the last commit read
+    git(history_repo, "reset", "-q", "--hard", "HEAD~2")
+    assert read_history(history_repo) == [
+        {".": (1, 0, 5, 0), "library": (0, 0, 4, 0)},
+        {".": (3, 0, 3, 0), "library": (2, 0, 2, 0)},
+    ]
+
+
+def test_history_command(history_repo, capsys):
+    history_command(["-p", str(history_repo)])
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == "# Progress of ."
+    assert lines[2].endswith("16.67%  1/6 translated, 0 fuzzy")
+    assert lines[4].endswith("75.00%  6/8 translated, 0 fuzzy")
+
+    history_command(["-p", str(history_repo), "--json", "--rebuild"])
+    points = json.loads(capsys.readouterr().out)
+    assert len(points) == 3
+    assert points[-1]["directories"]["library"]["percent_translated"] == 75.0
+
+    with pytest.raises(SystemExit):
+        history_command(["-p", str(history_repo), "--since", "unknown"])
+    assert "Unknown revision" in capsys.readouterr().out
@@ -0,0 +1,69 @@
+import pytest
+
+import potodo.interactive
+from potodo.po_file import get_po_stats_from_repo_or_cache
+from potodo.potodo import build_ignore_matcher
+
+
+@pytest.fixture
+def po_files(repo_dir):
+    return get_po_stats_from_repo_or_cache(
+        repo_dir,
+        build_ignore_matcher(repo_dir, ["excluded/", "excluded.po"]),
+        no_cache=True,
+    )
+
+
+def test_interactive_menus_show_stats(repo_dir, po_files, monkeypatch):
+    menus = []
+    opened = []
+    # Picks "folder", then its first file, then confirms
+    choices = iter([1, 0, 0])
+
+    class TerminalMenu:
+        def __init__(self, menu_entries, **kwargs):
+            menus.append(list(menu_entries))
+
+        def show(self):
+            return next(choices)
+
+    monkeypatch.setattr(potodo.interactive, "TerminalMenu", TerminalMenu)
+    monkeypatch.setattr(potodo.interactive.webbrowser, "open", opened.append)
+    potodo.interactive.interactive_output(repo_dir, po_files)
+
+    directories, files, _ = menus
+    assert [label.split(" (")[0] for label in directories] == [
+        ".",
+        "folder",
+        "[q] Quit",
+    ]
+    assert all("% done, " in label for label in directories[:2])
+    assert files == [
+        potodo.interactive.file_label(po_file) for po_file in po_files["folder"]
+    ] + ["[;] Back", "[q] Quit"]
+    assert files[0].startswith("file3.po (")
+    assert "sur%20folder/file3.po&" in opened[0]
+
+
+def test_interactive_root_files_are_named_after_the_repository(
+    repo_dir, po_files, monkeypatch
+):
+    titles = []
+    opened = []
+    # Picks ".", then its first file, then confirms
+    choices = iter([0, 0, 0])
+
+    class TerminalMenu:
+        def __init__(self, menu_entries, title, **kwargs):
+            titles.append(title)
+
+        def show(self):
+            return next(choices)
+
+    monkeypatch.setattr(potodo.interactive, "TerminalMenu", TerminalMenu)
+    monkeypatch.setattr(potodo.interactive.webbrowser, "open", opened.append)
+    potodo.interactive.interactive_output(repo_dir, po_files)
+
+    assert titles[1] == f"Choose a file from {repo_dir.name}"
+    # The reservations are only found with the directory in the title
+    assert f"sur%20{repo_dir.name}/file1.po&" in opened[0]
@@ -0,0 +1,70 @@
+import json
+import shutil
+
+import pytest
+
+from potodo.multi import read_manifest
+from potodo.multi import Repository
+from potodo.potodo import exec_potodo
+
+
+@pytest.fixture
+def translations(repo_dir, tmp_path):
+    """The same project translated in two languages, one lagging behind."""
+    for language in ("fr", "es"):
+        shutil.copytree(
+            str(repo_dir),
+            str(tmp_path / language),
+            ignore=shutil.ignore_patterns(".potodo"),
+        )
+    (tmp_path / "es" / "folder" / "file3.po").unlink()
+    return tmp_path
+
+
+def test_read_manifest(translations):
+    manifest = translations / "manifest.txt"
+    manifest.write_text(
+        "# Translations of the project\n"
+        "fr https://git.afpy.org/api/v1/repos/AFPy/python-docs-fr/issues\n"
+        "\n"
+        "es\n"
+    )
+    assert read_manifest(manifest) == [
+        Repository(
+            translations / "fr",
+            "https://git.afpy.org/api/v1/repos/AFPy/python-docs-fr/issues",
+        ),
+        Repository(translations / "es"),
+    ]
+
+
+def test_repositories_report_and_comparison(capsys, base_config, translations):
+    base_config.update(
+        json_format=True,
+        repositories=[Repository(translations / "fr"), Repository(translations / "es")],
+    )
+    exec_potodo(**base_config)
+    report = json.loads(capsys.readouterr().out)
+
+    assert [repository["name"] for repository in report["repositories"]] == [
+        "fr",
+        "es",
+    ]
+    assert [
+        directory["name"] for directory in report["repositories"][1]["directories"]
+    ] == ["es/"]
+    assert report["comparison"] == [
+        {"path": "file1.po", "percent_translated": {"fr": 33, "es": 33}},
+        {"path": "file2.po", "percent_translated": {"fr": 0, "es": 0}},
+        {"path": "folder/file3.po", "percent_translated": {"fr": 0, "es": None}},
+    ]
+
+
+def test_repositories_text_comparison(capsys, base_config, translations):
+    base_config.update(
+        repositories=[Repository(translations / "fr"), Repository(translations / "es")],
+    )
+    exec_potodo(**base_config)
+    output = capsys.readouterr().out
+    assert f"# == fr ({translations / 'fr'}) ==" in output
+    assert "folder/file3.po     0%      -" in output
@@ -0,0 +1,145 @@
+import shutil
+import sqlite3
+
+from potodo import po_file
+from potodo.cache import get_cache_file_content
+from potodo.cache import set_cache_content
+from potodo.po_file import content_hash
+from potodo.po_file import get_po_stats_from_repo_or_cache
+from potodo.po_file import PoFileStats
+from potodo.potodo import build_ignore_matcher
+from potodo.scanner import PoCounts
+from potodo.scanner import polib_po_counts
+from potodo.scanner import scan_po_file
+
+
+def summarize(po_stats_per_directory):
+    return {
+        directory: sorted(
+            (stats.filename, stats.translated_nb, stats.fuzzy_nb, stats.entries_count)
+            for stats in po_files
+        )
+        for directory, po_files in po_stats_per_directory.items()
+    }
+
+
+def test_parallel_parsing_matches_serial(repo_dir, monkeypatch):
+    ignore_matches = build_ignore_matcher(repo_dir, [])
+    serial = get_po_stats_from_repo_or_cache(
+        repo_dir, ignore_matches, no_cache=True, jobs=1
+    )
+    monkeypatch.setattr(po_file, "POOL_MIN_FILES", 0)
+    parallel = get_po_stats_from_repo_or_cache(
+        repo_dir, ignore_matches, no_cache=True, jobs=2
+    )
+    assert summarize(parallel) == summarize(serial)
+
+
+def test_scanner_agrees_with_polib(repo_dir):
+    fixtures = repo_dir.parent
+    po_files = list(fixtures.rglob("*.po"))
+    assert po_files
+    for path in po_files:
+        assert scan_po_file(path) == polib_po_counts(path), path
+
+
+def test_scanner_edge_cases(repo_dir):
+    counts = scan_po_file(repo_dir.parent / "scanner" / "edge_cases.po")
+    assert counts == PoCounts(
+        translated=4,
+        fuzzy=1,
+        untranslated=4,
+        obsolete=3,
+        translated_words=10,
+        fuzzy_words=2,
+        untranslated_words=10,
+        translated_chars=59,
+        fuzzy_chars=6,
+        untranslated_chars=55,
+    )
+
+
+def test_engines_give_the_same_stats(repo_dir):
+    path = repo_dir / "file1.po"
+    scanned = PoFileStats(path, engine="scan")
+    for engine in "polib", "verify":
+        stats = PoFileStats(path, engine=engine)
+        assert stats.translated_nb == scanned.translated_nb == 1
+        assert stats.fuzzy_nb == scanned.fuzzy_nb == 1
+        assert stats.untranslated_nb == scanned.untranslated_nb == 1
+        assert stats.obsolete_nb == scanned.obsolete_nb == 2
+        assert stats.percent_translated == scanned.percent_translated == 33
+
+
+def test_stats_are_cached_as_counters_only(repo_dir, tmp_path):
+    stats = PoFileStats(repo_dir / "file1.po")
+    assert not hasattr(stats, "__dict__")
+    cache_path = str(tmp_path / "cache.pickle")
+    set_cache_content({stats.path: stats}, path=cache_path)
+    cached = get_cache_file_content(path=cache_path)[stats.path]
+    assert cached.__getstate__() == stats.__getstate__()
+    assert cached.percent_translated == 33
+    assert cached.filename_dir == "repository/file1.po"
+
+
+def test_sqlite_cache(repo_dir, tmp_path, monkeypatch):
+    repo = tmp_path / "repository"
+    shutil.copytree(str(repo_dir), str(repo))
+    ignore_matches = build_ignore_matcher(repo, [])
+    cold = get_po_stats_from_repo_or_cache(repo, ignore_matches, cache_backend="sqlite")
+
+    parsed = []
+
+    def parse_po_files(paths, *args):
+        parsed.extend(paths)
+        return [PoFileStats(path) for path in paths]
+
+    monkeypatch.setattr(po_file, "parse_po_files", parse_po_files)
+    (repo / "file2.po").write_text(
+        (repo / "file2.po").read_text().replace('msgstr ""', 'msgstr "Traduit"')
+    )
+    warm = get_po_stats_from_repo_or_cache(repo, ignore_matches, cache_backend="sqlite")
+    assert parsed == [repo / "file2.po"]
+    assert summarize(warm) != summarize(cold)
+    # Words and characters are cached along with the entries
+    assert [s.counts for s in warm["folder"]] == [
+        PoFileStats(s.path).counts for s in warm["folder"]
+    ]
+    assert [s.translated_nb for s in warm["."] if s.filename == "file2.po"] == [1]
+
+    with sqlite3.connect(str(repo / ".potodo" / "cache.sqlite")) as connection:
+        rows = connection.execute(
+            "SELECT directory, files, translated, entries FROM directories "
+            "ORDER BY directory"
+        ).fetchall()
+    assert rows == [("", 2, 2, 4), ("excluded", 1, 1, 2), ("folder", 2, 1, 3)]
+
+
+def test_shared_cache_is_keyed_by_content(repo_dir, tmp_path, monkeypatch):
+    first_clone = tmp_path / "first"
+    second_clone = tmp_path / "second"
+    shutil.copytree(str(repo_dir), str(first_clone))
+    shutil.copytree(str(repo_dir), str(second_clone))
+    (second_clone / "file2.po").write_text(
+        (second_clone / "file2.po").read_text().replace('msgstr ""', 'msgstr "Oui"')
+    )
+    get_po_stats_from_repo_or_cache(first_clone, build_ignore_matcher(first_clone, []))
+
+    parsed = []
+
+    def parse_po_files(paths, *args):
+        parsed.extend(paths)
+        return [PoFileStats(path) for path in paths]
+
+    monkeypatch.setattr(po_file, "parse_po_files", parse_po_files)
+    ignore_matches = build_ignore_matcher(second_clone, [])
+    stats = get_po_stats_from_repo_or_cache(second_clone, ignore_matches)
+    assert parsed == [second_clone / "file2.po"]
+    assert summarize(stats) == summarize(
+        get_po_stats_from_repo_or_cache(second_clone, ignore_matches, no_cache=True)
+    )
+
+
+def test_content_hash_is_the_git_blob_id():
+    # As given by `printf 'hello\n' | git hash-object --stdin`
+    assert content_hash(b"hello\n") == "ce013625030ba8dba906f756967f9e9ca394464a"
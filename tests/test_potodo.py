@@ -1,5 +1,6 @@
 import json
 
+import potodo.po_file
 from potodo.potodo import exec_potodo
 
 
@@ -33,6 +34,12 @@ def test_output(capsys, base_config, repo_dir):
                     "fuzzies": 0,
                     "translated": 0,
                     "percent_translated": 0,
+                    "words": 6,
+                    "fuzzy_words": 0,
+                    "translated_words": 0,
+                    "chars": 40,
+                    "fuzzy_chars": 0,
+                    "translated_chars": 0,
                     "reserved_by": None,
                     "reservation_date": None,
                 },
@@ -49,6 +56,12 @@ def test_output(capsys, base_config, repo_dir):
                     "fuzzies": 1,
                     "translated": 1,
                     "percent_translated": 33,
+                    "words": 17,
+                    "fuzzy_words": 7,
+                    "translated_words": 5,
+                    "chars": 100,
+                    "fuzzy_chars": 40,
+                    "translated_chars": 25,
                     "reserved_by": None,
                     "reservation_date": None,
                 },
@@ -59,6 +72,12 @@ def test_output(capsys, base_config, repo_dir):
                     "fuzzies": 0,
                     "translated": 0,
                     "percent_translated": 0,
+                    "words": 6,
+                    "fuzzy_words": 0,
+                    "translated_words": 0,
+                    "chars": 40,
+                    "fuzzy_chars": 0,
+                    "translated_chars": 0,
                     "reserved_by": None,
                     "reservation_date": None,
                 },
@@ -67,3 +86,82 @@ def test_output(capsys, base_config, repo_dir):
     ]
 
     assert output == expected
+
+
+def test_ndjson_output(capsys, base_config, repo_dir, monkeypatch):
+    base_config["output_format"] = "ndjson"
+    # What's printed before each file is parsed, and at the end
+    printed = []
+
+    def timed_po_file_stats(path, engine):
+        printed.append(capsys.readouterr().out)
+        return parse(path, engine)
+
+    parse = potodo.po_file._timed_po_file_stats
+    monkeypatch.setattr(potodo.po_file, "_timed_po_file_stats", timed_po_file_stats)
+    exec_potodo(**base_config)
+    printed.append(capsys.readouterr().out)
+    records = [json.loads(line) for line in "".join(printed).splitlines()]
+
+    # Records are printed as soon as files are read, in the order they're read
+    assert [(record["type"], record["name"]) for record in records[:-1]] == [
+        ("file", "repository/file1"),
+        ("file", "repository/file2"),
+        ("directory", "repository/"),
+        ("file", "folder/file3"),
+        ("directory", "folder/"),
+    ]
+    # Nothing before the first parse, then the records of each file parsed
+    assert [len(output.splitlines()) for output in printed] == [0, 1, 2, 3]
+    assert records[3]["directory"] == "folder/"
+    assert records[3]["path"] == f"{repo_dir}/folder/file3.po"
+    assert records[2] == {
+        "type": "directory",
+        "name": "repository/",
+        "entries": 4,
+        "fuzzies": 1,
+        "translated": 1,
+        "percent_translated": 25.0,
+        "words": 23,
+        "fuzzy_words": 7,
+        "translated_words": 5,
+        "chars": 140,
+        "fuzzy_chars": 40,
+        "translated_chars": 25,
+    }
+    assert records[-1] == {
+        "type": "total",
+        "entries": 5,
+        "fuzzies": 1,
+        "translated": 1,
+        "percent_translated": 20.0,
+        "words": 29,
+        "fuzzy_words": 7,
+        "translated_words": 5,
+        "chars": 180,
+        "fuzzy_chars": 40,
+        "translated_chars": 25,
+    }
+
+
+def test_progress_in_words(capsys, base_config):
+    base_config.update(counts=True, unit="words")
+    exec_potodo(**base_config)
+    output = capsys.readouterr().out
+    assert (
+        "- file1.po                        12 words to do, including 7 in fuzzies."
+        in (output)
+    )
+    assert "# repository (21.74% done)" in output
+
+    # file1.po is 33% translated, but only 29% of its words
+    base_config.update(counts=False, above=30)
+    exec_potodo(**base_config)
+    output = capsys.readouterr().out
+    assert "file1.po" not in output
+    base_config.update(above=29)
+    exec_potodo(**base_config)
+    output = capsys.readouterr().out
+    assert "- file1.po                         5 /  17 words ( 29.0% translated)" in (
+        output
+    )
@@ -59,6 +59,18 @@ class TestPotodoArgsErrors:
             == b"Potodo: Cannot pass --exclude-fuzzy and --only-fuzzy at the same time.\n"
         )
 
+    def test_potodo_counts_and_by_conflict(self):
+        try:
+            check_output(
+                [sys.executable, "-m", "potodo", "--counts=words", "--by", "chars"]
+            ).decode("utf-8")
+        except CalledProcessError as e:
+            output = e.output
+        assert (
+            output
+            == b"Potodo: Cannot pass --counts=words and --by chars at the same time.\n"
+        )
+
     def test_potodo_exclude_and_only_reserved_conflict(self):
         try:
             check_output(
@@ -76,3 +88,51 @@ class TestPotodoArgsErrors:
             output
             == b"Potodo: Cannot pass --exclude-reserved and --only-reserved at the same time.\n"
         )
+
+    def test_potodo_jobs_below_one(self):
+        try:
+            check_output([sys.executable, "-m", "potodo", "--jobs", "0"])
+        except CalledProcessError as e:
+            output = e.output
+        assert output == b"Potodo: 'jobs' value must be at least 1.\n"
+
+    def test_potodo_negative_depth(self):
+        try:
+            check_output([sys.executable, "-m", "potodo", "--depth", "-1"])
+        except CalledProcessError as e:
+            output = e.output
+        assert output == b"Potodo: 'depth' value must be positive.\n"
+
+    def test_potodo_json_and_ndjson_conflict(self):
+        try:
+            check_output(
+                [sys.executable, "-m", "potodo", "--json", "--format", "ndjson"]
+            )
+        except CalledProcessError as e:
+            output = e.output
+        assert (
+            output
+            == b"Potodo: Cannot pass --json and --format ndjson at the same time.\n"
+        )
+
+    def test_potodo_watch_and_interactive_conflict(self):
+        try:
+            check_output([sys.executable, "-m", "potodo", "--watch", "--interactive"])
+        except CalledProcessError as e:
+            output = e.output
+        assert (
+            output
+            == b"Potodo: Cannot pass --watch and --interactive at the same time.\n"
+        )
+
+    def test_potodo_several_paths_and_api_url_conflict(self):
+        try:
+            check_output(
+                [sys.executable, "-m", "potodo", "-p", ".", "-p", "..", "-u", "url"]
+            )
+        except CalledProcessError as e:
+            output = e.output
+        assert output == (
+            b"Potodo: Cannot pass --api-url with several repositories, "
+            b"give their API URL in a manifest instead.\n"
+        )
@@ -0,0 +1,116 @@
+import json
+import os
+
+import pytest
+
+from potodo.commands import reuse_command
+from potodo.entries import EntryIndex
+from potodo.potodo import build_ignore_matcher
+from potodo.walk import walk_po_files
+
+
+def write_po(path, entries):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        'msgid ""\nmsgstr ""\n\n'
+        + "\n".join(
+            f'{"#, fuzzy" + chr(10) if fuzzy else ""}msgid "{msgid}"\n'
+            f'msgstr "{msgstr}"\n'
+            for msgid, msgstr, fuzzy in entries
+        )
+    )
+
+
+@pytest.fixture
+def reuse_repo(tmp_path):
+    repo = tmp_path / "repository"
+    write_po(
+        repo / "library" / "os.po",
+        [
+            ("Availability: Unix.", "", False),
+            ("Return the process id.", "Renvoie l'id.", True),
+            ("Example:", "", False),
+        ],
+    )
+    write_po(
+        repo / "library" / "sys.po",
+        [
+            ("Availability: Unix.", "Disponibilité : Unix.", False),
+            ("Return the process id.", "Renvoie l'identifiant du processus.", False),
+        ],
+    )
+    write_po(
+        repo / "tutorial.po",
+        [
+            ("Availability: Unix.", "Disponibilité : Unix.", False),
+            ("Example:", "Exemple :", True),
+        ],
+    )
+    return repo
+
+
+def read_suggestions(repo, exclude=()):
+    index = EntryIndex(repo)
+    read = index.update(
+        walk_po_files(repo, build_ignore_matcher(repo, list(exclude))), jobs=1
+    )
+    suggestions = index.suggestions()
+    index.close()
+    return read, [
+        (suggestion.path, suggestion.msgid, suggestion.translations)
+        for suggestion in suggestions
+    ]
+
+
+def test_reuse_suggests_translations_found_elsewhere(reuse_repo):
+    read, suggestions = read_suggestions(reuse_repo)
+    assert read == 3
+    # Fuzzy translations aren't suggested
+    assert suggestions == [
+        (
+            "library/os.po",
+            "Availability: Unix.",
+            [("Disponibilité : Unix.", 2, "library/sys.po")],
+        ),
+        (
+            "library/os.po",
+            "Return the process id.",
+            [("Renvoie l'identifiant du processus.", 1, "library/sys.po")],
+        ),
+    ]
+    assert read_suggestions(reuse_repo, exclude=["library/sys.po"])[1] == [
+        (
+            "library/os.po",
+            "Availability: Unix.",
+            [("Disponibilité : Unix.", 1, "tutorial.po")],
+        ),
+    ]
+
+
+def test_reuse_only_reads_changed_files(reuse_repo):
+    read_suggestions(reuse_repo)
+    assert read_suggestions(reuse_repo) == (0, read_suggestions(reuse_repo)[1])
+
+    os_po = reuse_repo / "library" / "os.po"
+    write_po(os_po, [("Availability: Unix.", "Disponible sur Unix.", False)])
+    # Files changing within the mtime granularity are read again anyway
+    os.utime(str(os_po), ns=(0, 0))
+    (reuse_repo / "library" / "sys.po").unlink()
+    read, suggestions = read_suggestions(reuse_repo)
+    assert read == 1
+    assert suggestions == []
+
+
+def test_reuse_command(reuse_repo, capsys):
+    reuse_command(["-p", str(reuse_repo)])
+    lines = capsys.readouterr().out.splitlines()
+    assert "# library/os.po" in lines
+    assert "- line 4 (untranslated): Availability: Unix." in lines
+    assert "    -> Disponibilité : Unix. (in library/sys.po and 1 more)" in lines
+    assert lines[-1] == "# 2 entries to translate or review are translated elsewhere"
+
+    reuse_command(["-p", str(reuse_repo), "--json"])
+    suggestions = json.loads(capsys.readouterr().out)
+    assert [suggestion["line"] for suggestion in suggestions] == [4, 7]
+    assert suggestions[1]["state"] == "fuzzy"
+    assert suggestions[1]["translations"][0]["uses"] == 1
@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from potodo.commands import search_command
+from potodo.entries import EntryIndex
+from potodo.potodo import build_ignore_matcher
+from potodo.walk import walk_po_files
+
+
+@pytest.fixture
+def search_repo(tmp_path):
+    repo = tmp_path / "repository"
+    (repo / "library").mkdir(parents=True)
+    (repo / "library" / "functools.po").write_text(
+        'msgid ""\n'
+        'msgstr ""\n'
+        "\n"
+        'msgid ""\n'
+        '"Example of an LRU cache "\n'
+        '"decorator:"\n'
+        'msgstr "Exemple d\'un décorateur de cache LRU :"\n'
+        "\n"
+        "#, fuzzy\n"
+        'msgid "Decorators are \\"functions\\"."\n'
+        'msgstr "Les décorateurs sont des fonctions."\n'
+    )
+    (repo / "glossary.po").write_text(
+        'msgid ""\n'
+        'msgstr ""\n'
+        "\n"
+        'msgctxt "term"\n'
+        'msgid "decorator"\n'
+        'msgstr ""\n'
+    )
+    return repo
+
+
+def search(repo, query, **kwargs):
+    index = EntryIndex(repo)
+    index.update(walk_po_files(repo, build_ignore_matcher(repo, [])), jobs=1)
+    matches = index.search(query, **kwargs)
+    index.close()
+    return [(match.path, match.line, match.state) for match in matches]
+
+
+def test_search_ignores_case_and_wrapping(search_repo):
+    assert search(search_repo, "cache decorator") == [
+        ("library/functools.po", 4, "translated")
+    ]
+    # Words of the query match words starting with them
+    assert search(search_repo, "DECORATOR") == [
+        ("glossary.po", 4, "untranslated"),
+        ("library/functools.po", 4, "translated"),
+        ("library/functools.po", 9, "fuzzy"),
+    ]
+    assert search(search_repo, '"functions"') == [("library/functools.po", 9, "fuzzy")]
+    assert search(search_repo, "décorateur", fields=["msgid"]) == []
+    assert search(search_repo, "décorateur", states=["fuzzy"]) == [
+        ("library/functools.po", 9, "fuzzy")
+    ]
+    # All words have to be there, in this order
+    assert search(search_repo, "decorator cache") == []
+    with pytest.raises(ValueError):
+        search(search_repo, "...")
+
+
+def test_search_reads_changed_files(search_repo):
+    assert search(search_repo, "getter") == []
+    glossary = search_repo / "glossary.po"
+    glossary.write_text(glossary.read_text() + '\nmsgid "getter"\nmsgstr ""\n')
+    assert search(search_repo, "getter") == [("glossary.po", 8, "untranslated")]
+    glossary.unlink()
+    assert search(search_repo, "decorator") == [
+        ("library/functools.po", 4, "translated"),
+        ("library/functools.po", 9, "fuzzy"),
+    ]
+
+
+def test_search_command(search_repo, capsys):
+    search_command(["-p", str(search_repo), "--in", "msgstr", "décorateur"])
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[:3] == [
+        "library/functools.po:4 (translated)",
+        "    msgid   Example of an LRU cache decorator:",
+        "    msgstr  Exemple d'un décorateur de cache LRU :",
+    ]
+    assert lines[-1] == "# 2 entries found"
+
+    search_command(["-p", str(search_repo), "-j", "-s", "untranslated", "decorator"])
+    (match,) = json.loads(capsys.readouterr().out)
+    assert match["msgctxt"] == "term"
+
+    with pytest.raises(SystemExit):
+        search_command(["-p", str(search_repo), "--", "-"])
+    assert "No word to search" in capsys.readouterr().out
@@ -0,0 +1,111 @@
+import json
+import shutil
+import subprocess
+import sys
+import time
+
+import pytest
+
+from potodo.potodo import build_ignore_matcher
+from potodo.potodo import exec_potodo
+from potodo.server import get_served_stats
+from potodo.server import query_server
+from potodo.server import server_info_path
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+@pytest.fixture
+def server(repo_copy):
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "potodo",
+            "serve",
+            "--path",
+            str(repo_copy),
+            "--http",
+            "0",
+            "--exclude",
+            "excluded/",
+        ],
+        stdout=subprocess.DEVNULL,
+    )
+    wait_for(server_info_path(repo_copy).exists)
+    yield process
+    process.terminate()
+    process.wait()
+
+
+def test_served_stats_follow_the_files(repo_copy, server):
+    ignore_matches = build_ignore_matcher(repo_copy, ["excluded/"])
+    served = get_served_stats(repo_copy, ["excluded/"], ignore_matches, None)
+    assert sorted(po_file.filename for po_file in served.po_files) == [
+        "excluded.po",
+        "file1.po",
+        "file2.po",
+        "file3.po",
+    ]
+    # Files in directories excluded here, but not by the server, are left out
+    served = get_served_stats(
+        repo_copy,
+        ["excluded/", "folder"],
+        build_ignore_matcher(repo_copy, ["excluded/", "folder"]),
+        None,
+    )
+    assert sorted(po_file.filename for po_file in served.po_files) == [
+        "file1.po",
+        "file2.po",
+    ]
+    # The server excludes files which wouldn't be
+    assert get_served_stats(repo_copy, [], ignore_matches, None) is None
+
+    with open(repo_copy / "file2.po", "a") as po_file:
+        po_file.write('\nmsgid "Another"\nmsgstr ""\n')
+
+    def file2_updated():
+        served = get_served_stats(repo_copy, ["excluded/"], ignore_matches, None)
+        file2 = [
+            po_file for po_file in served.po_files if po_file.filename == "file2.po"
+        ]
+        return file2[0].untranslated_nb == 2
+
+    wait_for(file2_updated)
+
+    shutil.rmtree(str(repo_copy / "folder"))
+
+    def folder_removed():
+        served = get_served_stats(repo_copy, ["excluded/"], ignore_matches, None)
+        return sorted(po_file.filename for po_file in served.po_files) == [
+            "file1.po",
+            "file2.po",
+        ]
+
+    wait_for(folder_removed)
+
+    server.terminate()
+    server.wait()
+    assert not server_info_path(repo_copy).exists()
+    assert get_served_stats(repo_copy, ["excluded/"], ignore_matches, None) is None
+
+
+def test_served_report_is_the_json_report(capsys, base_config, repo_copy, server):
+    base_config.update(
+        path=repo_copy,
+        exclude=["excluded/"],
+        below=40,
+        only_fuzzy=True,
+        json_format=True,
+    )
+    exec_potodo(**base_config)
+    report = json.loads(capsys.readouterr().out)
+
+    assert query_server(repo_copy, "/stats?below=40&only_fuzzy=1") == report
+    assert query_server(repo_copy, "/stats?below=forty") is None
+    assert query_server(repo_copy, "/unknown") is None
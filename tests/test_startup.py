@@ -0,0 +1,40 @@
+import json
+import subprocess
+import sys
+
+# Runs potodo, then prints the modules it imported
+RUN_POTODO = """
+import json, sys
+from potodo.potodo import main
+try:
+    main()
+finally:
+    print(json.dumps(sorted(sys.modules)), file=sys.stderr)
+"""
+
+
+def imported_modules(*args):
+    process = subprocess.run(
+        [sys.executable, "-c", RUN_POTODO, *args],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        check=True,
+    )
+    return set(json.loads(process.stderr.decode().splitlines()[-1]))
+
+
+def test_warm_run_imports(repo_copy):
+    # Parsing with polib imports it, but a run using the cache doesn't
+    assert "polib" in imported_modules("-p", str(repo_copy), "--engine", "polib")
+    modules = imported_modules("-p", str(repo_copy))
+    assert "polib" not in modules
+    assert "requests" not in modules
+    assert "concurrent.futures.process" not in modules
+
+
+def test_version_imports():
+    modules = imported_modules("--version")
+    assert "requests" not in modules
+    assert "sqlite3" not in modules
+    assert "gitignore_parser" not in modules
+    assert "potodo.po_file" not in modules
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from potodo import timings
+from potodo.potodo import exec_potodo
+
+
+@pytest.fixture(autouse=True)
+def no_timings(monkeypatch):
+    """Don't let the timings enabled by a test be recorded by others."""
+    monkeypatch.setattr(timings, "_timings", None)
+
+
+def test_timings_json(capsys, base_config):
+    base_config.update(json_format=True, timings=True)
+    exec_potodo(**base_config)
+    captured = capsys.readouterr()
+    json.loads(captured.out)
+    report = json.loads(captured.err)
+
+    phases = [phase["name"] for phase in report["phases"]]
+    assert phases[:3] == ["stats", "stats/walk", "stats/parse"]
+    assert "render" in phases
+    assert report["counters"]["files"] == 3
+    assert report["counters"]["parsed_files"] == 3
+    assert report["counters"]["bytes_parsed"] > 0
+    assert {file["path"].rsplit("/", 1)[-1] for file in report["slowest_files"]} == {
+        "file1.po",
+        "file2.po",
+        "file3.po",
+    }
+    assert report["requests"]["count"] == 0
+
+
+def test_timings_text(capsys, base_config):
+    base_config.update(timings=True)
+    exec_potodo(**base_config)
+    err = capsys.readouterr().err
+    assert "# Timings" in err
+    assert "  - parse" in err
+    assert "- parsed_files: 3" in err
+
+
+def test_nothing_recorded_unless_enabled():
+    with timings.phase("stats"):
+        timings.count("files")
+        timings.record_request("http://localhost/", 200, 0.1)
+
+    recorded = timings.enable_timings()
+    with timings.phase("reservations"):
+        timings.record_request("http://localhost/?page=1", 200, 0.1)
+        timings.record_request("http://localhost/?page=2", 429, 0.3)
+    report = recorded.report()
+    assert [phase["name"] for phase in report["phases"]] == ["reservations"]
+    assert report["requests"]["count"] == 2
+    assert report["requests"]["statuses"] == {"200": 1, "429": 1}
+    assert report["requests"]["slowest"][0]["url"] == "http://localhost/?page=2"
@@ -0,0 +1,80 @@
+import json
+import shutil
+
+import pytest
+
+from potodo.po_file import get_po_stats_from_repo_or_cache
+from potodo.potodo import build_ignore_matcher
+from potodo.potodo import exec_potodo
+from potodo.tree import build_tree
+from potodo.tree import NO_COUNTS
+
+
+@pytest.fixture
+def nested_repo(repo_dir, tmp_path):
+    """A repository with two directories named `howto` in different places."""
+    repo = tmp_path / "repository"
+    for directory, source in (
+        ("library/howto", "file1.po"),
+        ("library/howto/deep", "file2.po"),
+        ("tutorial/howto", "folder/file3.po"),
+    ):
+        (repo / directory).mkdir(parents=True, exist_ok=True)
+        shutil.copy(str(repo_dir / source), str(repo / directory))
+    return repo
+
+
+def test_directories_sharing_a_name_are_kept_apart(nested_repo):
+    po_files = get_po_stats_from_repo_or_cache(
+        nested_repo, build_ignore_matcher(nested_repo, []), no_cache=True
+    )
+    assert sorted(po_files) == ["library/howto", "library/howto/deep", "tutorial/howto"]
+    assert [po_file.filename for po_file in po_files["tutorial/howto"]] == ["file3.po"]
+
+
+def test_counts_are_rolled_up(nested_repo):
+    po_files = get_po_stats_from_repo_or_cache(
+        nested_repo, build_ignore_matcher(nested_repo, []), no_cache=True
+    )
+    tree = build_tree(
+        (po_file for files in po_files.values() for po_file in files), nested_repo
+    )
+    library = tree.children["library"]
+    assert library.own_counts == NO_COUNTS
+    assert library.counts == tree.children["library"].children["howto"].counts
+    assert library.counts.translated == 1
+    assert library.counts.untranslated + library.counts.fuzzy == 3
+    assert tree.counts.untranslated + tree.counts.fuzzy == 4
+
+    assert [group.node.path for group in tree.groups()] == [
+        "library/howto",
+        "library/howto/deep",
+        "tutorial/howto",
+    ]
+    groups = list(tree.groups(depth=1))
+    assert [group.node.path for group in groups] == ["library", "tutorial"]
+    assert [po_file.filename for po_file in groups[0].files] == [
+        "file1.po",
+        "file2.po",
+    ]
+    assert groups[0].percent_translated == 25.0
+    assert [group.node.path for group in tree.groups(depth=0)] == ["."]
+
+
+def test_output_by_depth(capsys, base_config, nested_repo):
+    base_config.update(path=nested_repo, exclude=[])
+    exec_potodo(**base_config)
+    output = capsys.readouterr().out
+    assert "# library/howto (33.33% done)" in output
+    assert "# tutorial/howto (0.00% done)" in output
+    assert "# deep (0.00% done)" in output
+
+    base_config.update(depth=1, json_format=True)
+    exec_potodo(**base_config)
+    output = json.loads(capsys.readouterr().out)
+    assert [directory["name"] for directory in output] == ["library/", "tutorial/"]
+    assert output[0]["percent_translated"] == 25.0
+    assert [po_file["name"] for po_file in output[0]["files"]] == [
+        "library/howto/file1",
+        "library/howto/deep/file2",
+    ]
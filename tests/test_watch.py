@@ -0,0 +1,132 @@
+import json
+import shutil
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import potodo.watch
+from potodo.po_file import get_po_stats_from_repo_or_cache
+from potodo.potodo import build_ignore_matcher
+from potodo.watch import InotifyWatcher
+from potodo.watch import PollingWatcher
+from potodo.watch import refresh_index
+from potodo.watch import wait_for_changes
+
+NEW_ENTRY = '\nmsgid "Another"\nmsgstr ""\n'
+
+
+def test_only_changed_files_are_parsed_again(repo_copy):
+    ignore_matches = build_ignore_matcher(repo_copy, [])
+    po_files = get_po_stats_from_repo_or_cache(repo_copy, ignore_matches, True)
+    index = {po_file.path: po_file for files in po_files.values() for po_file in files}
+    assert refresh_index(index, repo_copy, ignore_matches) == ([], [])
+
+    with open(repo_copy / "file1.po", "a") as po_file:
+        po_file.write(NEW_ENTRY)
+    (repo_copy / "folder" / "file3.po").unlink()
+    changed, removed = refresh_index(index, repo_copy, ignore_matches)
+
+    assert [po_file.filename for po_file in changed] == ["file1.po"]
+    assert changed[0].untranslated_nb == 2
+    assert removed == [repo_copy / "folder" / "file3.po"]
+    assert index[repo_copy / "file1.po"] is changed[0]
+
+
+def test_only_given_paths_are_checked(repo_copy, monkeypatch):
+    ignore_matches = build_ignore_matcher(repo_copy, ["excluded/"])
+    po_files = get_po_stats_from_repo_or_cache(repo_copy, ignore_matches, True)
+    index = {po_file.path: po_file for files in po_files.values() for po_file in files}
+    monkeypatch.setattr(potodo.watch, "walk_po_files", None)
+
+    with open(repo_copy / "file1.po", "a") as po_file:
+        po_file.write(NEW_ENTRY)
+    with open(repo_copy / "excluded" / "file4.po", "a") as po_file:
+        po_file.write(NEW_ENTRY)
+    shutil.rmtree(str(repo_copy / "folder"))
+    changed, removed = refresh_index(
+        index,
+        repo_copy,
+        ignore_matches,
+        paths=[
+            repo_copy / "file1.po",
+            repo_copy / "excluded" / "file4.po",
+            repo_copy / "folder",
+        ],
+    )
+
+    assert [po_file.filename for po_file in changed] == ["file1.po"]
+    assert removed == [
+        repo_copy / "folder" / "excluded.po",
+        repo_copy / "folder" / "file3.po",
+    ]
+
+
+@pytest.mark.parametrize(
+    "watcher_class",
+    [
+        pytest.param(
+            InotifyWatcher,
+            marks=pytest.mark.skipif(
+                not sys.platform.startswith("linux"), reason="inotify is Linux only"
+            ),
+        ),
+        PollingWatcher,
+    ],
+)
+def test_watchers_see_changes(repo_copy, watcher_class):
+    watcher = watcher_class(repo_copy, build_ignore_matcher(repo_copy, ["excluded/"]))
+    assert watcher.wait(0.05) == set()
+
+    (repo_copy / "excluded" / "file4.po").write_text(NEW_ENTRY)
+    assert watcher.wait(0.05) == set()
+
+    (repo_copy / "new").mkdir()
+    watcher.wait(1)
+    (repo_copy / "new" / "file5.po").write_text(NEW_ENTRY)
+    assert watcher.wait(1) == {repo_copy / "new" / "file5.po"}
+
+    (repo_copy / "folder" / "file3.po").unlink()
+    assert repo_copy / "folder" / "file3.po" in wait_for_changes(watcher)
+    watcher.close()
+
+
+def test_watch_prints_deltas(repo_copy):
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "potodo",
+            "--path",
+            str(repo_copy),
+            "--no-cache",
+            "--format",
+            "ndjson",
+            "--watch",
+        ],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    # Don't hang if the update never comes
+    timer = threading.Timer(10, process.kill)
+    timer.start()
+    try:
+        for line in process.stdout:
+            if json.loads(line)["type"] == "total":
+                break
+        with open(repo_copy / "file2.po", "a") as po_file:
+            po_file.write(NEW_ENTRY)
+        delta = json.loads(process.stdout.readline())
+    finally:
+        timer.cancel()
+        process.kill()
+        process.wait()
+
+    assert delta["type"] == "delta"
+    assert [po_file["path"] for po_file in delta["changed"]] == [
+        str(repo_copy / "file2.po")
+    ]
+    assert delta["changed"][0]["entries"] == 2
+    assert delta["removed"] == []
+    assert delta["total"]["entries"] == 10